@@ -1,9 +1,11 @@
 import abc
 import importlib
+from collections import Counter
 from openpyxl import Workbook
 from pyduq.dataqualityerror import DataQualityError, DataQualityDimension
 from pyduq.dataprofile import DataProfile
 from pyduq.duqerror import ValidationError
+from pyduq.errorstore import ErrorStore, CounterStore, AggregatedStore
    
 class AbstractDUQValidator(abc.ABC):
     """ AbstractDQValidator: 
@@ -11,6 +13,7 @@ class AbstractDUQValidator(abc.ABC):
     The constructor expects a resultset dictionary and a metadata disctionary. Classes that implement this base class will have access to
     a copy of both of those objects.
     The cobstructor will also create an empty list of errors and a empty list of measurement counters.
+    The errors are held in an ErrorStore, which behaves like a list of error dictionaries.
     """
 
     def __init__(self:object, dataset:dict, meta:dict):
@@ -23,7 +26,7 @@ class AbstractDUQValidator(abc.ABC):
         
         self.metadata = meta
         self.dataset = dataset
-        self.validation_errors = []
+        self.validation_errors = ErrorStore()
         self.data_profile = []
             
         
@@ -34,7 +37,14 @@ class AbstractDUQValidator(abc.ABC):
         if (data_quality_error is None):
             raise ValidationError("LANG Exception: DataQualityError has not been set", None)
         
-        self.validation_errors.append(data_quality_error.to_dict())
+        self.validation_errors.add(data_quality_error.attribute, data_quality_error.error_dimension, ErrorStore.TEXT, data_quality_error.error_descr, data_quality_error.primary_key_value)
+        
+        
+    def addError(self:object, attribute:str, error_dimension:str, template:tuple, value:str, primary_key_value="<Unspecified>"):
+        """
+        Add an error whose description is template[0] + value + template[1]. The description is only built when it is used.
+        """
+        self.validation_errors.add(attribute, error_dimension, template, value, primary_key_value)
         
     
     def profileData(self:object, meta_attribute_definition:dict, colData:dict, key:str):
@@ -71,41 +81,49 @@ class AbstractDUQValidator(abc.ABC):
         workbook.close()
 
 
+    def countersOnly(self:object, sample_size:int=10):
+        """
+        Only count the errors, keeping a sample of at most sample_size example errors per rule (see CounterStore).
+        The summary is unchanged but validation_errors only holds the examples.
+        """
+        self.validation_errors = CounterStore(sample_size)
+        
+        
+    def aggregateErrors(self:object):
+        """
+        Collapse identical errors (same attribute, dimension and description) into one entry with a count and 
+        the rows that have the error (see AggregatedStore). The summary is unchanged.
+        """
+        self.validation_errors = AggregatedStore()
+        
+        
+    def errorCounts(self:object) -> dict:
+        """
+        The number of errors for each (attribute, error_dimension).
+        """
+        if (isinstance(self.validation_errors, ErrorStore)):
+            return self.validation_errors.counts()
+        
+        return Counter([(item["attribute"], item["error_dimension"]) for item in self.validation_errors])
+        
+
     def summariseCounters(self:object) ->dict:        
+        """
+        Count how many times each category appears for each attribute. The errors are counted once, 
+        rather than once per attribute and category.
+        """
         # get the MeasurementCategory Enum as a list
         categories = list(DataQualityDimension)
         summary = {}
-        attribute_errors = {}
- 
-        # Construct a list of errors per attribute and store in a dict 
-        for item in self.validation_errors:
-            key = item["attribute"]
-            if (not key in attribute_errors):
-                attribute_errors[key] = []
-            
-            attribute_errors[key].append(item)
+        counts = self.errorCounts()
         
-        # now count how many times each category appears for each attribute
-        #for item, data in attribute_errors.items():
         for item in self.metadata:
             summary_row = {}
             summary_row["attribute"] = item
-
-            summary[item]=[]
-            data = {}
-            
-            if (item in attribute_errors):
-                data = attribute_errors[item]
             
             for name in categories:
-                error_count=0
-                
-                for d in data:
-                    if (d["error_dimension"] == name.value):
-                        error_count+=1
-                
                 # for each attribute create a list of dictionaries contaning a count of each category
-                summary_row[name.name] = error_count
+                summary_row[name.name] = counts.get((item, name.value), 0)
                 
                 '''
                 # calculate an error percentage score per error item 
@@ -121,7 +139,7 @@ class AbstractDUQValidator(abc.ABC):
                     summary_row[name.name + " SCORE"] =  0
                 '''
                 
-            summary[item].append(summary_row)
+            summary[item] = [summary_row]
 
                                 
         return summary
@@ -1,14 +1,16 @@
-import pyodbc
+import sqlite3
 from prettytable import PrettyTable
 from pyduq.duqerror import ValidationError
+from pyduq.columnstore import ColumnStore
+from pyduq.asciifold import AsciiFold
 
 class SQLTools(object):
     """ SQLTools: This is a utility class to help manage SQL resultsets.
     Note: This could be replaced by Pandas
     """
 
-    def __init__ (self, cursor):
-        self.dataset = SQLTools.resultsetToDict(cursor)
+    def __init__ (self, cursor, meta:dict=None, unfolded:set=None):
+        self.dataset = SQLTools.resultsetToDict(cursor, meta, unfolded=unfolded)
 
     def __str__(self):
         return self.__repr__()
@@ -27,24 +29,130 @@ class SQLTools(object):
         return str(pt)
 
     @staticmethod
-    def resultsetToDict(cursor) -> dict:
+    def connect(sqlURI:str):
+        """
+        method connect:
+        Open a DB-API 2.0 connection. A URI of the form 'sqlite:///relative/file.db', 'sqlite:////absolute/file.db'
+        (or just 'sqlite:file.db') opens a sqlite3 database, anything else is treated as an ODBC connection string.
+        """
+        if (sqlURI is None or len(sqlURI)==0):
+            raise ValidationError("LANG Exception: connection string has not been set", None)
+            
+        if (sqlURI.startswith("sqlite:")):
+            path = sqlURI[len("sqlite:"):]
+            return sqlite3.connect(path[3:] if path.startswith("///") else path)
+        
+        try:
+            import pyodbc
+        except ImportError as e:
+            raise ValidationError("LANG Exception: pyodbc is required for ODBC connections", None)
+        
+        return pyodbc.connect(sqlURI)
+
+
+    @staticmethod
+    def resultsetToDict(cursor, meta:dict=None, batch_size:int=10000, unfolded:set=None) -> dict:
         """
         method resultsetToDict:
         Converts a SQL result set into a dictionary of lists keyed on the column name.
+        If metadata is provided, int, float and bool attributes are loaded as TypedColumns.
+        The rows are fetched batch_size at a time so the result set is never held as rows and columns at once.
+        Values are converted to ascii except in the unfolded columns (see MetaUtils.unfoldedColumns).
         """
-        data = {}
-
-        # Get a list of the column names returned from the query
-        columns = [column[0] for column in cursor.description]
-                    
-        resultset = cursor.fetchall()
-        colindex = 0
-     
-        for col in columns:
-            data[col]= [("(Null)" if row[colindex] is None else str(row[colindex]).strip()) for row in resultset]            
-            colindex += 1
+        columns = SQLTools.getColumnIndexes(cursor)
+        data = SQLTools.newColumns(columns, meta)
+        resultset = cursor.fetchmany(batch_size)
+        
+        while (len(resultset) > 0):
+            SQLTools.appendResultset(data, columns, resultset, unfolded)
+            resultset = cursor.fetchmany(batch_size)
    
         return data
+
+
+    @staticmethod
+    def resultsetChunks(cursor, batch_size:int=10000, meta:dict=None, unfolded:set=None):
+        """
+        method resultsetChunks:
+        A generator that reads a result set from any DB-API 2.0 cursor using fetchmany(batch_size) and yields
+        each batch as a dictionary of lists keyed on the column name. This allows a table that is larger than
+        memory to be passed to DUQValidator.validateStream. A result set with no rows yields a single empty chunk.
+        """
+        if (batch_size is None or batch_size < 1):
+            raise ValidationError("LANG Exception: batch_size must be a positive number of rows", None)
+
+        columns = SQLTools.getColumnIndexes(cursor)
+        resultset = cursor.fetchmany(batch_size)
+        
+        # always yield at least one chunk so that the column names are available
+        yield SQLTools.appendResultset(SQLTools.newColumns(columns, meta), columns, resultset, unfolded)
+        
+        while (len(resultset) > 0):
+            resultset = cursor.fetchmany(batch_size)
+            
+            if (len(resultset) > 0):
+                yield SQLTools.appendResultset(SQLTools.newColumns(columns, meta), columns, resultset, unfolded)
+
+
+    @staticmethod
+    def getColumnIndexes(cursor) -> dict:
+        """
+        Get the column names returned from the query and their position in each row. If a column name is repeated the last one wins.
+        """
+        if (cursor is None or cursor.description is None):
+            raise ValidationError("LANG Exception: cursor has not been executed", None)
+
+        columns = {}
+        
+        for colindex, column in enumerate(cursor.description):
+            columns[column[0]] = colindex
+            
+        return columns
+
+
+    @staticmethod
+    def newColumns(columns:dict, meta:dict=None) -> dict:
+        meta = ({} if meta is None else meta)
+        return {col:ColumnStore.newColumn(meta.get(col)) for col in columns}
+
+
+    @staticmethod
+    def appendResultset(data:dict, columns:dict, resultset:list, unfolded:set=None) -> dict:
+        """
+        Append a batch of rows to a dictionary of columns, converting each value to a string.
+        Each column of the batch is folded to ascii in one go unless it is one of the unfolded columns.
+        """
+        for col, colindex in columns.items():
+            values = [SQLTools.cleanValue(row[colindex]) for row in resultset]
+            data[col].extend(values if (not unfolded is None and col in unfolded) else AsciiFold.foldColumn(values))
+            
+        return data
+
+
+    @staticmethod
+    def cleanValue(value) -> str:
+        """
+        Converts a database value into the string form used by the validators. The conversion to ascii is
+        done a column at a time by appendResultset.
+        """
+        return ("(Null)" if value is None else str(value).strip())
+
+
+    @staticmethod
+    def queryChunks(connection, query:str, batch_size:int=10000, meta:dict=None, unfolded:set=None):
+        """
+        method queryChunks:
+        Execute a query against any DB-API 2.0 connection (pyodbc, sqlite3, ...) and stream the result set
+        in batches (see resultsetChunks).
+        """
+        cursor = connection.cursor()
+        cursor.execute(query)
+        
+        try:
+            for chunk in SQLTools.resultsetChunks(cursor, batch_size, meta, unfolded):
+                yield chunk
+        finally:
+            cursor.close()
     
     
     @staticmethod
@@ -93,5 +201,6 @@ class SQLTools(object):
         if (dataset is None):
             raise ValidationError("LANG Exception: DataSet has not been set", None)
 
-        return len(dataset)
+        # every column holds one value per row so the length of any column will do
+        return (len(next(iter(dataset.values()))) if len(dataset) > 0 else 0)
     
@@ -0,0 +1,220 @@
+import importlib
+from array import array
+from pyduq.duqerror import ValidationError
+from pyduq.columnstore import ColumnStore, TypedColumn
+from pyduq.asciifold import AsciiFold
+
+
+class ArrowTools(object):
+    """ ArrowTools:
+    Loaders for the columnar file formats, Parquet and Arrow IPC / Feather. Only the columns that are required are
+    read from the file. An int, float or bool column of an attribute with that Type is copied straight into a
+    TypedColumn from its values and null bitmap, every other column is converted to the strings used by the validators
+    with the Arrow compute functions (cast, trim and fill null) rather than calling str() on every value.
+    The pyarrow package is optional and is only needed if one of these loaders is used.
+    """
+
+    @staticmethod
+    def importModule(module_path:str):
+        try:
+            return importlib.import_module(module_path)
+        except ImportError as e:
+            raise ValidationError("LANG Exception: the pyarrow package is required to read Parquet and Arrow files. Please install pyarrow.", None)
+
+
+    @staticmethod
+    def parquetFileToDict(fileName:str, meta:dict=None, columns:set=None, unfolded:set=None) -> dict:
+        """ parquetFileToDict:
+        Load a Parquet file into a dictionary of lists keyed on the column name.
+        If a set of columns is provided (see MetaUtils.referencedColumns) only those columns are read from the file.
+        """
+        pq = ArrowTools.importModule("pyarrow.parquet")
+        parquet_file = pq.ParquetFile(fileName)
+        fieldnames = ArrowTools.projectColumns(parquet_file.schema_arrow.names, columns)
+
+        return ArrowTools.tableToDict(parquet_file.read(columns=fieldnames), meta, unfolded)
+
+
+    @staticmethod
+    def parquetFileChunks(fileName:str, meta:dict=None, columns:set=None, unfolded:set=None):
+        """ parquetFileChunks:
+        A generator that reads a Parquet file one row group at a time, for DUQValidator.validateStream.
+        A file with no row groups yields a single empty chunk so the column names are still available.
+        """
+        pq = ArrowTools.importModule("pyarrow.parquet")
+        parquet_file = pq.ParquetFile(fileName)
+        fieldnames = ArrowTools.projectColumns(parquet_file.schema_arrow.names, columns)
+
+        if (parquet_file.num_row_groups == 0):
+            yield ArrowTools.tableToDict(parquet_file.schema_arrow.empty_table().select(fieldnames), meta, unfolded)
+
+        for row_group in range(parquet_file.num_row_groups):
+            yield ArrowTools.tableToDict(parquet_file.read_row_group(row_group, columns=fieldnames), meta, unfolded)
+
+
+    @staticmethod
+    def arrowFileToDict(fileName:str, meta:dict=None, columns:set=None, unfolded:set=None) -> dict:
+        """ arrowFileToDict:
+        Load an Arrow IPC or Feather file into a dictionary of lists keyed on the column name. The file is memory-mapped
+        and only the required columns are read.
+        """
+        pa = ArrowTools.importModule("pyarrow")
+        feather = ArrowTools.importModule("pyarrow.feather")
+
+        try:
+            with pa.memory_map(fileName) as source:
+                fieldnames = ArrowTools.projectColumns(pa.ipc.open_file(source).schema.names, columns)
+        except pa.ArrowInvalid as e:
+            # a version 1 Feather file isn't an IPC file so we have to read it to find the column names
+            fieldnames = ArrowTools.projectColumns(feather.read_table(fileName, memory_map=True).column_names, columns)
+
+        return ArrowTools.tableToDict(feather.read_table(fileName, columns=fieldnames, memory_map=True), meta, unfolded)
+
+
+    @staticmethod
+    def arrowFileChunks(fileName:str, meta:dict=None, columns:set=None, unfolded:set=None):
+        """ arrowFileChunks:
+        A generator that reads an Arrow IPC (Feather version 2) file one record batch at a time, for DUQValidator.validateStream.
+        """
+        pa = ArrowTools.importModule("pyarrow")
+
+        with pa.memory_map(fileName) as source:
+            reader = pa.ipc.open_file(source)
+            fieldnames = ArrowTools.projectColumns(reader.schema.names, columns)
+
+            if (reader.num_record_batches == 0):
+                yield ArrowTools.tableToDict(reader.schema.empty_table().select(fieldnames), meta, unfolded)
+
+            for batch in range(reader.num_record_batches):
+                yield ArrowTools.tableToDict(pa.Table.from_batches([reader.get_batch(batch)]).select(fieldnames), meta, unfolded)
+
+
+    @staticmethod
+    def projectColumns(fieldnames:list, columns:set=None) -> list:
+        """ projectColumns:
+        The (unique) column names to read from a file. If columns is None every column is read.
+        """
+        return list(dict.fromkeys([col for col in fieldnames if (columns is None or col in columns)]))
+
+
+    @staticmethod
+    def tableToDict(table, meta:dict=None, unfolded:set=None) -> dict:
+        """ tableToDict:
+        Convert an Arrow table into a dictionary of columns. With metadata, int, float and bool attributes are TypedColumns.
+        """
+        data = dict()
+        meta = ({} if meta is None else meta)
+
+        for col in table.column_names:
+            column = ArrowTools.typedColumn(table.column(col), meta.get(col))
+
+            if (column is None):
+                values = ArrowTools.columnToList(table.column(col))
+
+                if (unfolded is None or not col in unfolded):
+                    values = AsciiFold.foldColumn(values)
+
+                column = ColumnStore.toColumn(meta.get(col), values)
+
+            data[col] = column
+
+        return data
+
+
+    @staticmethod
+    def typedColumn(column, meta_attribute_definition:dict) -> TypedColumn:
+        """ typedColumn:
+        Build a TypedColumn from the values and null bitmap of an Arrow column, without converting the values to strings.
+        Returns None unless the attribute's Type is int and the column is an integer, float and the column is a float64,
+        or bool and the column is a boolean. The cells give the same text as columnToList.
+        """
+        pa = ArrowTools.importModule("pyarrow")
+        pc = ArrowTools.importModule("pyarrow.compute")
+        type_name = ColumnStore.columnType(meta_attribute_definition)
+
+        if (type_name is None):
+            return None
+
+        column_type = TypedColumn.TYPES[type_name]
+
+        if (column_type == "int" and pa.types.is_integer(column.type)):
+            try:
+                column = pc.cast(column, pa.int64())
+            except pa.ArrowInvalid as e:
+                # an unsigned value that is too big for an int64
+                return None
+        elif (not (column_type == "float" and pa.types.is_float64(column.type)) and not (column_type == "bool" and pa.types.is_boolean(column.type))):
+            return None
+
+        if (isinstance(column, pa.ChunkedArray)):
+            column = column.combine_chunks()
+
+        nulls = ArrowTools.bitmap(pc.is_null(column))
+
+        if (column_type == "bool"):
+            return TypedColumn.fromValues(type_name, ArrowTools.values(pc.cast(pc.fill_null(column, False), pa.uint8()), "B"), nulls)
+
+        column = pc.fill_null(column, 0)
+
+        if (column_type == "int"):
+            return TypedColumn.fromValues(type_name, ArrowTools.values(column, "q"), nulls)
+
+        # Arrow writes a float the same as str() except that whole numbers have no '.0' (the integral bitmap) and it
+        # only uses an exponent below 1e-6 or from 1e10, without a leading zero. The text of -0 and the values in
+        # between is copied from Arrow
+        magnitude = pc.abs(column)
+        negative_zero = pc.equal(column.view(pa.int64()), -2**63)
+        integral = pc.and_(pc.and_(pc.equal(pc.floor(column), column), pc.less(magnitude, 1e10)), pc.invert(negative_zero))
+        exponent = pc.or_(pc.and_(pc.greater_equal(magnitude, 1e-9), pc.less(magnitude, 1e-4)), pc.and_(pc.greater_equal(magnitude, 1e10), pc.less(magnitude, 1e16)))
+        rows = pc.indices_nonzero(pc.or_(negative_zero, exponent))
+        text = dict(zip(rows.to_pylist(), pc.cast(pc.take(column, rows), pa.string()).to_pylist()))
+
+        return TypedColumn.fromValues(type_name, ArrowTools.values(column, "d"), nulls, ArrowTools.bitmap(integral), text)
+
+
+    @staticmethod
+    def values(column, typecode:str) -> array:
+        """ values:
+        Copy the values of a fixed width Arrow array (without nulls) into an array of the given type code.
+        """
+        values = array(typecode)
+
+        if (len(column) > 0):
+            width = values.itemsize
+            values.frombytes(memoryview(column.buffers()[1])[column.offset * width:(column.offset + len(column)) * width])
+
+        return values
+
+
+    @staticmethod
+    def bitmap(mask) -> bytearray:
+        """ bitmap:
+        The bits of a boolean Arrow array (without nulls) as a TypedColumn bitmap, with the first row in the lowest bit.
+        """
+        size = (len(mask) + 7) >> 3
+
+        if (len(mask) == 0):
+            return bytearray(size)
+
+        bits = (int.from_bytes(mask.buffers()[1], "little") >> mask.offset) & ((1 << len(mask)) - 1)
+
+        return bytearray(bits.to_bytes(size, "little"))
+
+
+    @staticmethod
+    def columnToList(column) -> list:
+        """ columnToList:
+        Convert an Arrow column into the strings used by the validators - NULLs become "(Null)" and everything
+        else is cast to a string and trimmed, in the same way as FileTools.cleanValue.
+        """
+        pa = ArrowTools.importModule("pyarrow")
+        pc = ArrowTools.importModule("pyarrow.compute")
+
+        try:
+            if (not pa.types.is_string(column.type)):
+                column = pc.cast(column, pa.string())
+
+            return pc.fill_null(pc.utf8_trim_whitespace(column), "(Null)").to_pylist()
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            # types that Arrow can't cast to a string (e.g. nested or binary types) are converted one value at a time
+            return [("(Null)" if value is None else str(value).strip()) for value in column.to_pylist()]
@@ -0,0 +1,37 @@
+from functools import lru_cache
+from unidecode import unidecode
+
+
+class AsciiFold(object):
+    """ AsciiFold:
+    Converts unicode text to ascii for the loaders. Most data is already ascii so a whole column (or a raw
+    buffer) is checked in one go with str.isascii() and only the values that need it are transliterated.
+    The same value tends to repeat many times in a column so the transliterations are kept in a bounded cache.
+    An attribute can opt out of folding with "AsciiFold": false in its metadata.
+    """
+
+    CACHE_SIZE = 65536
+
+    @staticmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def transliterate(s:str) -> str:
+        return unidecode(s)
+
+
+    @staticmethod
+    def foldValue(s):
+        if (isinstance(s, str) and not s.isascii()):
+            return AsciiFold.transliterate(s)
+
+        return s
+
+
+    @staticmethod
+    def foldColumn(values:list) -> list:
+        """
+        Fold a list of strings to ascii. The list is returned as is if every value is already ascii.
+        """
+        if ("".join(values).isascii()):
+            return values
+
+        return [(value if value.isascii() else AsciiFold.transliterate(value)) for value in values]
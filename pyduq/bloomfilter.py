@@ -0,0 +1,36 @@
+import math
+
+
+class BloomFilter(object):
+    """ BloomFilter:
+    A set of hashed keys that can say a key has certainly not been added before, using a fixed number of bits
+    however long the keys are. add(key) is True if the key may have been added before, with a false positive rate
+    of about error_rate once capacity keys have been added, and False if it certainly hasn't.
+    The keys are hashed with hash() so a filter is only meaningful within the process that built it.
+    """
+
+    def __init__(self:object, capacity:int, error_rate:float=0.01):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+
+    def add(self:object, key) -> bool:
+        # double hashing: the i'th bit is h1 + i * h2, both taken from the one 64 bit hash of the key
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        bits = self.bits
+        size = self.size
+        present = True
+
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % size
+            mask = 1 << (bit & 7)
+
+            if (not bits[bit >> 3] & mask):
+                bits[bit >> 3] |= mask
+                present = False
+
+        return present
@@ -0,0 +1,331 @@
+import math
+from array import array
+from pyduq.metautils import MetaUtils
+from pyduq.duqerror import ValidationError
+
+
+class TypedColumn(object):
+    """ TypedColumn:
+    A compact, array backed column for int, float and bool attributes. Each cell is parsed once when
+    it is appended and stored in a typed array, with separate bitmaps recording which rows are NULL,
+    blank or could not be parsed. The original text is only kept for the (hopefully rare) cells that
+    can't be rebuilt from the typed value, e.g. '007' in an int column or 'abc' in a float column.
+
+    The column behaves like the list of strings produced by the loaders, so it can be dropped into a
+    dataset dictionary without changing the validators or the profiler. Code that knows about typed
+    columns can use number() to get at the parsed value without parsing the string again.
+    """
+
+    TYPES = {"int":"int", "integer":"int", "float":"float", "number":"float", "bool":"bool", "boolean":"bool"}
+    BOOL_VALUES = {"false":False, "true":True, "f":False, "t":True, "n":False, "y":True, "no":False, "yes":True, "0":False, "1":True}
+    MAX_TOKENS = 255
+
+    def __init__(self:object, type_name:str):
+        if (not type_name in TypedColumn.TYPES):
+            raise ValidationError("LANG Exception: '" + str(type_name) + "' is not a supported column type", None)
+
+        self.type = TypedColumn.TYPES[type_name]
+        self.length = 0
+        self.nulls = bytearray()
+        self.blanks = bytearray()
+        self.invalid = bytearray()
+        self.integral = bytearray()
+        self.text = {}
+
+        # bool values are stored as an index into a small table of the spellings that have been seen
+        # (i.e. 'Y', 'no', 'True') so that the original text can be returned
+        self.tokens = []
+        self.token_index = {}
+
+        if (self.type == "int"):
+            self.values = array("q")
+        elif (self.type == "float"):
+            self.values = array("d")
+        else:
+            self.values = array("B")
+
+
+    @staticmethod
+    def fromValues(type_name:str, values:array, nulls:bytearray, integral:bytearray=None, text:dict=None) -> "TypedColumn":
+        """
+        Build a column from values that have already been parsed, e.g. the values of a typed column in a Parquet file.
+        nulls and integral are bitmaps laid out like the column's own and text holds the cells whose text isn't the
+        str() of their value. The values of a bool column are 0 and 1, with the text 'false' and 'true'.
+        """
+        column = TypedColumn(type_name)
+        size = (len(values) + 7) >> 3
+
+        column.length = len(values)
+        column.values = values
+        column.nulls = nulls
+        column.blanks = bytearray(size)
+        column.invalid = bytearray(size)
+        column.integral = (bytearray(size) if integral is None else integral)
+        column.text = ({} if text is None else text)
+
+        if (column.type == "bool"):
+            column.tokens = ["false", "true"]
+            column.token_index = {"false":0, "true":1}
+
+        return column
+
+
+    @staticmethod
+    def isSet(bitmap:bytearray, index:int) -> bool:
+        return ( (bitmap[index >> 3] >> (index & 7)) & 1 == 1 )
+
+    @staticmethod
+    def setBit(bitmap:bytearray, index:int):
+        bitmap[index >> 3] |= (1 << (index & 7))
+
+
+    def append(self:object, value:str):
+        """
+        Parse a (cleaned) string value and append it to the column.
+        """
+        index = self.length
+        self.length += 1
+
+        if ((index & 7) == 0):
+            self.nulls.append(0)
+            self.blanks.append(0)
+            self.invalid.append(0)
+            self.integral.append(0)
+
+        if (value == "(Null)"):
+            TypedColumn.setBit(self.nulls, index)
+            self.values.append(0)
+        elif (len(value) == 0):
+            TypedColumn.setBit(self.blanks, index)
+            self.values.append(0)
+        elif (self.type == "bool"):
+            self.appendBool(index, value)
+        else:
+            self.appendNumber(index, value)
+
+
+    def appendNumber(self:object, index:int, value:str):
+        try:
+            number = (int(value) if self.type == "int" else float(value))
+        except Exception as e:
+            TypedColumn.setBit(self.invalid, index)
+            self.text[index] = value
+            self.values.append(0)
+            return
+
+        try:
+            self.values.append(number)
+        except OverflowError as e:
+            # too big for a 64 bit int, keep the text and parse it on demand
+            self.text[index] = value
+            self.values.append(0)
+            return
+
+        if (self.type == "float" and number.is_integer() and (not math.isinf(number)) and value == str(int(number))):
+            # whole numbers in a float column are usually written without the '.0'
+            TypedColumn.setBit(self.integral, index)
+        elif (str(number) != value):
+            self.text[index] = value
+
+
+    def appendBool(self:object, index:int, value:str):
+        if (value in self.token_index):
+            self.values.append(self.token_index[value])
+        elif ( (value.lower() in TypedColumn.BOOL_VALUES) and (len(self.tokens) < TypedColumn.MAX_TOKENS) ):
+            self.token_index[value] = len(self.tokens)
+            self.tokens.append(value)
+            self.values.append(self.token_index[value])
+        else:
+            if (not value.lower() in TypedColumn.BOOL_VALUES):
+                TypedColumn.setBit(self.invalid, index)
+            self.text[index] = value
+            self.values.append(0)
+
+
+    def extend(self:object, values):
+        if (isinstance(values, TypedColumn) and values.type == self.type and self.appendColumn(values)):
+            return
+
+        for value in values:
+            self.append(value)
+
+
+    def appendColumn(self:object, column:"TypedColumn") -> bool:
+        """
+        Append the cells of another column of the same type without parsing them again, e.g. the parts of a file that
+        were loaded in parallel. Returns False, leaving the column as it was, if the bool spellings of the other column
+        don't fit in the token table.
+        """
+        missing = [token for token in column.tokens if not token in self.token_index]
+
+        if (len(self.tokens) + len(missing) > TypedColumn.MAX_TOKENS):
+            return False
+
+        for token in missing:
+            self.token_index[token] = len(self.tokens)
+            self.tokens.append(token)
+
+        offset = self.length
+        self.length += column.length
+        size = (self.length + 7) >> 3
+
+        for name in ["nulls", "blanks", "invalid", "integral"]:
+            bits = int.from_bytes(getattr(self, name), "little") | (int.from_bytes(getattr(column, name), "little") << offset)
+            setattr(self, name, bytearray(bits.to_bytes(size, "little")))
+
+        if (self.type == "bool"):
+            # the token indexes of the other column are translated to the indexes of the same spellings in this one
+            table = bytearray(range(256))
+
+            for index, token in enumerate(column.tokens):
+                table[index] = self.token_index[token]
+
+            self.values.frombytes(column.values.tobytes().translate(table))
+        else:
+            self.values.extend(column.values)
+
+        self.text.update({offset + index:value for index, value in column.text.items()})
+
+        return True
+
+
+    def number(self:object, index:int):
+        """
+        Return the parsed value of a cell or None if the cell is NULL, blank or not a valid value for the column type.
+        """
+        if (TypedColumn.isSet(self.nulls, index) or TypedColumn.isSet(self.blanks, index) or TypedColumn.isSet(self.invalid, index)):
+            return None
+
+        if (index in self.text):
+            value = self.text[index]
+
+            if (self.type == "bool"):
+                return TypedColumn.BOOL_VALUES[value.lower()]
+
+            return (int(value) if self.type == "int" else float(value))
+
+        if (self.type == "bool"):
+            return TypedColumn.BOOL_VALUES[self.tokens[self.values[index]].lower()]
+
+        return self.values[index]
+
+
+    def isNull(self:object, index:int) -> bool:
+        return TypedColumn.isSet(self.nulls, index)
+
+    def isBlank(self:object, index:int) -> bool:
+        return TypedColumn.isSet(self.blanks, index)
+
+    def isValid(self:object, index:int) -> bool:
+        return ( not (TypedColumn.isSet(self.nulls, index) or TypedColumn.isSet(self.blanks, index) or TypedColumn.isSet(self.invalid, index)) )
+
+    def matches(self:object, type_name:str) -> bool:
+        """
+        True if the column was parsed using the same type as type_name, i.e. 'integer' matches an 'int' column.
+        """
+        return ( TypedColumn.TYPES.get(type_name) == self.type )
+
+
+    def __len__(self:object) -> int:
+        return self.length
+
+
+    def __getitem__(self:object, index):
+        if (isinstance(index, slice)):
+            return [self[i] for i in range(*index.indices(self.length))]
+
+        if (index < 0):
+            index += self.length
+
+        if (index < 0 or index >= self.length):
+            raise IndexError("TypedColumn index out of range")
+
+        if (TypedColumn.isSet(self.nulls, index)):
+            return "(Null)"
+
+        if (TypedColumn.isSet(self.blanks, index)):
+            return ""
+
+        if (index in self.text):
+            return self.text[index]
+
+        if (self.type == "bool"):
+            return self.tokens[self.values[index]]
+
+        if (self.type == "float" and TypedColumn.isSet(self.integral, index)):
+            return str(int(self.values[index]))
+
+        return str(self.values[index])
+
+
+    def __iter__(self:object):
+        for index in range(self.length):
+            yield self[index]
+
+
+    def __eq__(self:object, other) -> bool:
+        return ( list(self) == list(other) )
+
+
+    def __repr__(self:object) -> str:
+        return "TypedColumn(" + self.type + ", " + str(self.length) + " rows)"
+
+
+class ColumnStore(object):
+    """ ColumnStore:
+    Helper methods to build typed columns from the metadata. Only attributes whose metadata declares an int, float
+    or bool Type are converted, every other attribute is left as a list of strings.
+    """
+
+    @staticmethod
+    def columnType(meta_attribute_definition:dict) -> str:
+        """
+        Return the Type of an attribute if it can be stored in a TypedColumn, otherwise None.
+        """
+        if ( (not meta_attribute_definition is None) and MetaUtils.exists(meta_attribute_definition, "Type") ):
+            if (meta_attribute_definition["Type"] in TypedColumn.TYPES):
+                return meta_attribute_definition["Type"]
+
+        return None
+
+
+    @staticmethod
+    def newColumn(meta_attribute_definition:dict):
+        """
+        Create an empty column for an attribute - a TypedColumn where the Type allows it, otherwise a list.
+        """
+        type_name = ColumnStore.columnType(meta_attribute_definition)
+        return (TypedColumn(type_name) if not type_name is None else [])
+
+
+    @staticmethod
+    def toColumn(meta_attribute_definition:dict, values):
+        """
+        Convert a list of cleaned string values into the best column for the attribute.
+        """
+        column = ColumnStore.newColumn(meta_attribute_definition)
+
+        if (isinstance(column, TypedColumn)):
+            column.extend(values)
+            return column
+
+        return (values if isinstance(values, list) else list(values))
+
+
+    @staticmethod
+    def fromDataset(dataset:dict, meta:dict) -> dict:
+        """
+        Convert the columns of an existing dataset into typed columns using the declared (or inferred) metadata.
+        The dataset is updated in place, one column at a time, so the string lists can be released as we go.
+        """
+        if (dataset is None):
+            raise ValidationError("LANG Exception: DataSet has not been set", None)
+
+        if (meta is None):
+            raise ValidationError("LANG Exception: metadata has not been set", None)
+
+        for meta_attribute_key, meta_attribute_definition in meta.items():
+            if ( (meta_attribute_key in dataset) and (not isinstance(dataset[meta_attribute_key], TypedColumn)) ):
+                dataset[meta_attribute_key] = ColumnStore.toColumn(meta_attribute_definition, dataset[meta_attribute_key])
+
+        return dataset
@@ -7,6 +7,9 @@ from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import CountVectorizer
 from scipy import stats
 from pyduq.metautils import MetaUtils
+from pyduq.columnstore import TypedColumn
+from pyduq.triage import Triage
+from pyduq.SQLTools import SQLTools
 from nltk.corpus import stopwords
 stopwords = stopwords.words("english")
 
@@ -48,12 +51,25 @@ class DataProfile(object):
         self.csim=0.0
 
     
-    def profile(self, metadata:dict, dataset:dict) ->list:
+    def profile(self, metadata:dict, dataset:dict, triage:Triage=None) ->list:
+        """
+        Profile each attribute of the dataset. With triage, only a random sample of the rows is profiled and each
+        profile also has the estimated null and blank rates of the full data, with their confidence intervals.
+        """
         if (metadata is None):
             raise ValidationError("LANG Exception: meta-data has not been set", None)
         elif (dataset is None):
             raise ValidationError("LANG Exception: resultset has not been set", None)
     
+        row_count = None
+        
+        if (not triage is None):
+            row_count = SQLTools.rowCount(dataset)
+            # the sampled rows are profiled in their original order
+            row_numbers = sorted(triage.sampleRows(dataset))
+            dataset = {col:[values[row] for row in row_numbers] for col, values in dataset.items()}
+            print("Triage: profiling a sample of " + str(len(row_numbers)) + " of " + str(row_count) + " rows.")
+        
         profiles = []
         count = 1
         
@@ -63,6 +79,9 @@ class DataProfile(object):
             # check first.
             if (meta_attribute_key in dataset):
                 profile = DataProfile().profileData(metadata[meta_attribute_key], dataset[meta_attribute_key], meta_attribute_key)
+                
+                if (not triage is None):
+                    self.estimateRates(profile, triage, row_count)
             else:
                 profile = {}
                 profile["attribute"] = meta_attribute_key
@@ -74,6 +93,20 @@ class DataProfile(object):
         return profiles
 
 
+    def estimateRates(self, profile:dict, triage:Triage, row_count:int):
+        """
+        Add the null and blank rates of a sampled profile, with their Wilson score intervals (see Triage.wilson).
+        """
+        profile["rows"] = row_count
+        profile["sample_count"] = profile["count"]
+        
+        for rate, count in [("null_rate", profile["null_count"]), ("blank_rate", profile["blank_count"])]:
+            low, high = triage.wilson(count, profile["count"])
+            profile[rate] = (round(count / profile["count"], 6) if profile["count"] > 0 else 0.0)
+            profile[rate + "_low"] = round(low, 6)
+            profile[rate + "_high"] = round(high, 6)
+
+
     def profileData(self, meta_attribute_definition:dict, colData:list, key:str) ->dict:
         """
         For a given column, calculate a variety of statistics.
@@ -128,7 +161,10 @@ class DataProfile(object):
         else:
             self.default_value = "<Unspecified>"
     
-        for value in colData:
+        # typed columns have already parsed their numeric values so there's no need to parse them again
+        typed = ( isinstance(colData, TypedColumn) and colData.matches(self.type) and colData.type != "bool" )
+    
+        for index, value in enumerate(colData):
             self.memory += len(value)
             
             if (len(value) == 0):
@@ -149,7 +185,10 @@ class DataProfile(object):
             val= math.nan
                     
             try:
-                if (self.type in ["int","integer"]):
+                if (typed):
+                    number = colData.number(index)
+                    val = (math.nan if number is None else number)
+                elif (self.type in ["int","integer"]):
                     val = int(value)
                 elif (self.type in ["float","number"]):
                     val = float(value)
@@ -31,6 +31,8 @@ class DataQualityError(object):
     """ DataQualityError: This class is used to record an instance of a discreet measurement. Every measurement has a label, an optional errorCounter and an optional value.
     """
 
+    __slots__ = ("attribute", "error_dimension", "error_descr", "primary_key_value")
+
     def __init__(self:object, attribute:str, error_dimension:DataQualityDimension=None, description:str="<Unspecified>", primary_key_value:str="<Unspecified>"):
         self.attribute = attribute
         self.error_dimension = error_dimension
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import mmap
+import hashlib
+import weakref
+import tempfile
+from array import array
+from itertools import accumulate
+from functools import partial
+from pyduq.duqerror import ValidationError
+from pyduq.lazydataset import LazyDataset
+
+
+class DatasetCache(object):
+    """ DatasetCache:
+    An on-disk cache of loaded datasets so that repeated runs over the same input file don't have to parse it again.
+    Each entry is keyed on the source file path and the loader options (sheet, projected columns and so on) and
+    records the size, modification time and a hash of the contents of the file. The entry is used if the size and
+    modification time still match. The file is only hashed when the size matches but the modification time doesn't
+    (e.g. it was copied or touched), and the entry is still used if the contents are the same, with the new
+    modification time recorded so the file isn't hashed again. Otherwise the entry is deleted and the file is loaded
+    as normal.
+
+    The cache file is columnar: a JSON header followed by the utf-8 text of each column, with the values separated
+    by NUL characters. The (rare) columns that contain a NUL character are stored as an array of int64 offsets
+    followed by the text of every value. The file is memory-mapped when it is read and each column is only decoded the first
+    time it is used (see LazyDataset). The map is closed when the dataset is closed or released, or when the entry
+    is evicted. The least recently used entries are evicted once the cache directory grows beyond max_size bytes.
+    """
+
+    MAGIC = b"DUQCACHE"
+    VERSION = 1
+    EXTENSION = ".duq"
+    HASH_BLOCK_SIZE = 1048576
+    SEPARATOR = "\x00"
+
+    def __init__(self:object, cache_dir:str, max_size:int=1073741824):
+        if (cache_dir is None or len(cache_dir) == 0):
+            raise ValidationError("LANG Exception: cache directory has not been set", None)
+
+        if (max_size is None or max_size < 0):
+            raise ValidationError("LANG Exception: cache size must be zero or more bytes", None)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.maps = {}
+
+
+    @staticmethod
+    def fileHash(fileName:str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+
+        with open(fileName, 'rb') as f:
+            for block in iter(partial(f.read, DatasetCache.HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+
+    def entryName(self:object, fileName:str, options:dict=None) -> str:
+        """
+        The name of the cache file for a source file and a set of loader options.
+        """
+        key = json.dumps([os.path.abspath(fileName), options], sort_keys=True, default=str)
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + DatasetCache.EXTENSION)
+
+
+    def load(self:object, fileName:str, options:dict=None) -> LazyDataset:
+        """
+        Return the cached dataset for a file, or None if there isn't a valid cache entry for it.
+        """
+        entry = self.entryName(fileName, options)
+
+        if (not os.path.isfile(entry)):
+            return None
+
+        try:
+            header, start, mapped = DatasetCache.mapEntry(entry)
+        except Exception as e:
+            # a damaged or out of date entry is just thrown away
+            self.remove(entry)
+            return None
+
+        stat = os.stat(fileName)
+
+        if (header["size"] != stat.st_size or (header["mtime"] != stat.st_mtime_ns and header["hash"] != DatasetCache.fileHash(fileName))):
+            mapped.close()
+            self.remove(entry)
+            return None
+
+        if (header["mtime"] != stat.st_mtime_ns):
+            DatasetCache.updateModified(entry, header, start - 16, stat.st_mtime_ns)
+
+        # record the use of the entry for the eviction policy
+        os.utime(entry)
+        columns = {column["name"]:column for column in header["columns"]}
+        self.maps.setdefault(entry, []).append(mapped)
+        dataset = LazyDataset([column["name"] for column in header["columns"]], partial(DatasetCache.readColumns, mapped, start, columns),
+                              release=partial(self.release, entry, mapped))
+
+        # the map is also closed if the dataset is just dropped
+        weakref.finalize(dataset, self.release, entry, mapped)
+
+        return dataset
+
+
+    @staticmethod
+    def updateModified(entry:str, header:dict, length:int, mtime:int):
+        """
+        Record the modification time of a source file whose contents haven't changed. The header is rewritten in
+        place, padded to its old length, and is left as it is if it no longer fits.
+        """
+        encoded = json.dumps(dict(header, mtime=mtime)).encode('utf-8')
+
+        if (len(encoded) > length):
+            return
+
+        try:
+            with open(entry, 'r+b') as f:
+                f.seek(16)
+                f.write(encoded.ljust(length))
+        except OSError as e:
+            # a read only cache is still used, the file is just hashed again next time
+            pass
+
+
+    def release(self:object, entry:str, mapped:mmap.mmap):
+        """
+        Close the map of a dataset that has been loaded from a cache entry.
+        """
+        maps = self.maps.get(entry, [])
+
+        if (mapped in maps):
+            maps.remove(mapped)
+
+        if (len(maps) == 0):
+            self.maps.pop(entry, None)
+
+        mapped.close()
+
+
+    @staticmethod
+    def mapEntry(entry:str) -> tuple:
+        """
+        Memory-map a cache file, returning the header, the position of the column data and the map.
+        """
+        with open(entry, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if (mapped[:len(DatasetCache.MAGIC)] != DatasetCache.MAGIC):
+                raise ValidationError("LANG Exception: '" + entry + "' is not a dataset cache file", None)
+
+            length = int.from_bytes(mapped[8:16], "little")
+            header = json.loads(mapped[16:16 + length].decode('utf-8'))
+
+            if (header["version"] != DatasetCache.VERSION):
+                raise ValidationError("LANG Exception: '" + entry + "' is an unsupported version", None)
+        except Exception as e:
+            mapped.close()
+            raise
+
+        return (header, 16 + length, mapped)
+
+
+    @staticmethod
+    def readColumns(mapped:mmap.mmap, start:int, columns:dict, cols:list) -> dict:
+        return {col:DatasetCache.readColumn(mapped, start, columns, col) for col in cols}
+
+
+    @staticmethod
+    def readColumn(mapped:mmap.mmap, start:int, columns:dict, col:str) -> list:
+        column = columns[col]
+        position = start + column["offset"]
+        
+        if (column["rows"] == 0):
+            return []
+            
+        if (not column["offsets"]):
+            return mapped[position:position + column["length"]].decode('utf-8', 'surrogatepass').split(DatasetCache.SEPARATOR)
+            
+        offsets = array("q")
+        offsets.frombytes(mapped[position:position + 8 * (column["rows"] + 1)])
+
+        if (sys.byteorder != "little"):
+            offsets.byteswap()
+
+        position += 8 * (column["rows"] + 1)
+        text = mapped[position:position + column["length"]].decode('utf-8', 'surrogatepass')
+
+        return [text[offsets[i]:offsets[i + 1]] for i in range(column["rows"])]
+
+
+    def save(self:object, fileName:str, dataset:dict, options:dict=None) -> bool:
+        """
+        Write a dataset to the cache. Returns False if the dataset can't be cached, e.g. it has column names
+        that can't be stored in the header. The columns of a LazyDataset that haven't been used yet are loaded
+        with a single call to its loader.
+        """
+        if (isinstance(dataset, LazyDataset)):
+            dataset.load(list(dataset))
+
+        for col in dataset:
+            if (not isinstance(col, (str, int, float))):
+                return False
+
+        stat = os.stat(fileName)
+        header = {"version":DatasetCache.VERSION, "source":os.path.abspath(fileName), "size":stat.st_size, "mtime":stat.st_mtime_ns, "hash":DatasetCache.fileHash(fileName), "columns":[]}
+        blocks = []
+        offset = 0
+
+        for col, values in dataset.items():
+            values = [str(value) for value in values]
+            text = DatasetCache.SEPARATOR.join(values)
+            offsets = b""
+            
+            if (text.count(DatasetCache.SEPARATOR) != max(len(values) - 1, 0)):
+                # a value contains the separator so record where each value starts instead
+                text = "".join(values)
+                offsets = array("q", accumulate(map(len, values), initial=0))
+
+                if (sys.byteorder != "little"):
+                    offsets.byteswap()
+
+                offsets = offsets.tobytes()
+                
+            data = text.encode('utf-8', 'surrogatepass')
+            header["columns"].append({"name":col, "rows":len(values), "offset":offset, "offsets":(len(offsets) > 0), "length":len(data)})
+            blocks.extend([offsets, data])
+            offset += len(offsets) + len(data)
+
+        encoded = json.dumps(header).encode('utf-8')
+        entry = self.entryName(fileName, options)
+
+        # write to a temporary file and rename it so that a reader never sees a partial entry
+        fd, temp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+
+        with os.fdopen(fd, 'wb') as f:
+            f.write(DatasetCache.MAGIC)
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+
+            for block in blocks:
+                f.write(block)
+
+        os.replace(temp, entry)
+        self.evict()
+
+        return True
+
+
+    def entries(self:object) -> list:
+        """
+        The cache files, least recently used first.
+        """
+        entries = []
+
+        for name in os.listdir(self.cache_dir):
+            if (name.endswith(DatasetCache.EXTENSION)):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, name)))
+
+        return sorted(entries)
+
+
+    def evict(self:object):
+        """
+        Remove the least recently used entries until the cache fits in max_size bytes.
+        """
+        entries = self.entries()
+        total = sum([size for mtime, size, entry in entries])
+
+        for mtime, size, entry in entries:
+            if (total <= self.max_size):
+                break
+
+            if (self.remove(entry)):
+                total -= size
+
+
+    def clear(self:object):
+        for mtime, size, entry in self.entries():
+            self.remove(entry)
+
+
+    def remove(self:object, entry:str) -> bool:
+        # the datasets loaded from the entry can't be read once it has gone
+        for mapped in self.maps.pop(entry, []):
+            mapped.close()
+
+        try:
+            os.remove(entry)
+            return True
+        except OSError as e:
+            # the entry may still be mapped by another process (windows won't delete it) so leave it for next time
+            return False
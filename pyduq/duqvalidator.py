@@ -1,167 +1,822 @@
 import re
 import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pyduq.metautils import MetaUtils
-from pyduq.abstractduqvalidator import AbstractDUQValidator
+from pyduq.AbstractDUQValidator import AbstractDUQValidator
 from pyduq.patterns import Patterns
 from pyduq.duqerror import ValidationError
 from pyduq.dataqualityerror import DataQualityError, DataQualityDimension
-from pyduq.expressionbuilder import ExpressionBuilder
+from pyduq.expressionbuilder import ExpressionBuilder, CompiledExpression
 from pyduq.SQLTools import SQLTools
 from pyduq.dataprofile import DataProfile
+from pyduq.columnstore import TypedColumn
+from pyduq.ruleplan import RulePlan
+from pyduq.errorstore import ErrorStore
+from pyduq.groupindex import GroupIndex
+from pyduq.keyindex import KeyIndex
+from pyduq.formatengine import FormatEngine
+from pyduq.rowcache import RowCache
+from pyduq.triage import Triage
 
  
 class DUQValidator(AbstractDUQValidator):
     """ DUQValidator: A generic validator for LANG. 
     The main execution method is validate().
     """   
+    
+    UNIQUE_TEMPLATE = ("Error: Value '", "' is not UNIQUE. A unique value was expected.")
+    EXPRESSION_TEMPLATE = ("Error: Expression '", "' returned FALSE")
         
-    def validate(self:object, customValidator:str=None):
+    def __init__(self:object, dataset:dict, meta:dict):
+        super().__init__(dataset, meta)
+        self.spill_dir = None
+        self.key_budget = None
+        self.bloom = None
+        self.distinct = False
+        self.format_engine = FormatEngine()
+        self.triage = None
+        self.triage_report = []
+        self.resetState()
+
+
+    def resetState(self:object):
+        """
+        Clear the state that is carried between chunks when validating a stream of data.
+        row_offset is the number of rows that have already been validated, unique_values and
+        composite_keys hold the values seen so far for the Unique and Composite checks (see KeyIndex) and
+        group_indexes hold the state of the NonRepeatingGroup check (see GroupIndex) and spilled_keys the number
+        of keys each Unique or Composite check held when it first spilled to disk (see addKeys).
+        rule_plans holds the compiled checks for each attribute (see RulePlan), expressions the compiled
+        Expression rules (see CompiledExpression) and format_engine the Format timings (see FormatEngine).
+        """
+        self.streaming = False
+        self.row_offset = 0
+        self.unique_values = {}
+        self.composite_keys = {}
+        self.group_indexes = {}
+        self.spilled_keys = {}
+        self.rule_plans = {}
+        self.expressions = {}
+        self.format_engine = self.format_engine.empty()
+        
+        
+    def spillTo(self:object, spill_dir:str):
+        """
+        Keep the state of the NonRepeatingGroup check in temporary files in spill_dir rather than in memory.
+        """
+        self.spill_dir = spill_dir
+        
+        
+    def boundKeys(self:object, key_budget:int, bloom:int=None):
+        """
+        Keep at most key_budget keys in memory for each Unique and Composite check, spilling the rest to temporary
+        files in spill_dir, optionally screened by a Bloom filter sized for bloom keys (see KeyIndex).
+        """
+        self.key_budget = key_budget
+        self.bloom = bloom
+        
+        
+    def newKeyIndex(self:object) -> KeyIndex:
+        return KeyIndex(self.key_budget, self.spill_dir, self.bloom)
+        
+        
+    def distinctValues(self:object, distinct:bool=True):
+        """
+        Run the row level and Format checks once for each distinct value of a column rather than once for each row.
+        The errors for a value are added for every row that has it, so they are the same, in the same order.
+        Expressions are always evaluated once for each distinct row of values (see CompiledExpression).
+        """
+        self.distinct = distinct
+        
+        
+    def matchFormats(self:object, backend:str="re", timeout:float=None):
+        """
+        Choose the regex engine for the Format checks and, with the regex package, a time limit for matching
+        each value (see FormatEngine).
+        """
+        self.format_engine = FormatEngine(backend, timeout)
+        
+        
+    def triageSample(self:object, triage:Triage):
+        """
+        Only validate a random sample of the rows and estimate the error rates (see Triage and validateSample).
+        """
+        self.triage = triage
+        
+        
+    def triageReport(self:object) -> list:
+        """
+        The estimated error rates of the last triage validation.
+        """
+        return self.triage_report
+        
+        
+    def formatStats(self:object) -> list:
+        """
+        The time spent on each attribute's Format check, slowest first.
+        """
+        return self.format_engine.report()
+        
+        
+    def validate(self:object, customValidator:str=None, workers:int=None):
         """
         Validate a resultset against predefined metadata based on the LANG rules of data quality.
+        If more than one worker is requested the attributes are validated in a pool of worker processes (see validateParallel).
         """
         if (self.metadata is None):
             raise ValidationError("LANG Exception: meta-data has not been set", None)
         elif (self.dataset is None):
             raise ValidationError("LANG Exception: resultset has not been set", None)
 
+        if (not self.triage is None):
+            dataset = self.dataset
+            row_numbers = self.triage.sampleRows(dataset)
+            self.validateSample({col:[values[row] for row in row_numbers] for col, values in dataset.items()}, row_numbers, SQLTools.rowCount(dataset), customValidator)
+            self.dataset = dataset
+            return
+        
+        self.resetState()
+        primary_key_values = self.getPrimaryKeyValues()
+        
+        if (not workers is None and workers > 1):
+            self.validateParallel(workers)
+        else:
+            """
+            Execute a series of validations against the supplied column of data and the metadata for the column.
+            Which validation is run is determined by entries in the metadata.
+            """         
+            for meta_attribute_key, meta_attribute_definition in self.metadata.items():                
+                if (meta_attribute_key in self.dataset):
+                    print("Validating attribute \t'" + meta_attribute_key + "'...", end='\r')
+                    self.validateAttribute(meta_attribute_definition, meta_attribute_key, primary_key_values)
+                    print("Validating attribute \t'" + meta_attribute_key + "'...\t\t..Complete.")
+                else:
+                    self.addDataQualityError(DataQualityError(meta_attribute_key, error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Attribute '" + meta_attribute_key + "' was not found in the dataset."))
+        
+        # only invoke the custom validator if one has been provoded
+        if (not customValidator is None and len(customValidator) > 0):
+            self.customValidator(customValidator)
+        
+        
+    def validateSample(self:object, sample:dict, row_numbers:list, row_count:int, customValidator:str=None):
         """
-        Change request: find and output the primary key in the error report file if specified
+        Validate a random sample of the rows of a dataset of row_count rows, in a random order (see Triage), where
+        row_numbers are the numbers of the sampled rows in the dataset, triage.batch rows at a time. Once an attribute
+        has triage.error_budget errors it isn't checked again. The errors of the sample are reported as usual, against
+        the row numbers of the full data, and triageReport gives the estimated error rate of each attribute and
+        dimension. The custom validator, if provided, sees the sampled rows.
         """
-        primary_key = ""
-        primary_key_values = None
+        triage = self.triage
+        self.resetState()
+        self.streaming = True
+        self.triage_report = []
+        store = self.validation_errors
+        found = Counter()
+        rows_checked = Counter()
+        stopped = set()
+        print("Triage: validating a sample of " + str(len(row_numbers)) + " of " + str(row_count) + " rows.")
         
-        for key, item in self.metadata.items():                
-            if (MetaUtils.isTrue(item, "PrimaryKey")):
-                primary_key = key
-                primary_key_values = self.dataset[primary_key]
-                break
+        for meta_attribute_key in self.metadata:
+            if (not meta_attribute_key in sample):
+                self.addDataQualityError(DataQualityError(meta_attribute_key, error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Attribute '" + meta_attribute_key + "' was not found in the dataset."))
+        
+        attributes = [meta_attribute_key for meta_attribute_key in self.metadata if (meta_attribute_key in sample)]
+        
+        for start in range(0, len(row_numbers), triage.batch):
+            batch = row_numbers[start:start + triage.batch]
+            self.dataset = {col:values[start:start + triage.batch] for col, values in sample.items()}
+            primary_key_values = self.getPrimaryKeyValues()
+            
+            # without a primary key the errors are reported against the row numbers of the full data
+            if (primary_key_values is None):
+                primary_key_values = ["Row: " + str(row + 1) for row in batch]
+            
+            # each batch is counted in a store of its own and then added to the rest
+            self.validation_errors = store.empty()
+            
+            for meta_attribute_key in attributes:
+                if (not meta_attribute_key in stopped):
+                    self.validateAttribute(self.metadata[meta_attribute_key], meta_attribute_key, primary_key_values)
+                    rows_checked[meta_attribute_key] += len(batch)
+            
+            for (attribute, error_dimension), count in self.validation_errors.counts().items():
+                found[attribute] += count
+                
+            store.extend(self.validation_errors)
+            self.validation_errors = store
+            
+            if (not triage.error_budget is None):
+                stopped.update([meta_attribute_key for meta_attribute_key in attributes if (found[meta_attribute_key] >= triage.error_budget)])
                 
+                if (len(stopped) == len(attributes)):
+                    break
+        
+        # the non-repeating groups are numbered in the order their rows are seen, so the groups are built again from
+        # the rows that were checked in the order of the full data
+        for meta_attribute_key in list(self.group_indexes):
+            order = sorted(range(rows_checked[meta_attribute_key]), key=row_numbers.__getitem__)
+            self.dataset = {col:[values[row] for row in order] for col, values in sample.items()}
+            del self.group_indexes[meta_attribute_key]
+            self.checkNonRepeatingGroups(self.metadata[meta_attribute_key], meta_attribute_key)
+
+        # the rest of the checks that span rows, as at the end of a stream
+        self.streaming = False
+        
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():
+            self.addSpilledKeyErrors(meta_attribute_definition, meta_attribute_key)
+        
+        for meta_attribute_key, group_index in self.group_indexes.items():
+            self.addGroupErrors(self.metadata[meta_attribute_key], meta_attribute_key, group_index)
+        
+        self.group_indexes = {}
+        self.dataset = sample
+        
+        if (not customValidator is None and len(customValidator) > 0):
+            self.customValidator(customValidator)
+        
+        counts = self.errorCounts()
+        
+        for meta_attribute_key in attributes:
+            errors = [(error_dimension, counts[(meta_attribute_key, error_dimension.value)]) for error_dimension in DataQualityDimension if (counts.get((meta_attribute_key, error_dimension.value), 0) > 0)]
+            checked = rows_checked[meta_attribute_key]
+            early = (meta_attribute_key in stopped and checked < len(row_numbers))
+            self.triage_report.append(triage.estimate(meta_attribute_key, "All", sum([count for error_dimension, count in errors]), checked, row_count, early))
+            
+            for error_dimension, count in errors:
+                self.triage_report.append(triage.estimate(meta_attribute_key, error_dimension.value, count, checked, row_count, early))
+        
+        print("Triage: checked " + str(sum(rows_checked.values())) + " values, " + str(len(stopped)) + " attributes reached the error budget.")
+        
+        
+    def validateIncremental(self:object, sidecar:str, customValidator:str=None):
         """
-        Execute a series of validations against the supplied column of data and the metadata for the column.
-        Which validation is run is determined by entries in the metadata.
-        """         
-        for meta_attribute_key, meta_attribute_definition in self.metadata.items():                
-            if (meta_attribute_key in self.dataset):
-                print("Validating attribute \t'" + meta_attribute_key + "'...", end='\r')
-                                
-                attribute = self.dataset[meta_attribute_key]
-                                
-                for row_count in range(len(attribute)):
-                    value = attribute[row_count]
-                    
-                    """ 
-                    If a primarykey tag has been found then output the value so that the user 
-                     has a reference to search for the record in the source system. 
-                     If there is no primary key attribute set then output the row count 
-                    """
-                    
-                    if (not primary_key_values is None):
-                        primary_key_value = primary_key_values[row_count]
-                    else:
-                        primary_key_value = "Row: " + str(row_count+1)
-                    
-                    self.checkMandatory(meta_attribute_definition, meta_attribute_key, value, primary_key_value)                  
-                    self.checkSize(meta_attribute_definition, meta_attribute_key, value, primary_key_value)
-                    self.checkType(meta_attribute_definition, meta_attribute_key, value, primary_key_value)
-                    self.checkEnum(meta_attribute_definition, meta_attribute_key, value, primary_key_value)
-                    self.checkStartsWith(meta_attribute_definition, meta_attribute_key, value, primary_key_value)
+        Validate the dataset using the sidecar file of the previous run (see RowCache) and then replace the sidecar.
+        Only the rows with a fingerprint that the previous run didn't see are checked, and the row level errors of
+        the rest are taken from the sidecar. If the rows of the previous run are unchanged and any new rows have been
+        appended to them, the Unique, Composite and NonRepeatingGroup checks only add the new rows to their stored
+        indexes, otherwise they are run over every row. The errors are the same, in the same order, as validate.
+        """
+        if (self.metadata is None):
+            raise ValidationError("LANG Exception: meta-data has not been set", None)
+        elif (self.dataset is None):
+            raise ValidationError("LANG Exception: resultset has not been set", None)
 
+        self.resetState()
+        dataset = self.dataset
+        primary_key_values = self.getPrimaryKeyValues()
+        columns = sorted([col for col in MetaUtils.referencedColumns(self.metadata) if (col in dataset)])
+        signature = RowCache.signatureOf(self.metadata, self.format_engine.backend, self.format_engine.timeout)
+        previous = RowCache.load(sidecar, signature, columns)
+        cache = RowCache(signature, columns)
+        cache.fingerprints = RowCache.fingerprintRows(zip(*[dataset[col] for col in columns]))
+        fingerprints = cache.fingerprints
+        
+        if (previous is None):
+            previous = RowCache(signature, columns)
+            unchanged = 0
+            appended = False
+        else:
+            unchanged = previous.unchangedRows(fingerprints)
+            appended = (unchanged == len(previous.fingerprints))
+        
+        # a row needs checking unless it is unchanged or has the fingerprint of a row that the last run had errors for
+        old = previous.fingerprints
+        known = previous.entries
+        pending = {}
+        
+        for row_count in range(unchanged, len(fingerprints)):
+            fingerprint = fingerprints[row_count]
+            
+            if (not (row_count < len(old) and old[row_count] == fingerprint) and not fingerprint in known):
+                pending.setdefault(fingerprint, row_count)
+        
+        print("Validating " + str(len(pending)) + " new or changed rows of " + str(len(fingerprints)) + ".")
+        known.update(self.checkRowEntries(pending))
+        
+        # the rows that have errors for each attribute, in row order
+        error_rows = {}
+        
+        for row_count, fingerprint in enumerate(fingerprints):
+            entry = known.get(fingerprint)
+            
+            if (not entry is None):
+                cache.entries[fingerprint] = entry
                 
-                # format check (must provide a regex)
-                if (MetaUtils.exists(meta_attribute_definition, "Format")):
-                        re.purge()
-                        regex=re.compile(meta_attribute_definition["Format"])
-                        
-                        for row_count in range(len(attribute)):
-                            if (not primary_key_values is None):
-                                primary_key_value = primary_key_values[row_count]
-                            else:
-                                primary_key_value = "Row: " + str(row_count+1)
-                        
-                            value = attribute[row_count]
-                            #if the value is blank then ignore it
-                            
-                            if ( not (MetaUtils.isBlankOrNull(value))) :
-                            
-                                isMatch = (not regex.match(value) is None)
-                            
-                                if (not isMatch):
-                                    self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.FORMATCONSISTENCY.value, description="Error: Value '" + value + "' does not match regex #'" + meta_attribute_definition["Format"] + "'"))
-
-                   
-                # unique field check        
-                if (MetaUtils.isTrue(meta_attribute_definition, "Unique") ):
-                    # quick count the number of times values occurs in the column. Assumes possibly sorted so breaks the loop if >1 occurences to save time0
-                    seen = set()          
-
-                    for row_count in range(len(attribute)):
-                        if (not primary_key_values is None):
-                            primary_key_value = primary_key_values[row_count]
-                        else:
-                            primary_key_value = "Row: " + str(row_count+1)
+                for meta_attribute_key, errors in entry.items():
+                    error_rows.setdefault(meta_attribute_key, []).append((row_count, errors))
+        
+        # the rows the stored indexes haven't seen
+        start = (len(old) if appended else 0)
+        tail = (dataset if start == 0 else {col:dataset[col][start:] for col in columns})
+        composite_duplicates = {}
+        
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():
+            if (not meta_attribute_key in dataset):
+                self.addDataQualityError(DataQualityError(meta_attribute_key, error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Attribute '" + meta_attribute_key + "' was not found in the dataset."))
+                continue
+            
+            print("Validating attribute \t'" + meta_attribute_key + "'...", end='\r')
+            attribute = dataset[meta_attribute_key]
+            errors = error_rows.get(meta_attribute_key, [])
+            
+            for row_count, (specs, template, outcome) in errors:
+                if (len(specs) > 0):
+                    self.addErrorSpecs(meta_attribute_key, specs, self.getPrimaryKeyValue(primary_key_values, row_count))
+            
+            for row_count, (specs, template, outcome) in errors:
+                if (not template is None):
+                    self.addError(meta_attribute_key, DataQualityDimension.FORMATCONSISTENCY.value, template, attribute[row_count])
+            
+            if (MetaUtils.isTrue(meta_attribute_definition, "Unique")):
+                state = (previous.unique.get(meta_attribute_key) if appended else None)
+                index, duplicates = ((self.newKeyIndex(), []) if state is None else state)
+                values = (attribute if state is None else tail[meta_attribute_key])
+                duplicates = duplicates + self.addKeys(index, values, [values], meta_attribute_key) + index.resolve()
+                self.addUniqueErrors(meta_attribute_key, duplicates)
+                cache.unique[meta_attribute_key] = (None if index.spilled() else (index, duplicates))
+            
+            if (MetaUtils.exists(meta_attribute_definition, "Composite")):
+                composite = self.getCompositeColumns(meta_attribute_definition, meta_attribute_key)
+                
+                # attributes with the same composite key share the index
+                if (not composite in composite_duplicates):
+                    state = (previous.composite.get(composite) if appended else None)
+                    index, duplicates = ((self.newKeyIndex(), []) if state is None else state)
+                    rows = (dataset if state is None else tail)
+                    duplicates = duplicates + self.addKeys(index, rows, [SQLTools.getColValues(rows, col) for col in composite], "+".join(composite)) + index.resolve()
+                    composite_duplicates[composite] = duplicates
+                    cache.composite[composite] = (None if index.spilled() else (index, duplicates))
                     
-                        value = attribute[row_count]
-
-                        if (not value in seen):
-                            seen.add(value) #only process a value once 
-                        else:    
-                            self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.UNIQUENESS.value, description="Error: Value '" + value + "' is not UNIQUE. A unique value was expected."))
-                            
-                self.checkComposite(meta_attribute_definition, meta_attribute_key)
+                self.addCompositeErrors(meta_attribute_definition, meta_attribute_key, composite, composite_duplicates[composite])
+            
+            if (MetaUtils.exists(meta_attribute_definition, "NonRepeatingGroup")):
+                state = (previous.groups.get(meta_attribute_key) if appended else None)
+                self.group_indexes[meta_attribute_key] = (GroupIndex(self.spill_dir) if state is None else state)
+                self.dataset = (dataset if state is None else tail)
                 self.checkNonRepeatingGroups(meta_attribute_definition, meta_attribute_key)
+                self.dataset = dataset
+                cache.groups[meta_attribute_key] = (self.group_indexes[meta_attribute_key] if self.spill_dir is None else None)
+            
+            if (MetaUtils.exists(meta_attribute_definition, "Expression")):
+                # a missing column is an error even if there are no rows to check
+                self.getExpressionColumns(self.getExpression(meta_attribute_definition, meta_attribute_key))
                 
-                # expression evaluation is different to processing field specific validations as it could link in other columns from the resultset
-                self.evaluateExpression(meta_attribute_definition, meta_attribute_key)
-
-                print("Validating attribute \t'" + meta_attribute_key + "'...\t\t..Complete.")
-            else:
-                self.addDataQualityError(DataQualityError(meta_attribute_key, error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Attribute '" + meta_attribute_key + "' was not found in the dataset."))
+                for row_count, (specs, template, outcome) in errors:
+                    self.addExpressionError(meta_attribute_key, outcome)
+                
+            print("Validating attribute \t'" + meta_attribute_key + "'...\t\t..Complete.")
+        
+        self.group_indexes = {}
         
         # only invoke the custom validator if one has been provoded
         if (not customValidator is None and len(customValidator) > 0):
             self.customValidator(customValidator)
         
+        cache.counts = self.errorCounts()
+        
+        if (not previous.counts is None):
+            print(str(sum(cache.counts.values())) + " errors, " + str(sum(previous.counts.values())) + " in the previous run.")
+        
+        cache.save(sidecar)
+        
+        
+    def checkRowEntries(self:object, rows:dict) -> dict:
+        """
+        Run the row level checks against some rows of the dataset, given as {fingerprint:row number}. For each
+        fingerprint with errors this returns {attribute:(error specs, Format template, Expression outcome)}.
+        """
+        found = {}
+        
+        if (len(rows) == 0):
+            return found
+        
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():
+            if (not meta_attribute_key in self.dataset):
+                continue
+                
+            attribute = self.dataset[meta_attribute_key]
+            plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+            format = MetaUtils.exists(meta_attribute_definition, "Format")
+            expression = None
+            
+            if (MetaUtils.exists(meta_attribute_definition, "Expression")):
+                expression = self.getExpression(meta_attribute_definition, meta_attribute_key)
+                columns = self.getExpressionColumns(expression)
+            
+            for fingerprint, row_count in rows.items():
+                value = attribute[row_count]
+                specs = (plan.checkValue(value) if plan.row_checks else [])
+                template = (plan.checkFormat(value) if format else None)
+                outcome = (None if expression is None else expression.evaluate(tuple([col[row_count] for col in columns])))
+                
+                if (len(specs) > 0 or not template is None or not outcome is None):
+                    found.setdefault(fingerprint, {})[meta_attribute_key] = (specs, template, outcome)
+                    
+        return found
+        
+        
+    def validateParallel(self:object, workers:int):
+        """
+        Validate the attributes in a pool of worker processes. The attributes are dealt round robin into one group
+        per worker and each worker is sent only the columns its group needs - the attributes themselves, the primary
+        key and any Composite, NonRepeatingGroup or Expression columns. The errors for each attribute are then added
+        in metadata order so the result is the same as validating the attributes one after another.
+        """
+        keys = [meta_attribute_key for meta_attribute_key in self.metadata if (meta_attribute_key in self.dataset)]
+        workers = min(workers, len(keys))
+        groups = [keys[worker::workers] for worker in range(workers)]
+        primary_key = self.getPrimaryKey()
+        # the workers keep their errors in the same kind of store (e.g. a CounterStore in counters-only mode)
+        store = (self.validation_errors.empty() if isinstance(self.validation_errors, ErrorStore) else ErrorStore())
+        attribute_errors = {}
+        
+        with ProcessPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = []
+            
+            for group in groups:
+                meta = {meta_attribute_key:self.metadata[meta_attribute_key] for meta_attribute_key in group}
+                columns = MetaUtils.referencedColumns(meta) | ({primary_key} if not primary_key is None else set())
+                dataset = {col:self.dataset[col] for col in self.dataset if col in columns}
+                futures.append(executor.submit(type(self).validateGroup, dataset, meta, primary_key, store, self.spill_dir, self.distinct, self.format_engine.empty(), self.key_budget, self.bloom))
+                
+            for future in futures:
+                errors, format_engine, spilled_keys = future.result()
+                attribute_errors.update(errors)
+                self.spilled_keys.update(spilled_keys)
+                self.format_engine.mergeStats(format_engine.stats, format_engine.patterns)
+        
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():                
+            if (meta_attribute_key in attribute_errors):
+                self.validation_errors.extend(attribute_errors[meta_attribute_key])
+                print("Validating attribute \t'" + meta_attribute_key + "'...\t\t..Complete.")
+            else:
+                self.addDataQualityError(DataQualityError(meta_attribute_key, error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Attribute '" + meta_attribute_key + "' was not found in the dataset."))
+        
+        
+    @classmethod
+    def validateGroup(cls, dataset:dict, meta:dict, primary_key:str, store:ErrorStore, spill_dir:str=None, distinct:bool=False, format_engine:FormatEngine=None, key_budget:int=None, bloom:int=None) -> tuple:
+        """
+        Validate a group of attributes in a worker process, returning the errors for each attribute keyed on the attribute name,
+        the FormatEngine with the Format timings and the keys that were spilled to disk (see addKeys). Each attribute's errors
+        are kept in a new store of the same kind as store.
+        """
+        validator = cls(dataset, meta)
+        validator.spillTo(spill_dir)
+        validator.boundKeys(key_budget, bloom)
+        validator.distinctValues(distinct)
+        
+        if (not format_engine is None):
+            validator.format_engine = format_engine
+        primary_key_values = (None if primary_key is None else dataset[primary_key])
+        attribute_errors = {}
+        
+        for meta_attribute_key, meta_attribute_definition in meta.items():
+            validator.validation_errors = store.empty()
+            validator.validateAttribute(meta_attribute_definition, meta_attribute_key, primary_key_values)
+            attribute_errors[meta_attribute_key] = validator.validation_errors
+            
+        return (attribute_errors, validator.format_engine, validator.spilled_keys)
+        
+        
+    def validateStream(self:object, chunks, customValidator:str=None):
+        """
+        Validate a stream of data chunks (for example from FileTools.csvFileChunks) against the metadata.
+        Each chunk is a dictionary of lists keyed on the column name. The per-row checks are run one chunk at a time
+        and only the state that spans chunks (Unique and Composite values, NonRepeatingGroup indexes) is retained,
+        so the memory used depends on the chunk size rather than the size of the data.
+        The custom validator, if provided, is invoked once per chunk.
+        """
+        if (self.metadata is None):
+            raise ValidationError("LANG Exception: meta-data has not been set", None)
+        elif (chunks is None):
+            raise ValidationError("LANG Exception: resultset has not been set", None)
+
+        if (not self.triage is None):
+            self.validateSample(*self.triage.sampleChunks(chunks), customValidator)
+            self.dataset = {}
+            return
+        
+        self.resetState()
+        self.streaming = True
+        first_chunk = True
+        
+        for chunk in chunks:
+            self.dataset = chunk
+            primary_key_values = self.getPrimaryKeyValues()
+            
+            for meta_attribute_key, meta_attribute_definition in self.metadata.items():                
+                if (meta_attribute_key in self.dataset):
+                    self.validateAttribute(meta_attribute_definition, meta_attribute_key, primary_key_values)
+                elif (first_chunk):
+                    self.addDataQualityError(DataQualityError(meta_attribute_key, error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Attribute '" + meta_attribute_key + "' was not found in the dataset."))
+            
+            if (not customValidator is None and len(customValidator) > 0):
+                self.customValidator(customValidator)
+
+            first_chunk = False
+            self.row_offset += SQLTools.rowCount(self.dataset)
+            print("Validated " + str(self.row_offset) + " rows...", end='\r')
+        
+        print("Validated " + str(self.row_offset) + " rows.")
+        
+        # the non-repeating group check needs to see every row so it is run once all of the chunks have been read,
+        # as are the Unique and Composite checks once their keys have been spilled
+        self.streaming = False
+        
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():
+            self.addSpilledKeyErrors(meta_attribute_definition, meta_attribute_key)
+        
+        for meta_attribute_key, group_index in self.group_indexes.items():
+            self.addGroupErrors(self.metadata[meta_attribute_key], meta_attribute_key, group_index)
+        
+        self.dataset = {}
+        self.group_indexes = {}
+        
+        
+    def getPrimaryKeyValues(self:object) -> list:
+        """
+        Change request: find and output the primary key in the error report file if specified
+        """
+        primary_key = self.getPrimaryKey()
+        
+        if (not primary_key is None):
+            return self.dataset[primary_key]
+                
+        return None
+        
         
+    def getPrimaryKey(self:object) -> str:
+        """
+        The name of the primary key attribute, or None if there isn't one.
+        """
+        for key, item in self.metadata.items():                
+            if (MetaUtils.isTrue(item, "PrimaryKey")):
+                return key
+                
+        return None
+        
+        
+    def getPrimaryKeyValue(self:object, primary_key_values:list, row_count:int) -> str:
+        """ 
+        If a primarykey tag has been found then output the value so that the user 
+        has a reference to search for the record in the source system. 
+        If there is no primary key attribute set then output the row count 
+        """
+        if (not primary_key_values is None):
+            return primary_key_values[row_count]
+        
+        return "Row: " + str(self.row_offset+row_count+1)
+        
+        
+    def getRulePlan(self:object, meta_attribute_definition:dict, meta_attribute_key:str) -> RulePlan:
+        """
+        The metadata for an attribute is compiled once per validation, not once per chunk.
+        """
+        if (not meta_attribute_key in self.rule_plans):
+            self.rule_plans[meta_attribute_key] = RulePlan(meta_attribute_definition, meta_attribute_key, self.format_engine)
+            
+        return self.rule_plans[meta_attribute_key]
+        
+        
+    def validateAttribute(self:object, meta_attribute_definition:dict, meta_attribute_key:str, primary_key_values:list):
+        """
+        Run every check that applies to a single attribute of the current dataset.
+        """
+        attribute = self.dataset[meta_attribute_key]
+        plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+        
+        # typed columns have already parsed their values so the type check doesn't need to parse them again
+        typed = ( isinstance(attribute, TypedColumn) and MetaUtils.exists(meta_attribute_definition, "Type") and attribute.matches(meta_attribute_definition["Type"]) )
+        
+        # the mandatory, size, type, enum and startswith checks. This is skipped altogether if none of them apply
+        if (plan.row_checks):
+            self.checkRows(plan, attribute, typed, primary_key_values)
+        
+        self.checkFormat(meta_attribute_definition, meta_attribute_key, attribute, plan)
+        self.checkUnique(meta_attribute_definition, meta_attribute_key, attribute)
+        self.checkComposite(meta_attribute_definition, meta_attribute_key)
+        self.checkNonRepeatingGroups(meta_attribute_definition, meta_attribute_key)
+        
+        # expression evaluation is different to processing field specific validations as it could link in other columns from the resultset
+        self.evaluateExpression(meta_attribute_definition, meta_attribute_key)
+        
+        
+    def checkRows(self:object, plan:RulePlan, attribute, typed:bool, primary_key_values:list):
+        """
+        Run the row level checks of a rule plan against every value of an attribute.
+        """
+        if (self.distinct):
+            self.checkDistinctRows(plan, attribute, primary_key_values)
+            return
+        
+        number = None
+        
+        for row_count in range(len(attribute)):
+            value = attribute[row_count]
+            
+            if (typed):
+                number = attribute.number(row_count)
+            
+            errors = plan.checkValue(value, number)
+            
+            if (len(errors) > 0):
+                self.addErrorSpecs(plan.attribute, errors, self.getPrimaryKeyValue(primary_key_values, row_count))
+        
+        
+    def checkDistinctRows(self:object, plan:RulePlan, attribute, primary_key_values:list):
+        """
+        Run the row level checks once for each distinct value of an attribute and then add the errors to the rows
+        that have a value with errors. A typed value gives the same errors whether or not it has been parsed.
+        """
+        verdicts = {}
+        
+        for value in dict.fromkeys(attribute):
+            errors = plan.checkValue(value)
+            
+            if (len(errors) > 0):
+                verdicts[value] = errors
+        
+        if (len(verdicts) == 0):
+            return
+        
+        for row_count, value in enumerate(attribute):
+            errors = verdicts.get(value)
+            
+            if (not errors is None):
+                self.addErrorSpecs(plan.attribute, errors, self.getPrimaryKeyValue(primary_key_values, row_count))
+        
+        
+    def addErrorSpecs(self:object, meta_attribute_key:str, errors:list, primary_key_value:str):
+        for error_dimension, template, value in errors:
+            self.addError(meta_attribute_key, error_dimension, template, value, primary_key_value)
+
+
+    def checkPlanned(self:object, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str, templates:list, number=None):
+        """
+        Run the row level checks of the rule plan against a single value and add the errors of the checks with the given
+        templates (see RulePlan). The check methods below are kept for callers that check one value at a time.
+        """
+        plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+        errors = [spec for spec in plan.checkValue(value, number) if any(spec[1] is template for template in templates)]
+
+        self.addErrorSpecs(meta_attribute_key, errors, primary_key_value)
+
+
     def checkMandatory(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
-        # mandatory field check
-        if (MetaUtils.isTrue(meta_attribute_definition, "Mandatory") ):
-            if ( (MetaUtils.isBlankOrNull(value)) and (not MetaUtils.isAllowBlank(meta_attribute_definition)) ):
-                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.COMPLETENESSMANDATORY.value,description="Error: Mandatory field is BLANK or NULL. A value is required.", primary_key_value=primary_key_value))                             
-        else:
-            # optional field check. According to LANG optional fields shpuld contain some sort of default value
-            # i.e. no field shpould ever be blank or NULL.
-            if ( (MetaUtils.isBlankOrNull(value)) and (not MetaUtils.isAllowBlank(meta_attribute_definition)) ):
-                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.COMPLETENESSOPTIONAL.value, description="Error: Optional field is BLANK or NULL. A default value is required.", primary_key_value=primary_key_value))
+        # mandatory / optional field check
+        plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+
+        if (not plan.blank_spec is None):
+            self.checkPlanned(meta_attribute_definition, meta_attribute_key, value, primary_key_value, [plan.blank_spec[1]])
+
+
+    def checkSize(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
+        # field length check
+        plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+
+        if (not plan.size is None):
+            self.checkPlanned(meta_attribute_definition, meta_attribute_key, value, primary_key_value, [plan.size_template])
+
+
+    def checkType(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str, number=None):
+        # field type check, followed by the range check of a valid value
+        plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+        self.checkPlanned(meta_attribute_definition, meta_attribute_key, value, primary_key_value, [plan.type_template, plan.min_template, plan.max_template], number)
+
+
+    def checkMinMax(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
+        # field value range check, whatever the type of the value
+        errors = []
+        self.getRulePlan(meta_attribute_definition, meta_attribute_key).checkMinMax(value, None, errors)
+
+        self.addErrorSpecs(meta_attribute_key, errors, primary_key_value)
+
+
+    def checkEnum(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
+        # enumerated field check
+        plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+
+        if (not plan.enum is None):
+            self.checkPlanned(meta_attribute_definition, meta_attribute_key, value, primary_key_value, [plan.enum_template])
+
+
+    def checkStartsWith(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
+        # starts with check
+        plan = self.getRulePlan(meta_attribute_definition, meta_attribute_key)
+
+        if (not plan.starts_with is None):
+            self.checkPlanned(meta_attribute_definition, meta_attribute_key, value, primary_key_value, [plan.starts_with_template])
+
+
+    def checkFormat(self, meta_attribute_definition:dict, meta_attribute_key:str, attribute:list, plan:RulePlan=None):
+        # format check (must provide a regex). The regex is compiled once by the rule plan
+        if (MetaUtils.exists(meta_attribute_definition, "Format")):
+            plan = (self.getRulePlan(meta_attribute_definition, meta_attribute_key) if plan is None else plan)
+            started = time.perf_counter()
+            
+            if (self.distinct):
+                # match each distinct value once and only look up the rest
+                distinct_values = list(dict.fromkeys(attribute))
+                failing = {value:template for value, template in zip(distinct_values, map(plan.checkFormat, distinct_values)) if not template is None}
+                plan.format.addTime(len(distinct_values), time.perf_counter() - started)
+                templates = map(failing.get, attribute)
+            else:
+                #if the value is blank then ignore it
+                templates = list(map(plan.checkFormat, attribute))
+                plan.format.addTime(len(templates), time.perf_counter() - started)
+            
+            for value, template in zip(attribute, templates):
+                if (not template is None):
+                    self.addError(meta_attribute_key, DataQualityDimension.FORMATCONSISTENCY.value, template, value)
+
+
+    def checkUnique(self, meta_attribute_definition:dict, meta_attribute_key:str, attribute:list):
+        # unique field check        
+        if (MetaUtils.isTrue(meta_attribute_definition, "Unique") ):
+            # the values seen so far are kept between chunks when the data is streamed
+            index = self.unique_values.get(meta_attribute_key)
+            
+            if (index is None):
+                index = self.unique_values[meta_attribute_key] = self.newKeyIndex()
+            
+            self.addUniqueErrors(meta_attribute_key, self.addKeys(index, attribute, [attribute], meta_attribute_key))
+            
+            if (not self.streaming and index.spilled()):
+                self.addUniqueErrors(meta_attribute_key, index.resolve())
+                
                 
+    def addKeys(self, index:KeyIndex, dataset:dict, columns:list, name:str) -> list:
+        """
+        Add the keys of a dataset to a key index (see KeyIndex.add), recording in spilled_keys the number of keys it held
+        when it spilled to disk so the caller can report it.
+        """
+        spilled = index.spilled()
+        duplicates = index.add(dataset, columns)
+        
+        if (not spilled and index.spilled()):
+            self.spilled_keys[name] = index.spill_count
+        
+        return duplicates
+        
+        
+    def addUniqueErrors(self, meta_attribute_key:str, duplicates:list):
+        for value in duplicates:
+            self.addError(meta_attribute_key, DataQualityDimension.UNIQUENESS.value, DUQValidator.UNIQUE_TEMPLATE, value)
+                    
             
     def checkComposite(self, meta_attribute_definition:dict, meta_attribute_key:str):
         # unique field check
         if (MetaUtils.exists(meta_attribute_definition, "Composite")):
-            # sum the number of times value appears in the row. this is faster than using list.count(value)
-            list_of_attribute_keys = meta_attribute_definition["Composite"]
-            attribute_keys = '+'.join(map(str, list_of_attribute_keys))
-            attribute_keys = attribute_keys.replace("%1", meta_attribute_key)
+            columns = self.getCompositeColumns(meta_attribute_definition, meta_attribute_key)
+            
+            # the keys seen so far are kept between chunks when the data is streamed and are shared by
+            # every attribute with the same composite key
+            index = self.composite_keys.get(columns)
+            
+            if (index is None):
+                index = self.composite_keys[columns] = self.newKeyIndex()
+            
+            duplicates = self.addKeys(index, self.dataset, [SQLTools.getColValues(self.dataset, col) for col in columns], "+".join(columns))
+            self.addCompositeErrors(meta_attribute_definition, meta_attribute_key, columns, duplicates)
+            
+            if (not self.streaming and index.spilled()):
+                self.addCompositeErrors(meta_attribute_definition, meta_attribute_key, columns, index.resolve())
                 
-            # populate a dictionary of just the values that are required to create the composite meta_attribute_key
-            attribute_data={}
-            for col in list_of_attribute_keys:
-                col = col.replace("%1", meta_attribute_key)
-                attribute_data[col]=SQLTools.getColValues(self.dataset, col)
-                        
-            seen=set()
-            rowindex=0
-            # convert the dictionary of columns into a list of tuples
-            fields=[dict(zip(attribute_data, col)) for col in zip(*attribute_data.values())]
-            
-            # check to see if there is are any duplicates in the order of attribute_keys provided
-            for row in fields:
-                # join the values from the columns that make up the composite meta_attribute_key to form a single value
-                composite_key = '|'.join(map(str, row.values()))
-                if (composite_key in seen):
-                    self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.UNIQUENESS.value, description="Error: Duplicate composite meta_attribute_key: '" + attribute_keys + "', values: '" + composite_key + "'", primary_key_value=composite_key))
-                else:
-                    seen.add(composite_key)
+                
+    def getCompositeColumns(self, meta_attribute_definition:dict, meta_attribute_key:str) -> tuple:
+        """
+        The columns that make up the composite key, in the order provided.
+        """
+        return tuple(dict.fromkeys([col.replace("%1", meta_attribute_key) for col in meta_attribute_definition["Composite"]]))
+        
+        
+    def addCompositeErrors(self, meta_attribute_definition:dict, meta_attribute_key:str, columns:tuple, duplicates:list):
+        attribute_keys = '+'.join(map(str, meta_attribute_definition["Composite"]))
+        attribute_keys = attribute_keys.replace("%1", meta_attribute_key)
+        template=("Error: Duplicate composite meta_attribute_key: '" + attribute_keys + "', values: '", "'")
+        
+        for key in duplicates:
+            # join the values from the columns that make up the composite meta_attribute_key to form a single value
+            composite_key = ('|'.join(map(str, key)) if len(columns) > 1 else str(key))
+            self.addError(meta_attribute_key, DataQualityDimension.UNIQUENESS.value, template, composite_key, composite_key)
+            
+            
+    def addSpilledKeyErrors(self, meta_attribute_definition:dict, meta_attribute_key:str):
+        """
+        Add the Unique and Composite errors that were left in the spilled keys at the end of a stream.
+        """
+        index = self.unique_values.get(meta_attribute_key)
+        
+        if (not index is None and index.spilled()):
+            self.addUniqueErrors(meta_attribute_key, index.resolve())
+        
+        if (MetaUtils.exists(meta_attribute_definition, "Composite")):
+            columns = self.getCompositeColumns(meta_attribute_definition, meta_attribute_key)
+            index = self.composite_keys.get(columns)
+            
+            if (not index is None and index.spilled()):
+                self.addCompositeErrors(meta_attribute_definition, meta_attribute_key, columns, index.resolve())
 
                
     def checkNonRepeatingGroups(self, meta_attribute_definition:dict, meta_attribute_key:str):
@@ -191,206 +846,96 @@ class DUQValidator(AbstractDUQValidator):
             if (len(list_of_attribute_keys) < 2):
                 raise ValidationError("LANG Exception: " + meta_attribute_key + " - NonRepeatingGroup tag requires at least 2 attributes to be defined. Please refer to the documentation.", None)
             
-            attribute_keys = '+'.join(map(str, list_of_attribute_keys))
-            attribute_keys = attribute_keys.replace("%1", meta_attribute_key)
-
             # populate a dictionary of just the values that are required to create the non-repeating group meta_attribute_key
             attribute_data={}
+            
             for col in list_of_attribute_keys:
                 col = col.replace("%1", meta_attribute_key)
                 attribute_data[col]=SQLTools.getColValues(self.dataset, col)
-                                   
-            # convert the dictionary of columns into a list of tuples
-            fields=[dict(zip(attribute_data, col)) for col in zip(*attribute_data.values())]
-            
-            # find all the repeating values (X in our speudo code above)
-            x_groups_count = Counter(attribute_data[meta_attribute_key])
-            
-            # iterate through the repeating groups of X values, ignore any single row counts
-            for value, count in x_groups_count.items():
-                if (count>1):
-                    seen={}
-                    rowindex=0
-                    
-                    # find records whose starting row valu ematches the repeating group value
-                    for row in fields:
-                        val = next(iter(row.values()))
-                        
-                        if (val == value):
-                            non_group = list(row.values())
-                            
-                            # join the values from the columns that make up the composite meta_attribute_key to form a single value
-                            nonrepeatinggroup_key = '|'.join(map(str, non_group))
-                            if (not nonrepeatinggroup_key in seen.values()):
-                                seen[str(rowindex)+":"+str(value)]=nonrepeatinggroup_key
-                                rowindex+=1
-             
-                    # only output to the error file if we have more than 1 row 
-                    if (rowindex > 1):
-                        for nonrepeatinggroup_key, value in seen.items():
-                            self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.UNIQUENESS.value, description="Error: Non-repeating group found.  meta_attribute_key: '" + nonrepeatinggroup_key + "-> " + attribute_keys + "', values: '" + value + "'", primary_key_value=meta_attribute_key))           
-           
-                        
-    def checkSize(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
-        # field length check
-        if (MetaUtils.exists(meta_attribute_definition, "Size")):
-            if ( (len(value) > int(meta_attribute_definition["Size"])) and (not MetaUtils.isBlankOrNull(value)) ):
-                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value '" + value + "' is longer than size '" + str(meta_attribute_definition["Size"]) + "'", primary_key_value=primary_key_value))
-                
             
-    def checkType(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
-        # field type check
-        is_valid_type = True
-
-        if (MetaUtils.exists(meta_attribute_definition, "Type")):
-            # if a default value has been specified then ignore the type check if the value matches the default
-            if (MetaUtils.exists(meta_attribute_definition, "Default")):
-                if (value==meta_attribute_definition["Default"]):
-                    is_valid_type = False
-            
-            if (meta_attribute_definition["Type"] in ["int","integer"]):
-                if ( (MetaUtils.isBlankOrNull(value)) or (not MetaUtils.isInt(value)) ):
-                    if (not MetaUtils.isAllowBlank(meta_attribute_definition)):
-                        self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value '" + value + "' is not an int. An int was expected",primary_key_value=primary_key_value))
-                        is_valid_type = False
-            elif (meta_attribute_definition["Type"] in ["float","number"]):
-                if ( (MetaUtils.isBlankOrNull(value)) or (not MetaUtils.isFloat(value)) ): 
-                    if (not MetaUtils.isAllowBlank(meta_attribute_definition)):
-                        self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value '" + value + "' is not a float. A float was expected",primary_key_value=primary_key_value))
-                        is_valid_type = False
-            elif (meta_attribute_definition["Type"] in ["bool","boolean"]):
-                if ( (MetaUtils.isBlankOrNull(value)) or (not value.lower() in ["false", "true", "f", "t", "n", "y", "no", "yes", "0", "1"]) ): 
-                    if (not MetaUtils.isAllowBlank(meta_attribute_definition)):
-                        self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value '" + value + "' is not a boolean. A boolean was expected",primary_key_value=primary_key_value))
-                        is_valid_type = False
-                    
-            # given that min and max checks only apply to int and float values we may as well test for them now
-            if (is_valid_type):
-                self.checkMinMax(meta_attribute_definition, meta_attribute_key, value, primary_key_value)
-                
-
-    def checkMinMax(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
-        # field value range check (int and float only although in theory we could specify min and max ranges for other attributes)
-        min = -1
-        max = -1
-        val = -1
-        default = -1
-        
-        if (MetaUtils.exists(meta_attribute_definition, "Min")):
-            try:
-                min = float(meta_attribute_definition["Min"])
-            except Exception as e:
-                pass
-        
-        if (MetaUtils.exists(meta_attribute_definition, "Max")):
-            try:
-                max = float(meta_attribute_definition["Max"])
-            except Exception as e:
-                pass
-
-        if (MetaUtils.exists(meta_attribute_definition, "Default")):
-            try:
-                default = float(meta_attribute_definition["Default"])
-            except Exception as e:
-                pass
-
-        try:
-            val = float(value)
-        except Exception as e:
-            pass
-
-        if (min != -1):
-            if (val != -1 and val < min and val != default):
-                # error
-                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value '" + value + "' must be >= " + str(min), primary_key_value=primary_key_value))
+            # when streaming, the group can only be checked once every row has been seen so the
+            # index is kept between chunks and the errors are added at the end
+            group_index = self.group_indexes.get(meta_attribute_key)
             
+            if (group_index is None):
+                group_index = GroupIndex(self.spill_dir)
                 
-        if (max != -1):
-            if (val != -1 and val > max and val != default):
-                # error
-                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value '" + value + "' must be <= " + str(max), primary_key_value=primary_key_value))
+                if (self.streaming):
+                    self.group_indexes[meta_attribute_key] = group_index
             
-
-    def checkEnum(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
-        # enumerated field check
-        if (MetaUtils.exists(meta_attribute_definition, "Enum")):
-            # enum is expected to be a list
-            enum = meta_attribute_definition["Enum"]
-
-            if (MetaUtils.exists(meta_attribute_definition, "Default")):
-                if (value==meta_attribute_definition["Default"]):
-                    # if trhe value equals the default then do nothing
-                    return
+            group_index.add(attribute_data[meta_attribute_key], list(attribute_data.values()))
+            
+            if (not self.streaming):
+                self.addGroupErrors(meta_attribute_definition, meta_attribute_key, group_index)
+                
+                
+    def addGroupErrors(self, meta_attribute_definition:dict, meta_attribute_key:str, group_index:GroupIndex):
+        """
+        Report every distinct key of each non-repeating group found by the NonRepeatingGroup check.
+        """
+        attribute_keys = '+'.join(map(str, meta_attribute_definition["NonRepeatingGroup"]))
+        attribute_keys = attribute_keys.replace("%1", meta_attribute_key)
+        
+        for value, keys in group_index.groups():
+            for rowindex, nonrepeatinggroup_key in enumerate(keys):
+                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.UNIQUENESS.value, description="Error: Non-repeating group found.  meta_attribute_key: '" + str(rowindex) + ":" + str(value) + "-> " + attribute_keys + "', values: '" + nonrepeatinggroup_key + "'", primary_key_value=meta_attribute_key))           
            
-            # check that the value exists within the provided list. If the value is blank then ignore it 
-            # as we should have picked it up in the mandatory/optional test anyway
-            # (i.e. if the field is optional but a value has been provided then we check it against the supplied list)
-            if ( (len(value)>0) and (value not in enum) and (value != "(Null)") ):
-                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value '" + value + "' is outside the enumeration set '" + str(enum) + "'", primary_key_value=primary_key_value))
-
-
-
-    def checkStartsWith(self, meta_attribute_definition:dict, meta_attribute_key:str, value:str, primary_key_value:str):
-        # enumerated field check
-        if (MetaUtils.exists(meta_attribute_definition, "StartsWith")):
-            # startsWith is expected to be a list
-            startsWith = meta_attribute_definition["StartsWith"]
-            
-            # check that the value exists within the provided list. If the value is blank then ignore it 
-            # as we should have picked it up in the mandatory/optional test anyway
-            # (i.e. if the field is optional but a value has been provided then we check it against the supplied list)
-            if ( (len(value)>0) and (value != "(Null)") ):
-                found = False
-                for s in startsWith:
-                    if value.startswith(s):
-                        found = True
-                        break
                         
-                if (not found):
-                    self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.FORMATCONSISTENCY.value, description="Error: Value '" + value + "' does not begin with any of: '" + str(startsWith) + "'", primary_key_value=primary_key_value))
-
-
-
-
-            
     def evaluateExpression(self, meta_attribute_definition:dict, meta_attribute_key:str):
-        # evaluate any custom expressions
+        # evaluate any custom expressions. The expression is parsed once and then evaluated for each row (see CompiledExpression)
         if (MetaUtils.exists(meta_attribute_definition, "Expression")):
-            expr = meta_attribute_definition["Expression"]
+            expression = self.getExpression(meta_attribute_definition, meta_attribute_key)
+            self.checkExpression(expression, meta_attribute_key, self.getExpressionColumns(expression))
+            
             
+    def getExpressionColumns(self:object, expression:CompiledExpression) -> list:
+        """
+        The columns of the current dataset that an expression refers to.
+        """
+        columns = []
+        
+        # grab all of the columns that we need
+        for field in expression.fields:
+            
+            # grab the column data out of the resultset
+            values = SQLTools.getCol(self.dataset, field)
+            
+            # if the column couldn't be found then we have a configuration issue so raise an exception
+            if (values is None):
+                raise ValidationError("Error evaluating expression: '" + expression.expr + "'. Unable to find column '" + field + "' in the resultset", None)
+            
+            columns.append(values[field])
+            
+        return columns
+            
+            
+    def getExpression(self:object, meta_attribute_definition:dict, meta_attribute_key:str) -> CompiledExpression:
+        """
+        The expression for an attribute is compiled once per validation, not once per chunk.
+        """
+        if (not meta_attribute_key in self.expressions):
             # %1 is a placeholder for whatever the column name is owning the expression (it's just a shortcut)
-            expr = expr.replace("%1", "[" + meta_attribute_key + "]")
-            exp = ExpressionBuilder()
+            expr = meta_attribute_definition["Expression"].replace("%1", "[" + meta_attribute_key + "]")
+            self.expressions[meta_attribute_key] = ExpressionBuilder().compile(expr)
             
-            fields = exp.parseExpr(expr)
-            colData = dict()
+        return self.expressions[meta_attribute_key]
+        
+        
+    def checkExpression(self:object, expression:CompiledExpression, meta_attribute_key:str, columns:list):
+        """
+        Evaluate an expression for every row of the columns it refers to.
+        """
+        for row in zip(*columns):
+            self.addExpressionError(meta_attribute_key, expression.evaluate(row))
             
-            # grab all of the columns that we need and store in a local dict
-            for field in fields:
-                
-                # grab the column data out of the resultset
-                values = SQLTools.getCol(self.dataset, field)
-                
-                # if the column couldn't be found then we have a configuration issue so raise an exception
-                if (values is None):
-                    raise ValidationError("Error evaluating expression: '" + expr + "'. Unable to find column '" + field + "' in the resultset", None)
-                
-                colData.update(values)
             
-            # convert the seperate columns into an array of name,value pairs
-            pairs=[dict(zip(colData, col)) for col in zip(*colData.values())]
+    def addExpressionError(self:object, meta_attribute_key:str, outcome:tuple):
+        if (not outcome is None):
+            ev, error = outcome
             
-            for pair in pairs:
-                result=None
-                ev = exp.merge(expr,pair)
-                
-                try:
-                    result = eval(ev)
-                except Exception as e:                    
-                    self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.BUSINESSRULECOMPLIANCE.value, description="Error: Expression '" + ev + "' returned an error '" + str(e) + "'"))
-                    result=None
-
-                if ( (not result is None) and (result == False) ):
-                    self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.BUSINESSRULECOMPLIANCE.value, description="Error: Expression '" + ev + "' returned FALSE"))
+            if (error is None):
+                self.addError(meta_attribute_key, DataQualityDimension.BUSINESSRULECOMPLIANCE.value, DUQValidator.EXPRESSION_TEMPLATE, ev)
+            else:
+                self.addDataQualityError(DataQualityError(meta_attribute_key,error_dimension=DataQualityDimension.BUSINESSRULECOMPLIANCE.value, description="Error: Expression '" + ev + "' returned an error '" + error + "'"))
 
     
\ No newline at end of file
@@ -0,0 +1,563 @@
+import random
+from array import array
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from pyduq.duqerror import ValidationError
+
+
+class ErrorRecord(Mapping):
+    """ ErrorRecord:
+    A read-only view of one error in an ErrorStore. It behaves like the dictionary produced by
+    DataQualityError.to_dict() (same keys, in the same order) but the description is only built
+    when it is asked for.
+    """
+
+    __slots__ = ("store", "index")
+    KEYS = ("attribute", "error_dimension", "description", "primary_key_value")
+
+    def __init__(self:object, store, index:int):
+        self.store = store
+        self.index = index
+
+
+    def __getitem__(self:object, key:str):
+        if (key == "attribute"):
+            return self.store.attributes[self.store.attribute_ids[self.index]]
+        elif (key == "error_dimension"):
+            return self.store.dimensions[self.store.dimension_ids[self.index]]
+        elif (key == "description"):
+            return self.store.description(self.index)
+        elif (key == "primary_key_value"):
+            return self.store.primary_key_values[self.index]
+
+        raise KeyError(key)
+
+
+    def __iter__(self:object):
+        return iter(ErrorRecord.KEYS)
+
+
+    def __len__(self:object) -> int:
+        return len(ErrorRecord.KEYS)
+
+
+    def __repr__(self:object) -> str:
+        return repr(dict(self))
+
+
+class ErrorStore(Sequence):
+    """ ErrorStore:
+    A compact, columnar list of validation errors. Rather than a dictionary and a description string per
+    error, each error is a row of parallel arrays - an attribute id, a dimension id and a template id - plus
+    a reference to the offending value and the primary key value, which are usually the strings already held
+    in the dataset. A template is a (prefix, suffix) pair and the description is prefix + value + suffix, so
+    the text that is the same for every error of a rule (e.g. the enumeration set) is only stored once and
+    the descriptions are only built when a report is written.
+
+    The store behaves like the list of error dictionaries that it replaces: indexing and iterating return
+    ErrorRecords, append() and extend() accept dictionaries (or records) and slicing returns another store.
+    """
+
+    # a description that has already been built is stored as the value of the empty template
+    TEXT = ("", "")
+
+    def __init__(self:object):
+        self.attributes = []
+        self.dimensions = []
+        self.templates = []
+        self.attribute_index = {}
+        self.dimension_index = {}
+        self.template_index = {}
+        self.attribute_ids = array("I")
+        self.dimension_ids = array("H")
+        self.template_ids = array("I")
+        self.values = []
+        self.primary_key_values = []
+
+
+    @staticmethod
+    def intern(table:list, index:dict, item) -> int:
+        item_id = index.get(item)
+
+        if (item_id is None):
+            item_id = index[item] = len(table)
+            table.append(item)
+
+        return item_id
+
+
+    def add(self:object, attribute:str, error_dimension, template:tuple, value:str, primary_key_value="<Unspecified>"):
+        """
+        Add an error. template is a (prefix, suffix) pair - see RulePlan for the templates of each check.
+        """
+        attribute_id, dimension_id, template_id = self.ids(attribute, error_dimension, template)
+
+        self.attribute_ids.append(attribute_id)
+        self.dimension_ids.append(dimension_id)
+        self.template_ids.append(template_id)
+        self.values.append(value)
+        self.primary_key_values.append(primary_key_value)
+
+
+    def ids(self:object, attribute:str, error_dimension, template:tuple) -> tuple:
+        attribute_id = self.attribute_index.get(attribute)
+
+        if (attribute_id is None):
+            attribute_id = ErrorStore.intern(self.attributes, self.attribute_index, attribute)
+
+        dimension_id = self.dimension_index.get(error_dimension)
+
+        if (dimension_id is None):
+            dimension_id = ErrorStore.intern(self.dimensions, self.dimension_index, error_dimension)
+
+        template_id = self.template_index.get(template)
+
+        if (template_id is None):
+            template_id = ErrorStore.intern(self.templates, self.template_index, template)
+
+        return (attribute_id, dimension_id, template_id)
+
+
+    def append(self:object, error:Mapping):
+        """
+        Add an error dictionary, e.g. from DataQualityError.to_dict().
+        """
+        if (error is None):
+            raise ValidationError("LANG Exception: error has not been set", None)
+
+        self.add(error["attribute"], error["error_dimension"], ErrorStore.TEXT, error["description"], error["primary_key_value"])
+
+
+    def extend(self:object, errors):
+        if (not isinstance(errors, ErrorStore)):
+            for error in errors:
+                self.append(error)
+
+            return
+
+        # the ids of the other store are mapped onto the ids of this one
+        attribute_ids = [ErrorStore.intern(self.attributes, self.attribute_index, attribute) for attribute in errors.attributes]
+        dimension_ids = [ErrorStore.intern(self.dimensions, self.dimension_index, dimension) for dimension in errors.dimensions]
+        template_ids = [ErrorStore.intern(self.templates, self.template_index, template) for template in errors.templates]
+
+        self.attribute_ids.extend([attribute_ids[attribute_id] for attribute_id in errors.attribute_ids])
+        self.dimension_ids.extend([dimension_ids[dimension_id] for dimension_id in errors.dimension_ids])
+        self.template_ids.extend([template_ids[template_id] for template_id in errors.template_ids])
+        self.values.extend(errors.values)
+        self.primary_key_values.extend(errors.primary_key_values)
+
+
+    def clear(self:object):
+        self.__init__()
+
+
+    def empty(self:object):
+        """
+        A new, empty store of the same kind, e.g. for the errors of a worker process.
+        """
+        return ErrorStore()
+
+
+    def counts(self:object) -> dict:
+        """
+        The number of errors for each (attribute, error_dimension), counted without building the descriptions.
+        """
+        return Counter(zip(map(self.attributes.__getitem__, self.attribute_ids), map(self.dimensions.__getitem__, self.dimension_ids)))
+
+
+    def description(self:object, index:int) -> str:
+        prefix, suffix = self.templates[self.template_ids[index]]
+
+        if (len(prefix) == 0 and len(suffix) == 0):
+            return self.values[index]
+
+        return prefix + str(self.values[index]) + suffix
+
+
+    def __len__(self:object) -> int:
+        return len(self.values)
+
+
+    def __getitem__(self:object, index):
+        if (isinstance(index, slice)):
+            errors = ErrorStore()
+            errors.attributes = list(self.attributes)
+            errors.dimensions = list(self.dimensions)
+            errors.templates = list(self.templates)
+            errors.attribute_index = dict(self.attribute_index)
+            errors.dimension_index = dict(self.dimension_index)
+            errors.template_index = dict(self.template_index)
+            errors.attribute_ids = self.attribute_ids[index]
+            errors.dimension_ids = self.dimension_ids[index]
+            errors.template_ids = self.template_ids[index]
+            errors.values = self.values[index]
+            errors.primary_key_values = self.primary_key_values[index]
+            return errors
+
+        if (index < 0):
+            index += len(self)
+
+        if (index < 0 or index >= len(self)):
+            raise IndexError("error index out of range")
+
+        return ErrorRecord(self, index)
+
+
+    def __iter__(self:object):
+        for index in range(len(self)):
+            yield ErrorRecord(self, index)
+
+
+    def __eq__(self:object, other) -> bool:
+        if (not isinstance(other, Sequence) or isinstance(other, str)):
+            return NotImplemented
+
+        return (len(self) == len(other) and all(dict(error) == dict(other_error) for error, other_error in zip(self, other)))
+
+
+    def __repr__(self:object) -> str:
+        return repr([dict(error) for error in self])
+
+
+class CounterStore(ErrorStore):
+    """ CounterStore:
+    An ErrorStore for monitoring runs that only need the summary and a few examples. Every error updates a
+    count for its (attribute, error_dimension) as it happens but only a fixed size sample of the errors of each
+    rule (attribute, dimension and template) is kept, chosen with reservoir sampling so that every error of a
+    rule is equally likely to be in the sample. The memory used depends on the number of rules rather than the
+    number of errors. Reading the store returns the samples in the order the errors were found.
+    """
+
+    def __init__(self:object, sample_size:int=10, seed:int=0):
+        if (sample_size is None or sample_size < 0):
+            raise ValidationError("LANG Exception: sample size must be zero or more", None)
+
+        super().__init__()
+        self.sample_size = sample_size
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.counters = Counter()
+        self.rule_counts = {}
+        self.rule_rows = {}
+        self.sequence = array("Q")
+        self.total = 0
+        self.ordered = None
+
+
+    def add(self:object, attribute:str, error_dimension, template:tuple, value:str, primary_key_value="<Unspecified>"):
+        self.counters[(attribute, error_dimension)] += 1
+        self.addSample((attribute, error_dimension, template), value, primary_key_value, self.total)
+        self.total += 1
+
+
+    def addSample(self:object, rule:tuple, value:str, primary_key_value, sequence:int):
+        """
+        Offer an error to the reservoir of its rule (Algorithm R).
+        """
+        seen = self.rule_counts.get(rule, 0) + 1
+        self.rule_counts[rule] = seen
+        rows = self.rule_rows.get(rule)
+
+        if (rows is None):
+            rows = self.rule_rows[rule] = []
+
+        if (len(rows) < self.sample_size):
+            rows.append(len(self.values))
+            super().add(rule[0], rule[1], rule[2], value, primary_key_value)
+            self.sequence.append(sequence)
+            self.ordered = None
+        else:
+            slot = self.random.randrange(seen)
+
+            if (slot < self.sample_size):
+                self.setSample(rows[slot], rule, value, primary_key_value, sequence)
+
+
+    def setSample(self:object, row:int, rule:tuple, value:str, primary_key_value, sequence:int):
+        self.attribute_ids[row], self.dimension_ids[row], self.template_ids[row] = self.ids(rule[0], rule[1], rule[2])
+        self.values[row] = value
+        self.primary_key_values[row] = primary_key_value
+        self.sequence[row] = sequence
+        self.ordered = None
+
+
+    def extend(self:object, errors):
+        if (not isinstance(errors, CounterStore)):
+            for error in errors:
+                self.append(error)
+
+            return
+
+        # the errors of the other store come after the errors of this one
+        self.counters.update(errors.counters)
+
+        for rule, rows in errors.rule_rows.items():
+            samples = [(errors.sequence[row] + self.total, errors.values[row], errors.primary_key_values[row]) for row in rows]
+
+            if (not rule in self.rule_rows):
+                for sequence, value, primary_key_value in samples:
+                    self.addSample(rule, value, primary_key_value, sequence)
+
+                self.rule_counts[rule] = errors.rule_counts[rule]
+            else:
+                self.mergeSamples(rule, samples, errors.rule_counts[rule])
+
+        self.total += errors.total
+
+
+    def mergeSamples(self:object, rule:tuple, samples:list, count:int):
+        """
+        Merge the sample of count errors of another store into the sample of a rule. Each merged sample is drawn from
+        one side or the other in proportion to the number of errors that side has left, so every error is still equally likely.
+        """
+        rows = self.rule_rows[rule]
+        mine = [(self.sequence[row], self.values[row], self.primary_key_values[row]) for row in rows]
+        theirs = list(samples)
+        self.random.shuffle(mine)
+        self.random.shuffle(theirs)
+        mine_count = self.rule_counts[rule]
+        theirs_count = count
+        merged = []
+
+        while (len(merged) < self.sample_size and (mine_count + theirs_count) > 0):
+            if (self.random.random() * (mine_count + theirs_count) < mine_count):
+                merged.append(mine.pop())
+                mine_count -= 1
+            else:
+                merged.append(theirs.pop())
+                theirs_count -= 1
+
+        for row, sample in zip(rows, merged):
+            self.setSample(row, rule, sample[1], sample[2], sample[0])
+
+        for sample in merged[len(rows):]:
+            rows.append(len(self.values))
+            ErrorStore.add(self, rule[0], rule[1], rule[2], sample[1], sample[2])
+            self.sequence.append(sample[0])
+
+        self.rule_counts[rule] += count
+        self.ordered = None
+
+
+    def clear(self:object):
+        self.__init__(self.sample_size, self.seed)
+
+
+    def empty(self:object):
+        return CounterStore(self.sample_size, self.seed)
+
+
+    def counts(self:object) -> dict:
+        return Counter(self.counters)
+
+
+    def samples(self:object) -> ErrorStore:
+        """
+        The samples as an ErrorStore, in the order that the errors were found.
+        """
+        if (self.ordered is None):
+            order = sorted(range(len(self.values)), key=self.sequence.__getitem__)
+            self.ordered = ErrorStore()
+
+            for row in order:
+                template = self.templates[self.template_ids[row]]
+                self.ordered.add(self.attributes[self.attribute_ids[row]], self.dimensions[self.dimension_ids[row]], template, self.values[row], self.primary_key_values[row])
+
+        return self.ordered
+
+
+    def __getitem__(self:object, index):
+        return self.samples()[index]
+
+
+    def __iter__(self:object):
+        return iter(self.samples())
+
+
+class AggregatedRecord(ErrorRecord):
+    """ AggregatedRecord:
+    One entry of an AggregatedStore. The primary_key_value is the list of the rows (or primary keys) that have the
+    error, with runs of consecutive numbers written as ranges, e.g. 'Row: 3-9, Row: 12'.
+    """
+
+    __slots__ = ()
+    KEYS = ("attribute", "error_dimension", "description", "count", "primary_key_value")
+
+    def __getitem__(self:object, key:str):
+        if (key == "count"):
+            return self.store.error_counts[self.index]
+        elif (key == "primary_key_value"):
+            return AggregatedStore.locationText(self.store.primary_key_values[self.index])
+
+        return super().__getitem__(key)
+
+
+    def __iter__(self:object):
+        return iter(AggregatedRecord.KEYS)
+
+
+    def __len__(self:object) -> int:
+        return len(AggregatedRecord.KEYS)
+
+
+class AggregatedStore(ErrorStore):
+    """ AggregatedStore:
+    An ErrorStore for reports. Errors with the same attribute, dimension and description (i.e. the same rule and
+    offending value) are collapsed into one entry with a count and the list of rows or primary keys that have the
+    error. Runs of consecutive row numbers, or of whole number primary keys, are kept as ranges. The size of the
+    report depends on the number of distinct problems rather than the number of rows that have them.
+    Entries are kept in the order that each problem was first found.
+    """
+
+    def __init__(self:object):
+        super().__init__()
+        self.entry_index = {}
+        self.error_counts = array("Q")
+
+
+    def add(self:object, attribute:str, error_dimension, template:tuple, value:str, primary_key_value="<Unspecified>"):
+        key = self.ids(attribute, error_dimension, template) + (value,)
+        entry = self.entry_index.get(key)
+
+        if (entry is None):
+            entry = self.newEntry(key)
+
+        self.error_counts[entry] += 1
+        AggregatedStore.addLocation(self.primary_key_values[entry], primary_key_value)
+
+
+    def addEntry(self:object, ids:tuple, value:str, count:int, primary_key_values:list):
+        key = ids + (value,)
+        entry = self.entry_index.get(key)
+
+        if (entry is None):
+            entry = self.newEntry(key)
+
+        self.error_counts[entry] += count
+        locations = self.primary_key_values[entry]
+
+        for primary_key_value in primary_key_values:
+            AggregatedStore.addLocation(locations, primary_key_value)
+
+
+    def newEntry(self:object, key:tuple) -> int:
+        entry = self.entry_index[key] = len(self.values)
+        self.attribute_ids.append(key[0])
+        self.dimension_ids.append(key[1])
+        self.template_ids.append(key[2])
+        self.values.append(key[3])
+        self.primary_key_values.append([])
+        self.error_counts.append(0)
+        return entry
+
+
+    @staticmethod
+    def locationNumber(primary_key_value) -> tuple:
+        """
+        Split a row number ('Row: 12') or whole number primary key into a (prefix, number) pair, or (None, None) if it isn't one.
+        Only numbers that are written the same way when they are turned back into text are used.
+        """
+        if (isinstance(primary_key_value, int) and not isinstance(primary_key_value, bool)):
+            return ("", primary_key_value)
+
+        if (isinstance(primary_key_value, str)):
+            prefix = ("Row: " if primary_key_value[:5] == "Row: " else "")
+            number = (primary_key_value[5:] if len(prefix) > 0 else primary_key_value)
+
+            if (number.isdigit() and number.isascii() and (number[0] != "0" or len(number) == 1)):
+                return (prefix, int(number))
+
+        return (None, None)
+
+
+    @staticmethod
+    def addLocation(locations:list, primary_key_value):
+        # there is no point listing a primary key that wasn't recorded, the count is enough
+        if (primary_key_value == "<Unspecified>"):
+            return
+
+        if (isinstance(primary_key_value, list)):
+            # a range from another store
+            prefix, start, end = primary_key_value
+        else:
+            prefix, start = AggregatedStore.locationNumber(primary_key_value)
+            end = start
+
+        last = (locations[-1] if len(locations) > 0 else None)
+
+        if (prefix is None):
+            if (last != primary_key_value):
+                locations.append(primary_key_value)
+        elif (isinstance(last, list) and last[0] == prefix and last[2] + 1 == start):
+            last[2] = end
+        else:
+            locations.append([prefix, start, end])
+
+
+    @staticmethod
+    def locationText(locations:list) -> str:
+        text = []
+
+        for location in locations:
+            if (not isinstance(location, list)):
+                text.append(str(location))
+            elif (location[1] == location[2]):
+                text.append(location[0] + str(location[1]))
+            else:
+                text.append(location[0] + str(location[1]) + "-" + str(location[2]))
+
+        return (", ".join(text) if len(text) > 0 else "<Unspecified>")
+
+
+    def append(self:object, error:Mapping):
+        if (isinstance(error, AggregatedRecord)):
+            store = error.store
+            self.addEntry(self.ids(error["attribute"], error["error_dimension"], store.templates[store.template_ids[error.index]]), store.values[error.index], error["count"], store.primary_key_values[error.index])
+            return
+
+        super().append(error)
+
+
+    def extend(self:object, errors):
+        for error in errors:
+            self.append(error)
+
+
+    def clear(self:object):
+        self.__init__()
+
+
+    def empty(self:object):
+        return AggregatedStore()
+
+
+    def counts(self:object) -> dict:
+        counts = Counter()
+
+        for attribute_id, dimension_id, count in zip(self.attribute_ids, self.dimension_ids, self.error_counts):
+            counts[(self.attributes[attribute_id], self.dimensions[dimension_id])] += count
+
+        return counts
+
+
+    def __getitem__(self:object, index):
+        if (isinstance(index, slice)):
+            errors = AggregatedStore()
+
+            for entry in range(*index.indices(len(self))):
+                errors.append(AggregatedRecord(self, entry))
+
+            return errors
+
+        if (index < 0):
+            index += len(self)
+
+        if (index < 0 or index >= len(self)):
+            raise IndexError("error index out of range")
+
+        return AggregatedRecord(self, index)
+
+
+    def __iter__(self:object):
+        for index in range(len(self)):
+            yield AggregatedRecord(self, index)
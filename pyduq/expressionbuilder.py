@@ -1,10 +1,19 @@
+import io
+import ast
+import copy
+import math
 import re
+import tokenize
+import warnings
+from pyduq.duqerror import ValidationError
 
 class ExpressionBuilder(object):
+    
+    # a [col] reference. The pattern is compiled once rather than purging the process wide regex cache on every call
+    REFERENCE = re.compile(r"[^[]*\[([^]]*)\]")
  
     def parseExpr(self, expr:str): 
-        re.purge()
-        return(re.findall(r"[^[]*\[([^]]*)\]", expr))
+        return(ExpressionBuilder.REFERENCE.findall(expr))
  
     def stripBrackets(self, str):
         result=str
@@ -21,6 +30,12 @@ class ExpressionBuilder(object):
             s=s.replace(k, str(v))
             
         return s
+    
+    def compile(self, expr:str):
+        """
+        Parse an expression once so it can be evaluated for every row without calling eval (see CompiledExpression).
+        """
+        return CompiledExpression(expr)
         
     def charPosition(string:str, c):
         pos = [] #list to store positions for each 'char' in 'string'
@@ -50,4 +65,497 @@ class ExpressionBuilder(object):
         
         return pattern.sub(lambda match: replacements[match.group(0).lower() if ignore_case else match.group(0)], string)
         
-        
\ No newline at end of file
+        
+
+class CompiledExpression(object):
+    """ CompiledExpression:
+    An Expression rule parsed once into a python syntax tree, with each [col] reference turned into an argument of a
+    compiled function. Only the operators, literals, function calls and (public) methods in NODES are allowed and
+    the only functions are those in FUNCTIONS, so an expression can't import modules or reach the interpreter.
+
+    The values of a row are never evaluated as code, but they fail the same rows as when they were merged into the
+    text of the expression and passed to eval. A bare [col] is passed as the python value of a literal (e.g. 12,
+    1.5, True or 'abc'). A value that would have broken the syntax of the expression (e.g. 1.5.3 or 007) fails the
+    row with a syntax error, whichever branch of the expression it is in. A blank value is left out (see variant) and
+    fails the row in the same way unless the rest is still an expression. Any other value (e.g. abc or Bob|x) was
+    read as python names, so it is passed as an UnresolvedValue that raises a NameError when it is used.
+    A [col] inside quotes becomes part of the string, and a value that would have ended the string (one with the
+    quote in it) fails the row. The error text is still the expression with the values merged in. An expression
+    that can't be parsed fails every row with the parse error.
+
+    ** and * are called through power and multiply, which refuse results that are too big to build, so a large
+    value can't hang the run or use up the memory.
+
+    The outcome of each distinct row is remembered, so repeated values are only evaluated once.
+    """
+
+    FUNCTIONS = {"abs":abs, "all":all, "any":any, "bool":bool, "float":float, "int":int, "len":len, "max":max, "min":min, "round":round, "str":str, "sum":sum}
+    NODES = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+             ast.UnaryOp, ast.Not, ast.USub, ast.UAdd, ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+             ast.Is, ast.IsNot, ast.IfExp, ast.Constant, ast.Name, ast.Load, ast.Tuple, ast.Set, ast.Dict, ast.Call, ast.Attribute, ast.keyword)
+    # the arithmetic and comparisons that can be evaluated over a whole column at once (see VectorDUQValidator)
+    VECTOR_NODES = (ast.BoolOp, ast.And, ast.Or, ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+                    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Constant, ast.Name, ast.Load)
+    # str methods that can read the attributes of their arguments
+    UNSAFE_METHODS = ["format", "format_map"]
+    PLACEHOLDER = re.compile(r"__lang_([0-9]+)__")
+    INT = re.compile(r"[+-]?(?:0+|[1-9][0-9]*)\Z")
+    FLOAT = re.compile(r"[+-]?(?:[0-9]+\.[0-9]*(?:[eE][+-]?[0-9]+)?|\.[0-9]+(?:[eE][+-]?[0-9]+)?|[0-9]+[eE][+-]?[0-9]+)\Z")
+    CONSTANTS = {"True":True, "False":False, "None":None}
+    CACHE_SIZE = 100000
+    UNKNOWN = object()
+    # the largest int (in bits) and sequence (in items) that ** and * will build
+    MAX_BITS = 100000
+    MAX_ITEMS = 10000000
+
+    def __init__(self:object, expr:str):
+        self.expr = expr
+        self.builder = ExpressionBuilder()
+        self.fields = list(dict.fromkeys(self.builder.parseExpr(expr)))
+        self.stripped = self.builder.stripBrackets(expr)
+        self.function = None
+        self.error = None
+        self.parameters = []
+        self.quotes = {}
+        self.source = None
+        self.variants = {}
+        self.vector_tree = None
+        self.results = {}
+        self.parse()
+
+
+    def parse(self:object):
+        """
+        Build the text of the expression with a placeholder for each reference and compile it into a function.
+        """
+        if ("__lang_" in self.stripped):
+            raise ValidationError("LANG Exception: Expression '" + self.expr + "' uses '__lang_', which is not allowed in an expression", None)
+
+        source = []
+        end = 0
+
+        # the text between the references has its brackets removed, as it is by merge()
+        for match in ExpressionBuilder.REFERENCE.finditer(self.expr):
+            text = self.builder.stripBrackets(self.expr[end:match.start(1) - 1])
+            index = self.fields.index(match.group(1))
+            source.append(text + "__lang_" + str(index) + "__")
+            end = match.end()
+
+        self.source = "".join(source) + self.builder.stripBrackets(self.expr[end:])
+
+        try:
+            tree = CompiledExpression.parseSource(self.source)
+        except (SyntaxError, ValueError) as e:
+            # every row fails with the parse error
+            self.error = str(e)
+            return
+
+        disallowed = CompiledExpression.disallowed(tree)
+
+        if (disallowed is None):
+            disallowed = CompiledExpression.misplacedReference(tree)
+
+        if (not disallowed is None):
+            raise ValidationError("LANG Exception: Expression '" + self.expr + "' uses " + disallowed + ", which is not allowed in an expression", None)
+
+        self.function, self.parameters, self.quotes, body = CompiledExpression.build(self.source, tree)
+
+        if (self.vectorizable(body)):
+            self.vector_tree = body
+
+
+    @staticmethod
+    def parseSource(source:str) -> ast.Expression:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return ast.parse(source.lstrip(" \t"), "<string>", "eval")
+
+
+    @staticmethod
+    def build(source:str, tree:ast.Expression) -> tuple:
+        """
+        Compile the tree of the text of an expression into a function of its references. Returns the function, its
+        (index, quoted) parameters, the quotes of the strings each reference is inside and the tree of the expression
+        before ** and * are guarded.
+        """
+        parameters = []
+        body = ReferenceTransformer(parameters).visit(tree.body)
+        plain = copy.deepcopy(body)
+        body = OperatorGuard().visit(body)
+        names = [("__lang_" + str(index) + ("_text__" if quoted else "__")) for index, quoted in parameters]
+        arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=name) for name in names], kwonlyargs=[], kw_defaults=[], defaults=[])
+        function = ast.fix_missing_locations(ast.Expression(body=ast.Lambda(args=arguments, body=body)))
+        builtins = dict(CompiledExpression.FUNCTIONS, __lang_power__=CompiledExpression.power, __lang_multiply__=CompiledExpression.multiply)
+
+        return (eval(compile(function, "<string>", "eval"), {"__builtins__":builtins}), parameters, CompiledExpression.referenceQuotes(source), plain)
+
+
+    def variant(self:object, blanks:frozenset):
+        """
+        The expression with the bare references in blanks left out, as it was when blank values were merged into its
+        text (e.g. '[a] + [b] > 3' with a blank a is '+ [b] > 3'). Returns the function, parameters and quotes of the
+        variant, or the error that fails the row if the variant isn't a valid expression.
+        """
+        variant = self.variants.get(blanks)
+
+        if (variant is None):
+            source = CompiledExpression.PLACEHOLDER.sub(lambda match: ("" if int(match.group(1)) in blanks else match.group(0)), self.source)
+
+            try:
+                tree = CompiledExpression.parseSource(source)
+
+                if (not CompiledExpression.disallowed(tree) is None):
+                    raise SyntaxError("invalid syntax")
+
+                variant = CompiledExpression.build(source, tree)[:3]
+            except (SyntaxError, ValueError) as e:
+                variant = str(e)
+
+            self.variants[blanks] = variant
+
+        return variant
+
+
+    @staticmethod
+    def misplacedReference(tree:ast.AST) -> str:
+        """
+        A description of the first reference that doesn't stand for a whole value, as a name or inside a string, or
+        None if there isn't one. A reference can't be part of a name, an attribute or a keyword.
+        """
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Name)):
+                if ("__lang_" in node.id and CompiledExpression.PLACEHOLDER.fullmatch(node.id) is None):
+                    return "a column reference inside a name"
+            elif (isinstance(node, ast.Attribute)):
+                if ("__lang_" in node.attr):
+                    return "a column reference as an attribute"
+            elif (isinstance(node, ast.keyword)):
+                if (not node.arg is None and "__lang_" in node.arg):
+                    return "a column reference as a keyword"
+            elif (isinstance(node, ast.Constant)):
+                if (isinstance(node.value, bytes) and b"__lang_" in node.value):
+                    return "a column reference inside bytes"
+
+        return None
+
+
+    @staticmethod
+    def referenceQuotes(source:str) -> dict:
+        """
+        The quotes of the strings that each reference is inside, as {index:set of quotes}.
+        """
+        quotes = {}
+
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if (token.type == tokenize.STRING):
+                quote = token.string.lstrip("rRbBuU")[:3]
+                quote = (quote if quote in ['"""', "'''"] else quote[0])
+
+                for match in CompiledExpression.PLACEHOLDER.finditer(token.string):
+                    quotes.setdefault(int(match.group(1)), set()).add(quote)
+
+        return quotes
+
+
+    def vectorizable(self:object, body:ast.AST) -> bool:
+        """
+        True if the expression is arithmetic and comparisons of bare references and numbers.
+        """
+        if (len(self.parameters) == 0 or any(quoted for index, quoted in self.parameters)):
+            return False
+
+        for node in ast.walk(body):
+            if (not isinstance(node, CompiledExpression.VECTOR_NODES)):
+                return False
+
+            if (isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float)))):
+                return False
+
+        return True
+
+
+    @staticmethod
+    def disallowed(tree:ast.AST) -> str:
+        """
+        A description of the first part of the tree that isn't allowed in an expression, or None if it is all allowed.
+        """
+        for node in ast.walk(tree):
+            if (not isinstance(node, CompiledExpression.NODES)):
+                return "'" + type(node).__name__ + "'"
+
+            if (isinstance(node, ast.Attribute) and (node.attr.startswith("_") or node.attr in CompiledExpression.UNSAFE_METHODS)):
+                return "'" + node.attr + "'"
+
+        return None
+
+
+    def evaluate(self:object, row:tuple) -> tuple:
+        """
+        Evaluate the expression for a row of values, one for each field. Returns None if the row passes, otherwise the
+        text of the expression with the values merged in and the error message (None if the expression was FALSE).
+        """
+        outcome = self.results.get(row, CompiledExpression.UNKNOWN)
+
+        if (outcome is CompiledExpression.UNKNOWN):
+            outcome = self.evaluateRow(row)
+
+            if (len(self.results) >= CompiledExpression.CACHE_SIZE):
+                self.results.clear()
+
+            self.results[row] = outcome
+
+        return outcome
+
+
+    def evaluateRow(self:object, row:tuple) -> tuple:
+        text = self.stripped
+
+        for field, value in zip(self.fields, row):
+            text = text.replace(field, str(value))
+
+        if (self.function is None):
+            return (text, self.error)
+
+        function, parameters, quotes = self.function, self.parameters, self.quotes
+        blanks = frozenset([index for index, quoted in parameters if (not quoted and isinstance(row[index], str) and len(row[index].strip()) == 0)])
+
+        if (len(blanks) > 0):
+            variant = self.variant(blanks)
+
+            if (isinstance(variant, str)):
+                return (text, CompiledExpression.syntaxError(text, variant))
+
+            function, parameters, quotes = variant
+
+        try:
+            arguments = CompiledExpression.arguments(row, parameters, quotes)
+        except SyntaxError as e:
+            return (text, CompiledExpression.syntaxError(text, str(e)))
+
+        try:
+            result = function(*arguments)
+
+            # the result can be an UnresolvedValue, which fails when it is compared
+            if ( (not result is None) and (result == False) ):
+                return (text, None)
+        except Exception as e:
+            return (text, str(e))
+
+        return None
+
+
+    @staticmethod
+    def syntaxError(text:str, message:str) -> str:
+        """
+        The error eval reported for the text of the expression with the values merged in, or the message if the text
+        compiles (e.g. a value of '1 or 2'). The text is only compiled, never run.
+        """
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                compile(text.lstrip(" \t"), "<string>", "eval")
+        except (SyntaxError, ValueError) as e:
+            return str(e)
+        except (RecursionError, MemoryError) as e:
+            pass
+
+        return message
+
+
+    @staticmethod
+    def arguments(row:tuple, parameters:list, quotes:dict) -> list:
+        """
+        The arguments of the function for a row: the text of each quoted value and the value of each bare one (see
+        operand). Raises a SyntaxError for a value that would have broken the syntax of the expression.
+        """
+        arguments = []
+
+        for index, quoted in parameters:
+            value = row[index]
+
+            if (quoted):
+                CompiledExpression.checkQuoted(quotes.get(index, []), value)
+                arguments.append(value)
+            else:
+                arguments.append(CompiledExpression.operand(value))
+
+        return arguments
+
+
+    @staticmethod
+    def checkQuoted(quotes:set, value:str):
+        """
+        Raise a SyntaxError if a value would have ended one of the strings (with the given quotes) it is merged into.
+        """
+        value = str(value)
+        backslashes = len(value) - len(value.rstrip("\\"))
+
+        for quote in quotes:
+            if (quote in value or backslashes % 2 == 1 or (len(quote) == 1 and ("\n" in value or "\r" in value))):
+                raise SyntaxError("unterminated string literal")
+
+
+    @staticmethod
+    def operand(value):
+        """
+        The value of a bare reference: the python value of a literal, an UnresolvedValue for a value that was read
+        as python names, or a SyntaxError for a value that isn't an expression on its own (e.g. a blank).
+        """
+        if (not isinstance(value, str)):
+            return value
+
+        literal = CompiledExpression.literal(value)
+
+        if (not literal is value):
+            return literal
+
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                tree = ast.parse(value.strip(), mode="eval").body
+        except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+            raise SyntaxError("invalid syntax: '" + value + "' is not a value")
+
+        if (isinstance(tree, ast.UnaryOp) and isinstance(tree.op, (ast.USub, ast.UAdd)) and isinstance(tree.operand, ast.Constant)):
+            if (isinstance(tree.operand.value, (int, float, complex)) and not isinstance(tree.operand.value, bool)):
+                return (-tree.operand.value if isinstance(tree.op, ast.USub) else tree.operand.value)
+
+        if (isinstance(tree, ast.Constant)):
+            return tree.value
+
+        return UnresolvedValue(value, tree)
+
+
+    @staticmethod
+    def literal(value:str):
+        """
+        The python value of a plain int, float, True, False or None literal, or the value itself if it is anything else.
+        """
+        if (value in CompiledExpression.CONSTANTS):
+            return CompiledExpression.CONSTANTS[value]
+
+        try:
+            if (not CompiledExpression.INT.match(value) is None):
+                return int(value)
+
+            if (not CompiledExpression.FLOAT.match(value) is None):
+                return float(value)
+        except ValueError as e:
+            pass
+
+        return value
+
+
+    @staticmethod
+    def power(base, exponent):
+        """
+        base ** exponent, unless the result would be an int of more than MAX_BITS bits.
+        """
+        if (isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1):
+            if (exponent * math.log2(abs(base)) > CompiledExpression.MAX_BITS):
+                raise OverflowError("the result of ** is too large")
+
+        return base ** exponent
+
+
+    @staticmethod
+    def multiply(left, right):
+        """
+        left * right, unless the result would be a string or sequence of more than MAX_ITEMS items.
+        """
+        if (isinstance(left, int) and not isinstance(right, (int, float, complex))):
+            left, right = right, left
+
+        if (isinstance(right, int) and not isinstance(left, (int, float, complex)) and hasattr(left, "__len__")):
+            if (len(left) * right > CompiledExpression.MAX_ITEMS):
+                raise OverflowError("the result of * is too large")
+
+        return left * right
+
+
+class UnresolvedValue(object):
+    """ UnresolvedValue:
+    A bare value of a row that isn't a python literal, e.g. abc or Bob|x. When the values were merged into the text of
+    an expression it was read as python names, so any use of it raises the NameError of its first name. An operand
+    that isn't evaluated (e.g. the right of an 'or' whose left is true) doesn't fail the row.
+    """
+
+    __slots__ = ("value", "message")
+
+    def __init__(self:object, value:str, tree:ast.AST):
+        self.value = value
+        names = [node.id for node in ast.walk(tree) if (isinstance(node, ast.Name))]
+        self.message = ("name '" + names[0] + "' is not defined" if len(names) > 0 else "'" + value + "' is not a value")
+
+
+    def fail(self:object, *args):
+        raise NameError(self.message)
+
+
+    def __repr__(self:object) -> str:
+        return "UnresolvedValue(" + repr(self.value) + ")"
+
+
+    __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = __hash__ = __bool__ = fail
+    __add__ = __radd__ = __sub__ = __rsub__ = __mul__ = __rmul__ = __truediv__ = __rtruediv__ = fail
+    __floordiv__ = __rfloordiv__ = __mod__ = __rmod__ = __pow__ = __rpow__ = fail
+    __and__ = __rand__ = __or__ = __ror__ = __xor__ = __rxor__ = __lshift__ = __rlshift__ = __rshift__ = __rrshift__ = fail
+    __neg__ = __pos__ = __abs__ = __invert__ = __round__ = __int__ = __float__ = __complex__ = __index__ = fail
+    __str__ = __format__ = __len__ = __iter__ = __contains__ = __getitem__ = __getattr__ = fail
+
+
+class OperatorGuard(ast.NodeTransformer):
+    """ OperatorGuard:
+    Turns ** and * into calls of CompiledExpression.power and CompiledExpression.multiply.
+    """
+
+    FUNCTIONS = {ast.Pow:"__lang_power__", ast.Mult:"__lang_multiply__"}
+
+    def visit_BinOp(self:object, node:ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        function = OperatorGuard.FUNCTIONS.get(type(node.op))
+
+        if (function is None):
+            return node
+
+        return ast.copy_location(ast.Call(func=ast.Name(id=function, ctx=ast.Load()), args=[node.left, node.right], keywords=[]), node)
+
+
+class ReferenceTransformer(ast.NodeTransformer):
+    """ ReferenceTransformer:
+    Turns the placeholders for the references in an expression into arguments. A placeholder inside a string becomes
+    a concatenation with the value, as it is when the value is merged into the text.
+    """
+
+    def __init__(self:object, parameters:list):
+        self.parameters = parameters
+
+
+    def parameter(self:object, index:int, quoted:bool) -> ast.Name:
+        if (not (index, quoted) in self.parameters):
+            self.parameters.append((index, quoted))
+
+        return ast.Name(id="__lang_" + str(index) + ("_text__" if quoted else "__"), ctx=ast.Load())
+
+
+    def visit_Name(self:object, node:ast.Name) -> ast.AST:
+        match = CompiledExpression.PLACEHOLDER.fullmatch(node.id)
+
+        if (match is None):
+            return node
+
+        return ast.copy_location(self.parameter(int(match.group(1)), False), node)
+
+
+    def visit_Constant(self:object, node:ast.Constant) -> ast.AST:
+        if (not isinstance(node.value, str) or CompiledExpression.PLACEHOLDER.search(node.value) is None):
+            return node
+
+        pieces = CompiledExpression.PLACEHOLDER.split(node.value)
+        result = ast.Constant(value=pieces[0])
+
+        for position in range(1, len(pieces), 2):
+            result = ast.BinOp(left=result, op=ast.Add(), right=self.parameter(int(pieces[position]), True))
+            result = ast.BinOp(left=result, op=ast.Add(), right=ast.Constant(value=pieces[position + 1]))
+
+        return ast.copy_location(result, node)
@@ -1,10 +1,18 @@
+import io
+import os
 import csv
 import json
+import locale
 import dicttoxml
+from itertools import repeat
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from xml.dom.minidom import parseString
-from unidecode import unidecode
 from openpyxl import Workbook,load_workbook
 from pyduq.duqerror import ValidationError
+from pyduq.columnstore import ColumnStore, TypedColumn
+from pyduq.lazydataset import LazyDataset
+from pyduq.asciifold import AsciiFold
 
 class FileTools(object):
     """ FileTools: 
@@ -13,77 +21,415 @@ class FileTools(object):
     Note: This could be replaced by Pandas
     """
 
+    CHUNK_SIZE = 10000
+
     @staticmethod
-    def csvFileToDict(fileName:str) -> dict:
+    def csvFileToDict(fileName:str, meta:dict=None, columns:set=None, unfolded:set=None) -> dict:
         """ csvFileToDict:
         Converts a csv file into a dictionary of dictionaries.
         Each row is its own dictionary with each attribute recorded as a tupple,
         indexed by a row counter.
+        If metadata is provided, int, float and bool attributes are loaded as TypedColumns.
+        If a set of columns is provided (see MetaUtils.referencedColumns) only those columns are loaded.
+        Values are converted to ascii except in the unfolded columns (see MetaUtils.unfoldedColumns).
         """
-        data = dict()
-        resultset = []
+        data = None
         
-        # first we load the data into a simple 
+        # the rows are read a chunk at a time and appended to the columns so that we never
+        # hold a copy of the whole file as rows as well as columns
+        for fieldnames, resultset in FileTools.csvRowChunks(fileName, FileTools.CHUNK_SIZE):
+            if (data is None):
+                data = FileTools.newColumns(FileTools.projectColumns(fieldnames, columns), meta)
+                
+            FileTools.appendRows(data, resultset, unfolded)
+            
+        return data
+
+
+    @staticmethod
+    def csvFileChunks(fileName:str, chunk_size:int=10000, meta:dict=None, columns:set=None, unfolded:set=None):
+        """ csvFileChunks:
+        A generator version of csvFileToDict for files that are too large to load in one go.
+        The file is read chunk_size rows at a time and each chunk is yielded as a dictionary
+        of lists keyed on the column name, so only one chunk is ever held in memory.
+        A file with no data rows yields a single empty chunk so the column names are still available.
+        """
+        for fieldnames, resultset in FileTools.csvRowChunks(fileName, chunk_size):
+            yield FileTools.rowsToDict(FileTools.projectColumns(fieldnames, columns), resultset, meta, unfolded)
+
+
+    @staticmethod
+    def csvRowChunks(fileName:str, chunk_size:int):
+        """ csvRowChunks:
+        Reads a csv file chunk_size rows at a time, yielding the column names and a list of DictReader rows.
+        A file with no data rows yields a single empty chunk.
+        """
+        if (chunk_size is None or chunk_size < 1):
+            raise ValidationError("LANG Exception: chunk_size must be a positive number of rows", None)
+
         with open(fileName, errors='ignore') as f:
             reader = csv.DictReader(f)
-                               
+            
             # Get a list of the column names returned from the file
             columns = list(reader.fieldnames)
+            resultset = []
+            chunk_count = 0
             
-            #for row in reader:
-            #    resultset.append(row)
-            resultset = [row for row in reader]
+            for row in reader:
+                resultset.append(row)
+                
+                if (len(resultset) >= chunk_size):
+                    yield (columns, resultset)
+                    chunk_count += 1
+                    resultset = []
             
-            for col in columns:
-                data[col]= [("(Null)" if row[col] is None else FileTools.FormatString(str(row[col]).strip())) for row in resultset]            
+            if (len(resultset) > 0 or chunk_count == 0):
+                yield (columns, resultset)
+                
             f.close()
+
+
+    @staticmethod
+    def csvFileColumns(fileName:str, cols:list, meta:dict=None, unfolded:set=None) -> dict:
+        """ csvFileColumns:
+        Load a list of columns from a csv file in one pass. This is used to materialise the columns of a lazy dataset.
+        """
+        data = FileTools.newColumns(cols, meta)
+        
+        for fieldnames, resultset in FileTools.csvRowChunks(fileName, FileTools.CHUNK_SIZE):
+            for col in cols:
+                if (not col in fieldnames):
+                    raise ValidationError("LANG Exception: Column '" + col + "' was not found in '" + fileName + "'", None)
+                
+            FileTools.appendRows(data, resultset, unfolded)
             
         return data
 
 
     @staticmethod
-    def xlsFileToDict(fileName:str, sheet_name:str=None) -> dict:
+    def csvFileToLazyDict(fileName:str, meta:dict=None, columns:set=None, unfolded:set=None) -> LazyDataset:
+        """ csvFileToLazyDict:
+        Returns a LazyDataset for a csv file. Only the header is read up front, the columns are 
+        read from the file the first time one of them is used by a validator or the profiler.
+        The columns that were asked for are read together in one pass, any others are read one at a time.
+        """
+        with open(fileName, errors='ignore') as f:
+            fieldnames = list(csv.DictReader(f).fieldnames)
+            f.close()
+            
+        fieldnames = FileTools.projectColumns(fieldnames, columns)
+        
+        return LazyDataset(fieldnames, partial(FileTools.csvFileColumns, fileName, meta=meta, unfolded=unfolded), (None if columns is None else fieldnames))
+
+
+    @staticmethod
+    def projectColumns(fieldnames:list, columns:set=None) -> list:
+        """ projectColumns:
+        Reduce a list of column names down to the ones that are required. If columns is None every column is required.
+        """
+        return [col for col in fieldnames if (columns is None or col in columns)]
+
+
+    @staticmethod
+    def csvFileToDictParallel(fileName:str, workers:int=None, columns:set=None, unfolded:set=None, meta:dict=None) -> dict:
+        """ csvFileToDictParallel:
+        A multi-process version of csvFileToDict for large files. The file is split into byte ranges
+        that start and end on a record boundary, each range is parsed in its own worker process and the
+        columns are then joined back together in row order. The result is the same as csvFileToDict.
+        If metadata is provided, the workers build the typed columns and they are joined without parsing them again.
+        
+        Assumptions: quotes are only used to enclose fields (RFC 4180) and the file encoding is ascii 
+        compatible (e.g. utf-8 or latin-1), so record boundaries can be found by scanning the raw bytes.
+        """
+        workers = (os.cpu_count() if workers is None else workers)
+        
+        if (workers is None or workers < 2):
+            return FileTools.csvFileToDict(fileName, meta, columns, unfolded)
+        
+        fieldnames, ranges = FileTools.csvByteRanges(fileName, workers)
+        data = FileTools.newColumns(FileTools.projectColumns(fieldnames, columns), meta)
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for part in executor.map(FileTools.csvRangeToDict, repeat(fileName), ranges, repeat(fieldnames), repeat(columns), repeat(unfolded), repeat(meta)):
+                for col in data:
+                    data[col].extend(part[col])
+                    
+        return data
+    
+
+    @staticmethod
+    def csvByteRanges(fileName:str, parts:int, block_size:int=16777216) -> tuple:
+        """ csvByteRanges:
+        Returns the column names of a csv file and a list of (start, end) byte ranges covering the data rows,
+        split into roughly equal parts. A range always ends just after a newline that isn't inside a quoted
+        field, which we know by counting the quotes before it - an even count means we are outside of quotes.
+        """
+        size = os.path.getsize(fileName)
+        
+        # the first boundary we need is the end of the header row, then one at (or after) each target offset
+        targets = [0] + [int(size * part / parts) for part in range(1, parts)]
+        boundaries = []
+        quotes = 0
+        offset = 0
+        
+        with open(fileName, 'rb') as f:
+            while (len(targets) > 0):
+                block = f.read(block_size)
+                
+                if (len(block) == 0):
+                    break
+                
+                start = 0
+                
+                while (len(targets) > 0):
+                    start = max(start, targets[0] - offset)
+                    pos = FileTools.findRecordEnd(block, start, quotes)
+                    
+                    if (pos == -1):
+                        break
+                    
+                    boundaries.append(offset + pos + 1)
+                    targets.pop(0)
+                    start = pos + 1
+                    
+                quotes += block.count(b'"')
+                offset += len(block)
+                
+            header_end = (boundaries[0] if len(boundaries) > 0 else size)
+            f.seek(0)
+            header = f.read(header_end).decode(locale.getpreferredencoding(False), errors='ignore')
+            f.close()
+
+        columns = next(csv.reader(io.StringIO(header, newline=None)), [])
+        starts = [b for b in boundaries if b < size]
+        ends = starts[1:] + [size]
+        
+        return (columns, list(zip(starts, ends)))
+
+
+    @staticmethod
+    def findRecordEnd(block:bytes, start:int, quotes:int) -> int:
+        """ findRecordEnd:
+        Find the first newline at or after start that is outside of a quoted field, given the
+        number of quotes that appear before the block. Returns -1 if there isn't one in the block.
+        """
+        if (start >= len(block)):
+            return -1
+            
+        quotes += block.count(b'"', 0, start)
+        pos = block.find(b"\n", start)
+        
+        while (pos != -1):
+            quotes += block.count(b'"', start, pos)
+            
+            if (quotes % 2 == 0):
+                return pos
+            
+            start = pos
+            pos = block.find(b"\n", pos + 1)
+            
+        return -1
+        
+
+    @staticmethod
+    def csvRangeToDict(fileName:str, byte_range:tuple, fieldnames:list, columns:set=None, unfolded:set=None, meta:dict=None) -> dict:
+        """ csvRangeToDict:
+        Parse the rows in a byte range of a csv file (see csvByteRanges) into a dictionary of lists keyed on the column name.
+        This is the unit of work for each process in csvFileToDictParallel.
+        """
+        start, end = byte_range
+        
+        with open(fileName, 'rb') as f:
+            f.seek(start)
+            buffer = f.read(end - start)
+            f.close()
+            
+        # if the raw bytes are all ascii then none of the values need to be folded
+        if (buffer.isascii()):
+            unfolded = set(fieldnames)
+            
+        # decode the same way that open() does in csvFileToDict, including the universal newline translation
+        text = buffer.decode(locale.getpreferredencoding(False), errors='ignore')
+        reader = csv.DictReader(io.StringIO(text, newline=None), fieldnames=fieldnames)
+        
+        return FileTools.rowsToDict(FileTools.projectColumns(fieldnames, columns), [row for row in reader], meta, unfolded)
+
+
+    @staticmethod
+    def rowsToDict(columns:list, resultset:list, meta:dict=None, unfolded:set=None) -> dict:
+        """ rowsToDict:
+        Pivots a list of DictReader rows into a dictionary of lists keyed on the column name,
+        cleaning each value on the way through.
+        """
+        return FileTools.appendRows(FileTools.newColumns(columns, meta), resultset, unfolded)
+
+
+    @staticmethod
+    def newColumns(columns:list, meta:dict=None) -> dict:
+        """ newColumns:
+        Create a dictionary of empty columns. With metadata, int, float and bool attributes are TypedColumns.
+        """
+        data = dict()
+        meta = ({} if meta is None else meta)
+        
+        for col in columns:
+            data[col] = ColumnStore.newColumn(meta.get(col))
+            
+        return data
+
+
+    @staticmethod
+    def appendRows(data:dict, resultset:list, unfolded:set=None) -> dict:
+        """ appendRows:
+        Append a list of DictReader rows to a dictionary of columns, cleaning each value on the way through.
+        Each column of the chunk is folded to ascii in one go unless it is one of the unfolded columns.
+        """
+        for col, column in data.items():
+            values = [FileTools.stripValue(row[col]) for row in resultset]
+            column.extend(values if (not unfolded is None and col in unfolded) else AsciiFold.foldColumn(values))
+            
+        return data
+
+
+    @staticmethod
+    def cleanValue(value) -> str:
+        """ cleanValue:
+        Converts a raw cell value into the string form used by the validators.
+        Missing values become "(Null)", everything else is trimmed and converted to ascii.
+        """
+        return AsciiFold.foldValue(FileTools.stripValue(value))
+
+
+    @staticmethod
+    def stripValue(value) -> str:
+        """ stripValue:
+        As cleanValue but without the conversion to ascii.
+        """
+        return ("(Null)" if value is None else str(value).strip())
+
+
+    @staticmethod
+    def xlsFileToDict(fileName:str, sheet_name:str=None, meta:dict=None, columns:set=None, unfolded:set=None) -> dict:
         """ xlsFileToDict:
         Converts an Excel spreadsheet into a dictionary of dictionaries.
         Each row is its own dictionary with each attribute recorded as a tupple,
         indexed by a row counter.
         
         Assumptions: The spreadsheet is well-formatted columns and rows.
+        If metadata is provided, int, float and bool attributes are loaded as TypedColumns.
+        If a set of columns is provided (see MetaUtils.referencedColumns) only those columns are loaded.
+        Values are converted to ascii except in the unfolded columns (see MetaUtils.unfoldedColumns).
         """
         data = {}
+        meta = ({} if meta is None else meta)
+        unfolded = (set() if unfolded is None else unfolded)
         
         # first we load the data into a simple
         workbook = load_workbook(filename=fileName, data_only=True, read_only = True)
-        
-        if (not sheet_name is None):
-            if (sheet_name in workbook.sheetnames):
-                sheet = workbook[sheet_name]
-            else:
-                raise ValidationError("Sheet '" + sheet_name + "' not found", None)
-        else:        
-            sheet = workbook.active
+        sheet = FileTools.getSheet(workbook, sheet_name)
         
         # extract the column headers - assumes headers in row 1 only - perhaps 
         # this could be configrable :-)
-        columns = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
+        headers = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        fieldnames = FileTools.xlsFieldNames(headers)
+        
+        # work out the target column for each cell position once, rather than for every cell
+        for col in FileTools.projectColumns(fieldnames, columns):
+            if (not col in data):
+                data[col] = ColumnStore.newColumn(meta.get(col))
+                
+        targets = [(index, data[col], (FileTools.stripValue if col in unfolded else FileTools.cleanValue)) for index, col in enumerate(fieldnames) if col in data]
 
         # convert the data from rows into columns. This looks clunky
         # but it's somehow faster that iterating through the columns and
         # and provides an oportunity to clean up indiuvidual cell values.
         for row in sheet.iter_rows(min_row=2, min_col=1, values_only=True):
-            col=0
+            cells = len(row)
             
-            for value in row:                
-                col_name = ("<Undefined_" + str(col) + ">" if columns[col] is None else columns[col])
-                    
-                if (not col_name in data):
-                    data[col_name] = []
-                    
-                data[col_name].append("(Null)" if value is None else FileTools.FormatString(str(value).strip()))            
-                col+=1
+            for index, column, clean in targets:
+                if (index < cells):
+                    column.append(clean(row[index]))
         
         workbook.close()
+        
         return data
+        
+
+    @staticmethod
+    def xlsFileSheetsToDict(fileName:str, sheet_names:list=None, meta:dict=None, columns:set=None, workers:int=None, unfolded:set=None) -> dict:
+        """ xlsFileSheetsToDict:
+        Load several sheets of an Excel spreadsheet, or every sheet if no names are given. Returns a dictionary of
+        datasets keyed on the sheet name, in workbook order. Each sheet is parsed in its own worker process.
+        """
+        workbook = load_workbook(filename=fileName, read_only = True)
+        sheetnames = workbook.sheetnames
+        workbook.close()
+        
+        if (sheet_names is None or len(sheet_names) == 0):
+            sheet_names = sheetnames
+        
+        for sheet_name in sheet_names:
+            if (not sheet_name in sheetnames):
+                raise ValidationError("Sheet '" + sheet_name + "' not found", None)
+        
+        sheet_names = list(dict.fromkeys(sheet_names))
+        workers = min(len(sheet_names), (os.cpu_count() or 1) if workers is None else workers)
+        
+        if (workers < 2):
+            return {sheet_name:FileTools.xlsFileToDict(fileName, sheet_name, meta, columns, unfolded) for sheet_name in sheet_names}
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(sheet_names, executor.map(FileTools.xlsFileToDict, repeat(fileName), sheet_names, repeat(meta), repeat(columns), repeat(unfolded))))
+
+
+    @staticmethod
+    def xlsFieldNames(headers) -> list:
+        """ xlsFieldNames:
+        The column names from the header row of a sheet. Blank headers are named <Undefined_n>.
+        """
+        return [("<Undefined_" + str(col) + ">" if headers[col] is None else headers[col]) for col in range(len(headers))]
+
+
+    @staticmethod
+    def xlsFileColumns(fileName:str, sheet_name:str, cols:list, meta:dict=None, unfolded:set=None) -> dict:
+        """ xlsFileColumns:
+        Load a list of columns from an Excel spreadsheet in one pass. This is used to materialise the columns of a lazy dataset.
+        """
+        data = FileTools.xlsFileToDict(fileName, sheet_name, meta, set(cols), unfolded)
+        return {col:(data[col] if col in data else ColumnStore.newColumn(None if meta is None else meta.get(col))) for col in cols}
+
+
+    @staticmethod
+    def xlsFileToLazyDict(fileName:str, sheet_name:str=None, meta:dict=None, columns:set=None, unfolded:set=None) -> LazyDataset:
+        """ xlsFileToLazyDict:
+        Returns a LazyDataset for an Excel spreadsheet. Only the header row is read up front, the columns are 
+        loaded from the sheet the first time one of them is used by a validator or the profiler.
+        The columns that were asked for are loaded together in one pass, any others are loaded one at a time.
+        """
+        workbook = load_workbook(filename=fileName, data_only=True, read_only = True)
+        sheet = FileTools.getSheet(workbook, sheet_name)
+        headers = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        workbook.close()
+        
+        fieldnames = FileTools.xlsFieldNames(headers)
+            
+        fieldnames = FileTools.projectColumns(fieldnames, columns)
+            
+        return LazyDataset(fieldnames, partial(FileTools.xlsFileColumns, fileName, sheet_name, meta=meta, unfolded=unfolded), (None if columns is None else fieldnames))
+
+
+    @staticmethod
+    def getSheet(workbook:Workbook, sheet_name:str=None):
+        """ getSheet:
+        Return the named sheet from a workbook, or the active sheet if no name is given.
+        """
+        if (not sheet_name is None):
+            if (sheet_name in workbook.sheetnames):
+                return workbook[sheet_name]
+            else:
+                raise ValidationError("Sheet '" + sheet_name + "' not found", None)
+                
+        return workbook.active
 
   
     @staticmethod
@@ -116,15 +462,7 @@ class FileTools(object):
     @staticmethod
     def FormatString(s:str) ->str:
         # converts a unicode string to ascii
-        
-        if isinstance(s, str):
-            try:
-                s.encode('ascii')
-                return s
-            except:
-                return unidecode(s)
-        else:
-          return s
+        return AsciiFold.foldValue(s)
 
 
     @staticmethod
@@ -218,9 +556,12 @@ class FileTools(object):
             
             seen=set()
             size=0
+            
+            # a typed column has already parsed its values, so valid cells don't need to be parsed again
+            typed = (attributes.type if isinstance(attributes, TypedColumn) else None)
 
                         
-            for value in attributes:                
+            for index, value in enumerate(attributes):                
                 #check to see if there are any blanks or nulls in order to determine if values are mandatory
                 if (len(value)==0 or value == "(Null)"):
                     isMandatory = False
@@ -233,17 +574,21 @@ class FileTools(object):
                     if (len(value)>size):
                         size = len(value)
                     
+                    valid = (typed in ["int", "float"] and attributes.isValid(index))
+                    
                     #test for integer
-                    try:
-                        int(value)
-                    except Exception as e:
-                        isInt = False
+                    if (not (valid and typed == "int")):
+                        try:
+                            int(value)
+                        except Exception as e:
+                            isInt = False
 
                     #test for float
-                    try:
-                        float(value)
-                    except Exception as e:
-                        isFloat = False
+                    if (not valid):
+                        try:
+                            float(value)
+                        except Exception as e:
+                            isFloat = False
                     
                     if (not value.lower() in ["0","1","no","yes","false","true","n","y","f","t"]):
                         isBool = False
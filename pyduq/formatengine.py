@@ -0,0 +1,242 @@
+import re
+import warnings
+from pyduq.patterns import Patterns
+from pyduq.duqerror import ValidationError
+
+try:
+    from re import _parser as sre_parse
+except ImportError as e:
+    import sre_parse
+
+try:
+    import regex
+except ImportError as e:
+    regex = None
+
+try:
+    import re2
+except ImportError as e:
+    re2 = None
+
+
+class FormatPattern(object):
+    """ FormatPattern:
+    A compiled Format regex. match(value) is the compiled pattern's own match, or if there is a time budget a match
+    that gives up after timeout seconds and returns TIMEOUT. stats is the [values, seconds, timeouts] entry for the
+    attribute in the FormatEngine that compiled it.
+    """
+
+    TIMEOUT = object()
+
+    def __init__(self:object, pattern:str, compiled, timeout:float, stats:list):
+        self.pattern = pattern
+        self.compiled = compiled
+        self.timeout = timeout
+        self.stats = stats
+        self.match = (compiled.match if timeout is None else self.matchWithin)
+
+
+    def matchWithin(self:object, value:str):
+        try:
+            return self.compiled.match(value, timeout=self.timeout)
+        except TimeoutError as e:
+            self.stats[2] += 1
+            return FormatPattern.TIMEOUT
+
+
+    def addTime(self:object, values:int, seconds:float):
+        self.stats[0] += values
+        self.stats[1] += seconds
+
+
+class FormatEngine(object):
+    """ FormatEngine:
+    Compiles the Format regexes. Each pattern is compiled once per process and backend, a Format of 'Patterns.' and
+    the name of a Patterns member (e.g. 'Patterns.EMAIL') uses that pattern, and a warning is issued for the patterns
+    that are prone to catastrophic backtracking when they are first compiled (see also report). The backends are:
+
+        re     the standard library (the default)
+        re2    Google's linear time engine (the google-re2 package). Patterns that re2 doesn't support (e.g.
+               backreferences or lookarounds) fall back to re
+        regex  the regex package, which can give up on a value after timeout seconds. The value is then reported
+               as a Format error that couldn't be checked rather than hanging the run
+
+    The time spent matching each attribute's values is recorded so the slow patterns can be found (see report).
+    """
+
+    BACKENDS = ["re", "re2", "regex"]
+    # any other Format is a regex, even if it happens to be the name of a pattern
+    PATTERN_PREFIX = "Patterns."
+    CACHE = {}
+    WARNED = set()
+    # a bounded quantifier that can repeat more than this many times is treated like an unbounded one
+    LONG_REPEAT = 10
+
+    def __init__(self:object, backend:str="re", timeout:float=None):
+        if (not timeout is None and backend == "re"):
+            backend = "regex"
+
+        if (not backend in FormatEngine.BACKENDS):
+            raise ValidationError("LANG Exception: unknown regex backend '" + str(backend) + "'", None)
+
+        if (backend == "regex" and regex is None):
+            raise ValidationError("LANG Exception: the regex package is required for the regex backend and for timeouts", None)
+
+        if (backend == "re2" and re2 is None):
+            raise ValidationError("LANG Exception: the google-re2 package is required for the re2 backend", None)
+
+        self.backend = backend
+        self.timeout = (timeout if backend == "regex" else None)
+        self.stats = {}
+        self.patterns = {}
+
+
+    def empty(self:object):
+        """
+        A new engine with the same settings and no statistics.
+        """
+        return FormatEngine(self.backend, self.timeout)
+
+
+    @staticmethod
+    def resolve(pattern:str) -> str:
+        """
+        The regex for a Format, which may name one of the Patterns (e.g. 'Patterns.EMAIL').
+        """
+        if (not isinstance(pattern, str) or not pattern.startswith(FormatEngine.PATTERN_PREFIX)):
+            return pattern
+
+        name = pattern[len(FormatEngine.PATTERN_PREFIX):]
+
+        if (not name in Patterns.__members__):
+            raise ValidationError("LANG Exception: Format '" + pattern + "' is not one of the Patterns", None)
+
+        return Patterns[name].value
+
+
+    def compile(self:object, attribute:str, pattern:str) -> FormatPattern:
+        """
+        Compile the Format of an attribute.
+        """
+        pattern = FormatEngine.resolve(pattern)
+        key = (self.backend, pattern)
+
+        if (not key in FormatEngine.CACHE):
+            FormatEngine.CACHE[key] = self.compileWith(self.backend, pattern)
+
+        risk = FormatEngine.backtrackingRisk(pattern)
+
+        if (not risk is None and not pattern in FormatEngine.WARNED and self.backend == "re"):
+            FormatEngine.WARNED.add(pattern)
+            warnings.warn("the Format of '" + attribute + "' may backtrack catastrophically (" + risk + "), consider the re2 backend or a timeout", stacklevel=2)
+
+        self.stats[attribute] = self.stats.get(attribute, [0, 0.0, 0])
+        self.patterns[attribute] = pattern
+
+        return FormatPattern(pattern, FormatEngine.CACHE[key], self.timeout, self.stats[attribute])
+
+
+    @staticmethod
+    def compileWith(backend:str, pattern:str):
+        if (backend == "regex"):
+            return regex.compile(pattern)
+
+        if (backend == "re2"):
+            try:
+                return re2.compile(pattern)
+            except Exception as e:
+                warnings.warn("re2 can't compile '" + pattern + "' (" + str(e) + "), using re", stacklevel=2)
+
+        return re.compile(pattern)
+
+
+    @staticmethod
+    def backtrackingRisk(pattern:str) -> str:
+        """
+        The reason a regex is prone to catastrophic (exponential) backtracking, or None. A quantifier inside an
+        unbounded quantifier, e.g. (a+)+, or alternatives that can start with the same character inside an unbounded
+        quantifier, e.g. (a|ab)*, can make the regex try every way of splitting a long value that doesn't match.
+        """
+        try:
+            parsed = sre_parse.parse(pattern)
+        except Exception as e:
+            return None
+
+        return FormatEngine.findRisk(list(parsed), False)
+
+
+    @staticmethod
+    def findRisk(items:list, repeated:bool) -> str:
+        for op, av in items:
+            if (op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)):
+                low, high, body = av
+
+                if (repeated and high != low):
+                    return "a quantifier inside a quantifier"
+
+                risk = FormatEngine.findRisk(list(body), repeated or high == sre_parse.MAXREPEAT or high > FormatEngine.LONG_REPEAT)
+            elif (op == sre_parse.SUBPATTERN):
+                risk = FormatEngine.findRisk(list(av[-1]), repeated)
+            elif (op == sre_parse.BRANCH):
+                branches = [list(branch) for branch in av[1]]
+
+                if (repeated and FormatEngine.overlapping(branches)):
+                    return "alternatives that can match the same text inside a quantifier"
+
+                risk = None
+
+                for branch in branches:
+                    risk = (risk or FormatEngine.findRisk(branch, repeated))
+            elif (op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT)):
+                risk = FormatEngine.findRisk(list(av[1]), repeated)
+            else:
+                risk = None
+
+            if (not risk is None):
+                return risk
+
+        return None
+
+
+    @staticmethod
+    def overlapping(branches:list) -> bool:
+        """
+        True unless every alternative starts with a different literal character.
+        """
+        first = set()
+
+        for branch in branches:
+            if (len(branch) == 0 or branch[0][0] != sre_parse.LITERAL or branch[0][1] in first):
+                return True
+
+            first.add(branch[0][1])
+
+        return False
+
+
+    def mergeStats(self:object, stats:dict, patterns:dict):
+        """
+        Add the statistics of another engine, e.g. one used by a worker process.
+        """
+        for attribute, entry in stats.items():
+            totals = self.stats.setdefault(attribute, [0, 0.0, 0])
+
+            for i in range(len(entry)):
+                totals[i] += entry[i]
+
+        self.patterns.update(patterns)
+
+
+    def report(self:object) -> list:
+        """
+        The time spent matching each attribute's Format, slowest first.
+        """
+        rows = []
+
+        for attribute, (values, seconds, timeouts) in self.stats.items():
+            pattern = self.patterns[attribute]
+            rows.append({"attribute":attribute, "pattern":pattern, "values":values, "seconds":round(seconds, 6),
+                         "microseconds per value":(round(seconds * 1000000 / values, 3) if values > 0 else 0),
+                         "timeouts":timeouts, "backtracking risk":FormatEngine.backtrackingRisk(pattern)})
+
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
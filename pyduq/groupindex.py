@@ -0,0 +1,140 @@
+import os
+import pickle
+import tempfile
+from collections import Counter
+from pyduq.duqerror import ValidationError
+
+
+class GroupIndex(object):
+    """ GroupIndex:
+    The state of the NonRepeatingGroup check for one attribute, built in a single pass over the rows (or over a
+    stream of chunks). The X values are counted and each value of the first column of the group is mapped to the
+    distinct keys ('|'.join of the row) that it appears with, in the order they were first seen. A value that has
+    only been seen with one key is just mapped to that key, so the index stays small when most groups repeat.
+    groups() then gives the same non-repeating groups, in the same order, as scanning every row for every
+    repeating X value.
+
+    If a spill directory is given the rows are written to hash-partitioned temporary files instead and each
+    partition is grouped on its own when groups() is called, so only one partition needs to fit in memory. The
+    groups are returned in the order of the row where their X value first appeared, as they are in memory.
+    """
+
+    PARTITIONS = 64
+
+    def __init__(self:object, spill_dir:str=None, partitions:int=PARTITIONS):
+        if (not spill_dir is None and not os.path.isdir(spill_dir)):
+            raise ValidationError("LANG Exception: spill directory '" + str(spill_dir) + "' does not exist", None)
+
+        self.spill_dir = spill_dir
+        self.partitions = partitions
+        self.row_offset = 0
+        self.counts = Counter()
+        self.keys = {}
+        self.files = None
+
+
+    def add(self:object, x_values:list, columns:list):
+        """
+        Add the next rows. x_values is the X column and columns are the columns of the group, the first of which
+        is matched against the repeating X values.
+        """
+        if (self.spill_dir is None):
+            self.counts.update(x_values)
+            self.addKeys([(row[0], '|'.join(map(str, row))) for row in zip(*columns)])
+        else:
+            self.spill(x_values, columns)
+
+        self.row_offset += len(x_values)
+
+
+    def addKeys(self:object, pairs:list):
+        """
+        Record the (first column value, key) of each row.
+        """
+        keys = self.keys
+
+        for value, key in pairs:
+            seen = keys.get(value)
+
+            if (seen is None):
+                keys[value] = key
+            elif (isinstance(seen, dict)):
+                if (not key in seen):
+                    seen[key] = None
+            elif (seen != key):
+                keys[value] = {seen:None, key:None}
+
+
+    def spill(self:object, x_values:list, columns:list):
+        if (self.files is None):
+            self.files = [tempfile.TemporaryFile(dir=self.spill_dir) for partition in range(self.partitions)]
+
+        x_parts = [[] for partition in range(self.partitions)]
+        row_parts = [[] for partition in range(self.partitions)]
+
+        for row_count, value in enumerate(x_values, self.row_offset):
+            x_parts[hash(value) % self.partitions].append((value, row_count))
+
+        for row in zip(*columns):
+            row_parts[hash(row[0]) % self.partitions].append((row[0], '|'.join(map(str, row))))
+
+        for partition in range(self.partitions):
+            if (len(x_parts[partition]) > 0 or len(row_parts[partition]) > 0):
+                pickle.dump((x_parts[partition], row_parts[partition]), self.files[partition], pickle.HIGHEST_PROTOCOL)
+
+
+    def groups(self:object):
+        """
+        Generate (value, keys) for each X value that repeats and appears with more than one distinct key.
+        """
+        if (self.spill_dir is None):
+            for value, count in self.counts.items():
+                if (count > 1):
+                    seen = self.keys.get(value)
+
+                    if (isinstance(seen, dict)):
+                        yield (value, list(seen))
+
+            return
+
+        if (self.files is None):
+            return
+
+        # the groups of every partition are sorted on the row where the X value first appeared
+        found = []
+
+        for f in self.files:
+            partition = GroupIndex(None)
+            first_rows = {}
+            f.seek(0)
+
+            while (True):
+                try:
+                    x_part, row_part = pickle.load(f)
+                except EOFError as e:
+                    break
+
+                for value, row_count in x_part:
+                    partition.counts[value] += 1
+                    first_rows.setdefault(value, row_count)
+
+                partition.addKeys(row_part)
+
+            f.close()
+
+            for value, keys in partition.groups():
+                found.append((first_rows[value], value, keys))
+
+        self.files = None
+        found.sort(key=lambda group: group[0])
+
+        for first_row, value, keys in found:
+            yield (value, keys)
+
+
+    def close(self:object):
+        if (not self.files is None):
+            for f in self.files:
+                f.close()
+
+            self.files = None
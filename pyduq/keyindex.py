@@ -0,0 +1,197 @@
+import os
+import pickle
+import tempfile
+from pyduq.duqerror import ValidationError
+from pyduq.bloomfilter import BloomFilter
+
+
+class KeyIndex(object):
+    """ KeyIndex:
+    The keys seen so far by the Unique or Composite check for one set of columns. The keys are the values of a
+    single column, or the tuples of the column values zipped straight from the column lists, so no string is built
+    for a row unless it is a duplicate and values that contain '|' can't be mistaken for each other. The tuples
+    share the column values so the index costs little more than the tuples themselves.
+
+    Attributes that declare the same composite key share one index. The duplicates found in a dataset are kept
+    until the next dataset (chunk) is added, so the rows are only hashed once however many attributes check them.
+
+    If a budget is given, once more than budget distinct keys have been seen the keys are written to
+    hash-partitioned temporary files in spill_dir (or the system's temporary folder) instead, along with every key
+    that follows. add then finds no more duplicates and resolve finds the rest one partition at a time, so only
+    one partition needs to fit in memory. With a Bloom filter sized for bloom keys each spilled key is also marked
+    if it may have been seen before, and resolve only keeps the marked keys in memory and skips the partitions that
+    have none. Either way the duplicates are the same keys, in the same order, as in memory.
+    """
+
+    PARTITIONS = 64
+    # the number of keys that are partitioned in memory before they are written
+    BATCH = 65536
+
+    def __init__(self:object, budget:int=None, spill_dir:str=None, bloom:int=None, partitions:int=PARTITIONS):
+        if (not spill_dir is None and not os.path.isdir(spill_dir)):
+            raise ValidationError("LANG Exception: spill directory '" + str(spill_dir) + "' does not exist", None)
+
+        self.seen = set()
+        self.dataset = None
+        self.duplicates = []
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self.bloom = bloom
+        self.partitions = partitions
+        self.position = 0
+        self.spill_count = 0
+        self.files = None
+        self.filter = None
+        self.resolved = None
+
+
+    def add(self:object, dataset:dict, columns:list) -> list:
+        """
+        Add the rows of the columns of a dataset, returning the keys that had already been seen in the order
+        they were found. Adding the same dataset again just returns the same duplicates.
+        """
+        if (self.dataset is dataset):
+            return self.duplicates
+
+        keys = iter(columns[0] if len(columns) == 1 else zip(*columns))
+        duplicates = []
+
+        if (self.files is None):
+            seen = self.seen
+            budget = self.budget
+
+            for key in keys:
+                self.position += 1
+
+                if (key in seen):
+                    duplicates.append(key)
+                else:
+                    seen.add(key)
+
+                    if (not budget is None and len(seen) > budget):
+                        self.spillSeen()
+                        break
+
+        if (not self.files is None):
+            self.spill(keys)
+
+        self.dataset = dataset
+        self.duplicates = duplicates
+
+        return duplicates
+
+
+    def spilled(self:object) -> bool:
+        return (not self.files is None or not self.resolved is None)
+
+
+    def spillSeen(self:object):
+        """
+        Move the keys seen so far to the partition files. They are all different so they are only marked if the
+        Bloom filter gives a false positive.
+        """
+        self.spill_count = len(self.seen)
+        self.files = [tempfile.TemporaryFile(dir=self.spill_dir) for partition in range(self.partitions)]
+
+        if (not self.bloom is None):
+            self.filter = BloomFilter(self.bloom)
+
+        # the positions of these keys don't matter as they are never duplicates
+        self.write(self.seen, 0)
+        self.seen = set()
+
+
+    def spill(self:object, keys):
+        self.position += self.write(keys, self.position)
+
+
+    def write(self:object, keys, position:int) -> int:
+        """
+        Append (position, key, marked) to the partition of each key, returning the number of keys. Without a
+        Bloom filter every key is marked.
+        """
+        parts = [[] for partition in range(self.partitions)]
+        partitions = self.partitions
+        check = (None if self.filter is None else self.filter.add)
+        count = 0
+
+        for count, key in enumerate(keys, 1):
+            parts[hash(key) % partitions].append((position + count, key, (True if check is None else check(key))))
+
+            if (count % KeyIndex.BATCH == 0):
+                self.flush(parts)
+
+        self.flush(parts)
+
+        return count
+
+
+    def flush(self:object, parts:list):
+        for partition in range(self.partitions):
+            if (len(parts[partition]) > 0):
+                pickle.dump(parts[partition], self.files[partition], pickle.HIGHEST_PROTOCOL)
+                parts[partition] = []
+
+
+    @staticmethod
+    def records(f):
+        f.seek(0)
+
+        while (True):
+            try:
+                part = pickle.load(f)
+            except EOFError as e:
+                break
+
+            yield from part
+
+
+    def resolve(self:object) -> list:
+        """
+        The duplicates among the spilled keys, in the order they were added. The result is kept so every attribute
+        that shares the index gets the same duplicates.
+        """
+        if (not self.resolved is None):
+            return self.resolved
+
+        if (self.files is None):
+            return []
+
+        found = []
+
+        for f in self.files:
+            marked = None
+
+            if (not self.filter is None):
+                # only the keys that were marked can have been seen before
+                marked = set(key for position, key, flag in KeyIndex.records(f) if flag)
+
+                if (len(marked) == 0):
+                    f.close()
+                    continue
+
+            seen = set()
+
+            for position, key, flag in KeyIndex.records(f):
+                if (marked is None or key in marked):
+                    if (key in seen):
+                        found.append((position, key))
+                    else:
+                        seen.add(key)
+
+            f.close()
+
+        found.sort(key=lambda duplicate: duplicate[0])
+        self.files = None
+        self.filter = None
+        self.resolved = [key for position, key in found]
+
+        return self.resolved
+
+
+    def close(self:object):
+        if (not self.files is None):
+            for f in self.files:
+                f.close()
+
+            self.files = None
@@ -0,0 +1,91 @@
+from collections.abc import MutableMapping
+from pyduq.duqerror import ValidationError
+
+
+class LazyDataset(MutableMapping):
+    """ LazyDataset:
+    A dataset dictionary whose columns are only loaded the first time they are used. The column names are known
+    up front (so 'in' checks don't load anything) and loader is called with a list of column names to materialise
+    those columns, returning them as a dictionary, e.g. FileTools.csvFileColumns. Once loaded, a column is kept so it
+    is only decoded once. If a batch of columns is given, the first column that is used loads the whole batch in one
+    call, so a source that has to be read from the start for every call (e.g. a csv file) is only read once.
+    release is called by close to free whatever the loader reads from, e.g. the map of a DatasetCache entry.
+    """
+
+    def __init__(self:object, columns:list, loader, batch:list=None, release=None):
+        if (columns is None):
+            raise ValidationError("LANG Exception: columns have not been set", None)
+
+        if (loader is None):
+            raise ValidationError("LANG Exception: loader has not been set", None)
+
+        self.columns = list(dict.fromkeys(columns))
+        self.loader = loader
+        self.batch = ([] if batch is None else [col for col in dict.fromkeys(batch) if col in self.columns])
+        self.release = release
+        self.data = {}
+
+
+    def close(self:object):
+        """
+        Release the source of the columns. The columns that have already been loaded can still be used.
+        """
+        if (not self.release is None):
+            self.release()
+            self.release = None
+
+
+    def isLoaded(self:object, key:str) -> bool:
+        return (key in self.data)
+
+
+    def __getitem__(self:object, key:str):
+        if (not key in self.data):
+            if (not key in self.columns):
+                raise KeyError(key)
+
+            self.load([key] + self.batch)
+            self.batch = []
+
+        return self.data[key]
+
+
+    def load(self:object, columns:list):
+        """
+        Load the columns that haven't been loaded yet with a single call to the loader.
+        """
+        columns = [col for col in dict.fromkeys(columns) if (col in self.columns and not col in self.data)]
+
+        if (len(columns) > 0):
+            self.data.update(self.loader(columns))
+
+
+    def __setitem__(self:object, key:str, value):
+        if (not key in self.columns):
+            self.columns.append(key)
+
+        self.data[key] = value
+
+
+    def __delitem__(self:object, key:str):
+        if (not key in self.columns):
+            raise KeyError(key)
+
+        self.columns.remove(key)
+        self.data.pop(key, None)
+
+
+    def __contains__(self:object, key) -> bool:
+        return (key in self.columns)
+
+
+    def __iter__(self:object):
+        return iter(list(self.columns))
+
+
+    def __len__(self:object) -> int:
+        return len(self.columns)
+
+
+    def __repr__(self:object) -> str:
+        return "LazyDataset(" + str(len(self.data)) + " of " + str(len(self.columns)) + " columns loaded)"
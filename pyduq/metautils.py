@@ -1,3 +1,5 @@
+from pyduq.expressionbuilder import ExpressionBuilder
+
 
 class MetaUtils(object):
     """ MetaUtils: 
@@ -37,3 +39,30 @@ class MetaUtils(object):
             return True
         except Exception as e:
             return False
+
+
+    @staticmethod
+    def referencedColumns(meta:dict) -> set:
+        """
+        Return the names of every column that the metadata refers to. This is each attribute (including the
+        PrimaryKey) plus any columns pulled in by Composite, NonRepeatingGroup or Expression [col] references.
+        """
+        columns = set(meta.keys())
+        
+        for key, item in meta.items():
+            for tag in ["Composite", "NonRepeatingGroup"]:
+                if (MetaUtils.exists(item, tag)):
+                    columns.update([col.replace("%1", key) for col in item[tag]])
+                    
+            if (MetaUtils.exists(item, "Expression")):
+                columns.update(ExpressionBuilder().parseExpr(item["Expression"].replace("%1", "[" + key + "]")))
+                
+        return columns
+
+
+    @staticmethod
+    def unfoldedColumns(meta:dict) -> set:
+        """
+        Return the names of the attributes that have opted out of ascii folding with "AsciiFold": false.
+        """
+        return set([key for key, item in meta.items() if (MetaUtils.exists(item, "AsciiFold") and item["AsciiFold"] == False)])
@@ -0,0 +1,43 @@
+class PrefixIndex(object):
+    """ PrefixIndex:
+    The prefixes of a StartsWith rule, grouped by length. A value starts with one of the prefixes if its first n
+    characters are one of the prefixes of length n, so checking a value takes one set lookup for each distinct
+    prefix length however many prefixes there are (code lists such as postcodes have thousands of prefixes but
+    only a few lengths). A short list is just passed to str.startswith, which is quicker for a handful of prefixes.
+    """
+
+    SHORT_LIST = 8
+
+    def __init__(self:object, prefixes):
+        self.prefixes = tuple(prefixes)
+        self.lengths = None
+        self.index = None
+        self.groups = {}
+
+        # str.startswith raises an error for anything but strings, so only strings are indexed
+        if (all(isinstance(prefix, str) for prefix in self.prefixes)):
+            for prefix in self.prefixes:
+                self.groups.setdefault(len(prefix), set()).add(prefix)
+
+            self.lengths = tuple(sorted(self.groups))
+            self.index = frozenset(self.prefixes)
+
+            if (len(self.prefixes) > PrefixIndex.SHORT_LIST):
+                self.matches = self.lookup
+
+
+    def matches(self:object, value:str) -> bool:
+        """
+        True if the value starts with one of the prefixes.
+        """
+        return value.startswith(self.prefixes)
+
+
+    def lookup(self:object, value:str) -> bool:
+        index = self.index
+
+        for length in self.lengths:
+            if (value[:length] in index):
+                return True
+
+        return False
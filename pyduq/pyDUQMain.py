@@ -15,6 +15,16 @@ $ python pyduqmain.py -h
 
 usage: pyduqmain.py [-h] [-i INPUTFILE] [-o OUTPUTFOLDER] [-m METAFILE]
                     [-s SQL SQL] [-c CUSTOM] [-p] [-v] [--infer] [--verbose]
+                    [--chunksize CHUNKSIZE] [--typed] [--workers WORKERS]
+                    [--project] [--lazy] [--pushdown [PUSHDOWN]]
+                    [--sheets [SHEETS [SHEETS ...]]] [--cache CACHE]
+                    [--cachesize CACHESIZE] [--engine {python,vector}]
+                    [--counters [COUNTERS]] [--aggregate] [--spill SPILL]
+                    [--distinct] [--regex {re,re2,regex}]
+                    [--regex-timeout REGEX_TIMEOUT] [--regex-stats]
+                    [--keybudget KEYBUDGET] [--bloom BLOOM]
+                    [--incremental [INCREMENTAL]] [--triage TRIAGE]
+                    [--budget BUDGET] [--stratify STRATIFY]
 
 Perform a data quality validation.
 
@@ -22,7 +32,9 @@ optional arguments:
   -h, --help            show this help message and exit
   -i INPUTFILE, --inputfile INPUTFILE
                         the path and name of the input data file
-                        to use as the data source.
+                        to use as the data source. CSV, Excel (.xlsx),
+                        Parquet (.parquet) and Arrow IPC / Feather (.arrow,
+                        .feather) files are supported.
   -o OUTPUTFOLDER, --outputfolder OUTPUTFOLDER
                         the destination path for the output files to be
                         stored.
@@ -31,7 +43,9 @@ optional arguments:
                         validation.
   -s SQL SQL, --sql SQL SQL
                         a database connection string and SQL query to use 
-                        as the data source.
+                        as the data source. Use sqlite:///<file> for a 
+                        sqlite database, otherwise an ODBC connection 
+                        string is expected.
   -c CUSTOM, --custom CUSTOM
                         The class path and name of a custom validator.
   -p, --profile         profile the data.
@@ -42,6 +56,62 @@ optional arguments:
                         rules found in the data source. Overwrites the 
                         suppled metafile.
   --verbose             Generate verbose output.
+  --chunksize CHUNKSIZE
+                        Stream a CSV input file or SQL query through the 
+                        validator CHUNKSIZE rows at a time instead of 
+                        loading it into memory. Requires the -m switch.
+  --typed               Store int, float and bool attributes in compact
+                        typed columns.
+  --workers WORKERS     The number of worker processes to use when loading
+                        a CSV file and when validating.
+  --project             Only load the columns that are referenced by the 
+                        metadata file. Requires the -m switch.
+  --lazy                Load each column the first time it is used.
+  --pushdown [PUSHDOWN]
+                        Validate a SQL query inside the database, fetching
+                        at most PUSHDOWN (default 100) example rows per
+                        rule. Requires the -s and -m switches.
+  --sheets [SHEETS [SHEETS ...]]
+                        Load and validate several sheets of an Excel 
+                        spreadsheet, or every sheet if no names are given.
+  --cache CACHE         A directory in which to cache loaded CSV and Excel
+                        files between runs.
+  --cachesize CACHESIZE
+                        The maximum size of the cache directory in MB 
+                        (default 1024).
+  --engine {python,vector}
+                        The validation engine (default python).
+  --counters [COUNTERS]
+                        Only count the errors, keeping at most COUNTERS 
+                        (default 10) example errors per rule.
+  --aggregate           Report each distinct error once, with a count and
+                        the rows that have it.
+  --spill SPILL         Keep the NonRepeatingGroup state, and the Unique and
+                        Composite keys over --keybudget, in temporary files
+                        in the SPILL folder rather than in memory.
+  --distinct            Check each distinct value of a column once.
+  --regex {re,re2,regex}
+                        The regex engine for the Format checks (default re).
+  --regex-timeout REGEX_TIMEOUT
+                        Give up matching a value against a Format after
+                        REGEX_TIMEOUT seconds. Requires the regex package.
+  --regex-stats         Print the time spent on each Format check.
+  --keybudget KEYBUDGET
+                        Keep at most KEYBUDGET keys in memory for each
+                        Unique and Composite check, spilling the rest to
+                        temporary files in the SPILL folder.
+  --bloom BLOOM         Screen the spilled keys with a Bloom filter sized
+                        for BLOOM keys. Requires --keybudget.
+  --incremental [INCREMENTAL]
+                        Only validate the rows that are new or changed since
+                        the last run, using the INCREMENTAL sidecar file
+                        (default <prefix>_incremental.pkl).
+  --triage TRIAGE       Only validate or profile a random sample of TRIAGE
+                        rows and estimate the error rates.
+  --budget BUDGET       Stop checking an attribute once the triage sample has
+                        found BUDGET errors. Requires --triage.
+  --stratify STRATIFY   Stratify the triage sample on the values of the
+                        STRATIFY column. Requires --triage.
 
 
 OUTPUT:
@@ -64,6 +134,124 @@ The --extend will take an existing metadatafile, compare it with the source data
 extend the metadata by adding any missing columns or extending attribute lengths. It
 will also extend enum types where found. 
 
+The --chunksize switch validates a large CSV file or SQL query in chunks of rows so the 
+memory used depends on the chunk size rather than the size of the data. The output is the
+same as a normal validation, although errors are reported chunk by chunk. Parquet and
+Arrow files are streamed one row group (or record batch) at a time instead.
+
+Parquet and Arrow files need the optional pyarrow package. Only the columns that
+are required are read (see --project) and the values are converted to strings by
+Arrow rather than one at a time. With --typed, the int, float and bool columns are
+copied without converting them at all.
+
+The --typed switch stores the int, float and bool attributes (according to the
+metadata) as typed arrays rather than lists of strings. Each value is parsed once
+and memory use drops considerably for numeric data. With a metadata file (and
+without --extend) the typed columns are built as the data is loaded, otherwise
+the loaded columns are converted once the metadata is known.
+
+The --workers switch splits a CSV file into byte ranges that are parsed in 
+parallel by WORKERS processes. The attributes are also validated in parallel, with
+each worker process validating a share of the attributes; the errors are reported in
+the same order as a single process run.
+
+The --project switch only loads the columns referred to by the metadata (including
+Composite, NonRepeatingGroup and Expression references) and the --lazy switch defers
+loading each column until it is first used.
+
+The --pushdown switch compiles the metadata rules into SQL so that a query is
+validated inside the database. The summary counters are the same as a normal
+validation but the counters file only holds up to PUSHDOWN examples per rule.
+
+Unicode text is converted to ascii as it is loaded. An attribute can keep its unicode
+values with "AsciiFold": false in the metadata file.
+
+The --sheets switch loads the named sheets of an Excel spreadsheet (or all of them)
+in parallel, one worker process per sheet (up to WORKERS), and then validates and/or
+profiles each sheet in turn. The output files are named <prefix>_<sheet>_... and if
+no metadata file is supplied the metadata is inferred for each sheet.
+
+The --cache switch keeps a binary copy of each loaded CSV or Excel file in the CACHE
+directory. The next run over the same, unchanged file (same size and modification time,
+or same contents if only the modification time has changed) loads the copy instead of
+parsing the file again. With --lazy, the first run reads every column (or every
+projected column) in one pass so the file can be cached, and later runs only decode
+the columns they use from the copy. The least recently
+used files are removed once the directory is larger than CACHESIZE MB.
+
+The --engine switch selects how the row level checks are run. The python engine checks
+one value at a time. The vector engine (requires NumPy 2.0 or later) screens a whole
+column at a time with NumPy and only checks the rows that may have an error, which is
+faster for large files. Both engines report exactly the same errors.
+
+The --counters switch is for monitoring runs. The summary file is the same but the
+errors are counted as they are found rather than kept, and the counters file only
+holds a random sample of COUNTERS examples of each rule (e.g. each Enum or Format
+check of an attribute). Memory use no longer grows with the number of errors, so it
+can be combined with --chunksize to validate very large files in constant memory.
+
+The --aggregate switch writes one line to the counters file for each distinct error
+(attribute, dimension and description) with a count of the rows that have it and a
+list of those rows or primary keys, e.g. 'Row: 10-250, Row: 300'. The summary file is
+the same. It cannot be used with --counters.
+
+The --spill switch is for NonRepeatingGroup checks on files with more distinct groups
+than fit in memory. The rows are written to hash-partitioned temporary files in the
+SPILL folder and each partition is grouped on its own. The errors are the same. The
+SPILL folder also holds the Unique and Composite key partitions of --keybudget (with
+or without --bloom), which are otherwise written to the system's temporary folder.
+The number of keys each check held when it spilled is printed at the end.
+
+The --keybudget switch bounds the memory used by the Unique and Composite checks. Once a
+check has seen more than KEYBUDGET distinct keys they are written to hash-partitioned
+temporary files (in the SPILL folder, or the system's temporary folder) and the duplicates
+are found one partition at a time once all of the rows have been read. The --bloom switch
+marks each spilled key that may have been seen before with a Bloom filter sized for BLOOM
+keys (about 1.2 bytes per key), so only the marked keys are held in memory when the
+partitions are checked. Set BLOOM to roughly the number of rows. The errors are the same,
+although when streaming the duplicates found in the temporary files are reported last.
+
+The --incremental switch is for feeds that are re-validated every day. A sidecar file
+holds a fingerprint of each row, the row level errors of the rows that had any, the
+Unique, Composite and NonRepeatingGroup indexes and the error counts of the last run.
+Only the rows with a new fingerprint are checked, and when rows have been appended to
+the rows of the last run the Unique, Composite and NonRepeatingGroup checks just add the
+new rows to the stored indexes. The counters and summary files are the same as a full
+validation. The sidecar is ignored (and replaced) if the metadata or columns change.
+Custom validators still see every row. It cannot be used with --chunksize or --pushdown.
+
+The --triage switch gives a quick first look at a new source. Only a random sample of
+TRIAGE rows is validated (a reservoir sample when streaming with --chunksize) and the
+<prefix>_triage.xlsx file holds the estimated error rate and error count of each attribute
+and dimension in the full data, with a 95% confidence interval. The --budget switch stops
+checking an attribute once BUDGET errors have been found in the sample, and the --stratify
+switch samples each value of the STRATIFY column in proportion to its rows (it cannot be
+used with --chunksize). A profile of a triage sample also estimates the null and blank
+rates. The Unique, Composite and NonRepeatingGroup checks only find duplicates within the
+sample. It cannot be used with --incremental or --pushdown.
+
+The --distinct switch runs the Size, Type, Min/Max, Enum, StartsWith and Format checks
+once for each distinct value of a column and then reports the errors against every row
+with that value, so the work depends on the number of distinct values rather than rows.
+The errors are the same. It suits categorical data and combines with --aggregate to
+report each failing value once with a count.
+
+The --regex switch selects the engine for the Format checks. The re2 engine (requires the
+google-re2 package) matches in linear time so no pattern can hang the run; patterns that
+it doesn't support fall back to re. The --regex-timeout switch uses the regex package and
+gives up on a value after REGEX_TIMEOUT seconds, reporting it as a Format error that
+couldn't be checked. Each Format is compiled once and a warning is printed for the
+patterns that can backtrack catastrophically, e.g. (a+)+. The --regex-stats switch
+prints the time spent matching each Format, slowest first. A Format of "Patterns." and
+the name of one of the built in patterns (e.g. "Patterns.EMAIL") uses that pattern; any
+other Format is used as a regex.
+
+Expression rules are parsed once and run in a sandbox: they can use python operators,
+literals, string methods and the functions abs, all, any, bool, float, int, len, max,
+min, round, str and sum, but not imports, other builtins or private attributes. A
+column value is passed to the expression as a number (or True, False or None) if it is
+one and as text otherwise; it is never run as part of the expression.
+
 
 """
 #!/usr/bin/python
@@ -71,15 +259,21 @@ will also extend enum types where found.
 import sys
 import os
 import argparse
-import pyodbc
 import time
-from pyduq.abstractduqvalidator import AbstractDUQValidator
+from pyduq.AbstractDUQValidator import AbstractDUQValidator
 from pyduq.SQLTools import SQLTools
 from pyduq.duqvalidator import DUQValidator
+from pyduq.vectorvalidator import VectorDUQValidator
+from pyduq.sqlpushdown import SQLPushdownValidator
 from pyduq.patterns import Patterns
 from pyduq.duqerror import ValidationError
 from pyduq.filetools import FileTools
 from pyduq.dataprofile import DataProfile
+from pyduq.columnstore import ColumnStore
+from pyduq.metautils import MetaUtils
+from pyduq.datasetcache import DatasetCache
+from pyduq.arrowtools import ArrowTools
+from pyduq.triage import Triage
 
 
 class pyDUQMain(object):
@@ -93,6 +287,23 @@ class pyDUQMain(object):
         self.customValidator = customValidator
         self.sqlURI = sqlURI
         self.sqlQuery = sqlQuery
+        self.columns = None
+        self.unfolded = None
+        self.column_meta = None
+        self.sheets = None
+        self.cache = None
+        self.engine = "python"
+        self.samples = None
+        self.aggregate = False
+        self.spill_dir = None
+        self.distinct = False
+        self.regex = "re"
+        self.regex_timeout = None
+        self.regex_stats = False
+        self.key_budget = None
+        self.bloom = None
+        self.sidecar = None
+        self.triage = None
         
         if ((not filePrefix is None) and (len(filePrefix) > 0)):
             self.outputFilePrefix = filePrefix
@@ -103,10 +314,11 @@ class pyDUQMain(object):
        
        
     def loadSQL(self):
-        cnxn = pyodbc.connect(self.sqlURI)
+        cnxn = SQLTools.connect(self.sqlURI)
         cursor = cnxn.cursor()
         cursor.execute(self.sqlQuery) 
-        self.dataset = SQLTools(cursor).dataset
+        self.dataset = SQLTools(cursor, self.column_meta, self.unfolded).dataset
+        cnxn.close()
         print("SQL query returned " + str(len(self.dataset)) + " columns.")
 
 
@@ -130,22 +342,260 @@ class pyDUQMain(object):
         print("Metadata file generated in " + str(time.time() - stime) + " secs")
 
 
-    def loadCSV(self):
-        self.dataset = FileTools.csvFileToDict(self.inputFile)
+    def typeColumns(self):
+        self.dataset = ColumnStore.fromDataset(self.dataset, self.metadata)
+        print("Converted typed attributes to typed columns.")
+
+
+    def projectColumns(self):
+        self.columns = MetaUtils.referencedColumns(FileTools.JSONtoMeta(self.metaFile))
+        print("Loading the " + str(len(self.columns)) + " columns referenced by the metadata.")
+
+
+    def unfoldColumns(self):
+        self.unfolded = MetaUtils.unfoldedColumns(FileTools.JSONtoMeta(self.metaFile))
+
+
+    def typeOnLoad(self):
+        # the loaders build the typed columns from the Types in the metadata file as the data is read
+        self.column_meta = FileTools.JSONtoMeta(self.metaFile)
+
+
+    def useCache(self, cache_dir:str, cache_size:int):
+        self.cache = DatasetCache(cache_dir, cache_size * 1048576)
+
+
+    def cacheOptions(self, loader:str, sheet:str=None) -> dict:
+        # anything that changes what is loaded from the file is part of the cache key
+        return {"loader":loader, "sheet":sheet, 
+                "columns":(None if self.columns is None else sorted(self.columns)), 
+                "unfolded":(None if self.unfolded is None else sorted(self.unfolded))}
+
+
+    def loadCached(self, options:dict) -> bool:
+        if (self.cache is None):
+            return False
+            
+        dataset = self.cache.load(self.inputFile, options)
+        
+        if (dataset is None):
+            return False
+            
+        self.dataset = dataset
+        print("Loaded " + str(len(self.dataset)) + " columns from the cache.")
+        return True
+
+
+    def saveCached(self, options:dict):
+        if (not self.cache is None and self.cache.save(self.inputFile, self.dataset, options)):
+            print("Saved the dataset to the cache.")
+
+
+    def loadCSV(self, workers:int=None, lazy:bool=False):
+        options = self.cacheOptions("csv")
+        
+        if (self.loadCached(options)):
+            return
+            
+        if (lazy):
+            self.dataset = FileTools.csvFileToLazyDict(self.inputFile, self.column_meta, self.columns, unfolded=self.unfolded)
+        elif (not workers is None and workers > 1):
+            self.dataset = FileTools.csvFileToDictParallel(self.inputFile, workers, self.columns, self.unfolded, self.column_meta)
+        else:
+            self.dataset = FileTools.csvFileToDict(self.inputFile, self.column_meta, self.columns, unfolded=self.unfolded)
         print("CSV file loaded " + str(len(self.dataset)) + " columns.")
+        self.saveCached(options)
 
     
-    def loadXLS(self, sheet:None):
-        self.dataset = FileTools.xlsFileToDict(self.inputFile, sheet)
+    def loadXLS(self, sheet:None, lazy:bool=False):
+        options = self.cacheOptions("xls", sheet)
+        
+        if (self.loadCached(options)):
+            return
+            
+        if (lazy):
+            self.dataset = FileTools.xlsFileToLazyDict(self.inputFile, sheet, self.column_meta, self.columns, unfolded=self.unfolded)
+        else:
+            self.dataset = FileTools.xlsFileToDict(self.inputFile, sheet, self.column_meta, self.columns, unfolded=self.unfolded)
         print("Excel spreadsheet loaded " + str(len(self.dataset)) + " columns.")
+        self.saveCached(options)
+
+
+    def loadParquet(self):
+        self.dataset = ArrowTools.parquetFileToDict(self.inputFile, self.column_meta, self.columns, unfolded=self.unfolded)
+        print("Parquet file loaded " + str(len(self.dataset)) + " columns.")
+
+
+    def loadArrow(self):
+        self.dataset = ArrowTools.arrowFileToDict(self.inputFile, self.column_meta, self.columns, unfolded=self.unfolded)
+        print("Arrow file loaded " + str(len(self.dataset)) + " columns.")
+
+
+    def loadXLSSheets(self, sheets:list, workers:int=None):
+        self.sheets = FileTools.xlsFileSheetsToDict(self.inputFile, sheets, self.column_meta, self.columns, workers=workers, unfolded=self.unfolded)
+        self.sheetFilePrefix = self.outputFilePrefix
+        print("Excel spreadsheet loaded " + str(len(self.sheets)) + " sheets.")
+
+
+    def useSheet(self, sheet_name:str, metaFile:str):
+        # the sheets are validated one at a time, each with its own output files
+        self.dataset = self.sheets.pop(sheet_name)
+        self.outputFilePrefix = self.sheetFilePrefix + "_" + sheet_name
+        self.metaFile = metaFile
+        print("Using sheet '" + sheet_name + "' (" + str(len(self.dataset)) + " columns).")
+
+
+    def isParquet(self) -> bool:
+        return (self.inputFile.endswith(".parquet") or self.inputFile.endswith(".pq"))
+
+
+    def isArrow(self) -> bool:
+        return (self.inputFile.endswith(".arrow") or self.inputFile.endswith(".feather") or self.inputFile.endswith(".ipc"))
+
+
+    def useEngine(self, engine:str):
+        self.engine = engine
+
+
+    def useCounters(self, samples:int):
+        self.samples = samples
+
+
+    def useAggregate(self, aggregate:bool):
+        self.aggregate = aggregate
+
+
+    def useSpill(self, spill_dir:str):
+        self.spill_dir = spill_dir
+
+
+    def useDistinct(self, distinct:bool):
+        self.distinct = distinct
+
+
+    def useKeyBudget(self, key_budget:int, bloom:int):
+        self.key_budget = key_budget
+        self.bloom = bloom
+
+
+    def useIncremental(self, sidecar:str):
+        self.sidecar = sidecar
+
+
+    def useTriage(self, sample_size:int, error_budget:int, stratify:str):
+        if (not sample_size is None):
+            self.triage = Triage(sample_size, error_budget, stratify)
+
+
+    def useRegex(self, backend:str, timeout:float, stats:bool):
+        self.regex = backend
+        self.regex_timeout = timeout
+        self.regex_stats = stats
+
+
+    def printFormatStats(self, lang_validator:DUQValidator):
+        if (not self.regex_stats):
+            return
+            
+        for row in lang_validator.formatStats():
+            print("Format of '" + row["attribute"] + "': " + str(row["values"]) + " values in " + str(row["seconds"]) + " secs (" 
+                  + str(row["microseconds per value"]) + " us per value, " + str(row["timeouts"]) + " timeouts)"
+                  + ("" if row["backtracking risk"] is None else " - " + row["backtracking risk"]))
+
+
+    def printSpilledKeys(self, lang_validator:DUQValidator):
+        for name, count in lang_validator.spilled_keys.items():
+            print("Spilled " + str(count) + " keys of '" + name + "' to temporary files.")
+
+
+    def newValidator(self, dataset:dict) -> DUQValidator:
+        if (self.engine == "vector"):
+            lang_validator = VectorDUQValidator(dataset, self.metadata)
+        else:
+            lang_validator = DUQValidator(dataset, self.metadata)
+
+        if (not self.samples is None):
+            lang_validator.countersOnly(self.samples)
+        elif (self.aggregate):
+            lang_validator.aggregateErrors()
+
+        lang_validator.spillTo(self.spill_dir)
+        lang_validator.boundKeys(self.key_budget, self.bloom)
+        lang_validator.distinctValues(self.distinct)
+        lang_validator.matchFormats(self.regex, self.regex_timeout)
+        lang_validator.triageSample(self.triage)
+
+        return lang_validator
+
+
+    def saveTriage(self, lang_validator:DUQValidator):
+        if (not self.triage is None):
+            FileTools.saveProfile(self.outputFilePrefix + "_triage.xlsx", lang_validator.triageReport())
+
+
+    def validate(self, workers:int=None):
+        try:
+            stime = time.time()
+     
+            lang_validator = self.newValidator(self.dataset)
+            
+            if (self.sidecar is None):
+                lang_validator.validate(self.customValidator, workers)
+            else:
+                # each sheet has its own sidecar unless one was named
+                sidecar = (self.outputFilePrefix + "_incremental.pkl" if len(self.sidecar) == 0 else self.sidecar)
+                lang_validator.validateIncremental(sidecar, self.customValidator)
+            
+            lang_validator.saveCounters(self.outputFilePrefix + "_counters.xlsx")
+            lang_validator.saveCountersSummary(self.outputFilePrefix + "_summary.xlsx")
+            self.saveTriage(lang_validator)
+            self.printSpilledKeys(lang_validator)
+            self.printFormatStats(lang_validator)
+            
+            print("Validation completed in " + str(time.time() - stime) + " secs")
 
+        except ValidationError as e:
+            print (e)
 
-    def validate(self):
+
+    def validateStream(self, chunk_size:int, typed:bool=False):
         try:
             stime = time.time()
+            meta = (self.metadata if typed else None)
      
-            lang_validator = DUQValidator(self.dataset, self.metadata)
+            lang_validator = self.newValidator({})
+            
+            if (not self.sqlURI is None and len(self.sqlURI) > 0):
+                cnxn = SQLTools.connect(self.sqlURI)
+                lang_validator.validateStream(SQLTools.queryChunks(cnxn, self.sqlQuery, chunk_size, meta, self.unfolded), self.customValidator)
+                cnxn.close()
+            elif (self.isParquet()):
+                lang_validator.validateStream(ArrowTools.parquetFileChunks(self.inputFile, meta, self.columns, self.unfolded), self.customValidator)
+            elif (self.isArrow()):
+                lang_validator.validateStream(ArrowTools.arrowFileChunks(self.inputFile, meta, self.columns, self.unfolded), self.customValidator)
+            else:
+                lang_validator.validateStream(FileTools.csvFileChunks(self.inputFile, chunk_size, meta, self.columns, self.unfolded), self.customValidator)
+            
+            lang_validator.saveCounters(self.outputFilePrefix + "_counters.xlsx")
+            lang_validator.saveCountersSummary(self.outputFilePrefix + "_summary.xlsx")
+            self.saveTriage(lang_validator)
+            self.printSpilledKeys(lang_validator)
+            self.printFormatStats(lang_validator)
+            
+            print("Validation completed in " + str(time.time() - stime) + " secs")
+
+        except ValidationError as e:
+            print (e)
+
+
+    def validatePushdown(self, limit:int):
+        try:
+            stime = time.time()
+            
+            cnxn = SQLTools.connect(self.sqlURI)
+            lang_validator = SQLPushdownValidator(cnxn, self.sqlQuery, self.metadata, limit=limit)
             lang_validator.validate(self.customValidator)
+            cnxn.close()
             
             lang_validator.saveCounters(self.outputFilePrefix + "_counters.xlsx")
             lang_validator.saveCountersSummary(self.outputFilePrefix + "_summary.xlsx")
@@ -160,7 +610,7 @@ class pyDUQMain(object):
         try:
             stime = time.time()
             
-            data_profile = DataProfile().profile(self.metadata, self.dataset)
+            data_profile = DataProfile().profile(self.metadata, self.dataset, self.triage)
             FileTools.saveProfile(self.outputFilePrefix + "_profile.xlsx", data_profile)
             
             print("Profile completed in " + str(time.time() - stime) + " secs")
@@ -234,6 +684,110 @@ def main(argv):
                            action="store_true",
                            help='Generate verbose output.')
 
+    my_parser.add_argument('--chunksize',
+                           type=int,
+                           help='Validate a CSV file in chunks of CHUNKSIZE rows.')
+
+    my_parser.add_argument('--typed',
+                           action="store_true",
+                           help='Store int, float and bool attributes in typed columns.')
+
+    my_parser.add_argument('--workers',
+                           type=int,
+                           help='The number of worker processes to use.')
+
+    my_parser.add_argument('--project',
+                           action="store_true",
+                           help='Only load the columns referenced by the metadata.')
+
+    my_parser.add_argument('--lazy',
+                           action="store_true",
+                           help='Load each column the first time it is used.')
+
+    my_parser.add_argument('--pushdown',
+                           nargs='?',
+                           type=int,
+                           const=100,
+                           help='Validate a SQL query inside the database.')
+
+    my_parser.add_argument('--sheets',
+                           nargs='*',
+                           type=str,
+                           help='The names of the sheets to load from an Excel spreadsheet file (default all).')
+
+    my_parser.add_argument('--cache',
+                           type=str,
+                           help='A directory in which to cache loaded files.')
+
+    my_parser.add_argument('--cachesize',
+                           type=int,
+                           default=1024,
+                           help='The maximum size of the cache directory in MB.')
+
+    my_parser.add_argument('--engine',
+                           type=str,
+                           choices=["python", "vector"],
+                           default="python",
+                           help='The validation engine to use.')
+
+    my_parser.add_argument('--counters',
+                           nargs='?',
+                           type=int,
+                           const=10,
+                           help='Only count the errors, keeping COUNTERS examples per rule.')
+
+    my_parser.add_argument('--aggregate',
+                           action="store_true",
+                           help='Report each distinct error once with a count.')
+
+    my_parser.add_argument('--spill',
+                           type=str,
+                           help='The folder to use for the NonRepeatingGroup and --keybudget key temporary files.')
+
+    my_parser.add_argument('--distinct',
+                           action="store_true",
+                           help='Check each distinct value of a column once.')
+
+    my_parser.add_argument('--regex',
+                           type=str,
+                           choices=["re", "re2", "regex"],
+                           default="re",
+                           help='The regex engine for the Format checks.')
+
+    my_parser.add_argument('--regex-timeout',
+                           type=float,
+                           help='The time limit in seconds for matching a value against a Format.')
+
+    my_parser.add_argument('--regex-stats',
+                           action="store_true",
+                           help='Print the time spent on each Format check.')
+
+    my_parser.add_argument('--keybudget',
+                           type=int,
+                           help='The number of Unique and Composite keys to keep in memory before spilling them.')
+
+    my_parser.add_argument('--bloom',
+                           type=int,
+                           help='The number of keys to size the Bloom filter for the spilled keys.')
+
+    my_parser.add_argument('--incremental',
+                           nargs='?',
+                           type=str,
+                           const="",
+                           help='Only validate new or changed rows, using the INCREMENTAL sidecar file.')
+
+    my_parser.add_argument('--triage',
+                           type=int,
+                           help='The number of rows in the triage sample.')
+
+    my_parser.add_argument('--budget',
+                           type=int,
+                           help='The number of errors after which an attribute of the triage sample is no longer checked.')
+
+    my_parser.add_argument('--stratify',
+                           type=str,
+                           help='The column to stratify the triage sample on.')
+
 
 
     # Execute parse_args()
@@ -260,35 +814,138 @@ def main(argv):
     inferFlag = args.infer
     extendFlag = args.extend
     __verbose__ = args.verbose
+    pyduq.useEngine(args.engine)
+    pyduq.useCounters(args.counters)
+    pyduq.useAggregate(args.aggregate)
+    pyduq.useSpill(args.spill)
+    pyduq.useDistinct(args.distinct)
+    pyduq.useRegex(args.regex, args.regex_timeout, args.regex_stats)
+    pyduq.useKeyBudget(args.keybudget, args.bloom)
+    pyduq.useIncremental(args.incremental)
+    
+    if ((not args.budget is None or not args.stratify is None) and args.triage is None):
+        print("--budget and --stratify require --triage.")
+        sys.exit(1)
     
+    try:
+        pyduq.useTriage(args.triage, args.budget, args.stratify)
+    except ValidationError as e:
+        print(e)
+        sys.exit(1)
+    
+    if (args.aggregate and not args.counters is None):
+        print("--aggregate cannot be used with --counters.")
+        sys.exit(1)
+
+    if (not args.spill is None and not os.path.isdir(args.spill)):
+        print("The spill folder '" + args.spill + "' does not exist")
+        sys.exit(1)
 
+    if (not args.bloom is None and args.keybudget is None):
+        print("--bloom requires --keybudget.")
+        sys.exit(1)
+    
+
+    
+    streamFlag = ((not args.chunksize is None) and (len(sqlURI) > 0 or pyduq.inputFile.endswith(".csv") or pyduq.isParquet() or pyduq.isArrow()))
+    
+    if (streamFlag and (pyduq.metaFile is None or extendFlag)):
+        print("Streaming validation requires a metadata file (-m) and cannot be used with --extend.")
+        sys.exit(1)
+    
+    pushdownFlag = (not args.pushdown is None)
+    
+    if (not args.incremental is None and (streamFlag or pushdownFlag)):
+        print("--incremental cannot be used with --chunksize or --pushdown.")
+        sys.exit(1)
+    
+    if (not args.triage is None and (not args.incremental is None or pushdownFlag)):
+        print("--triage cannot be used with --incremental or --pushdown.")
+        sys.exit(1)
+    
+    if (not args.stratify is None and streamFlag):
+        print("--stratify cannot be used with --chunksize.")
+        sys.exit(1)
+    
+    if (pushdownFlag and (len(sqlURI) == 0 or pyduq.metaFile is None or extendFlag)):
+        print("Validating in the database requires a SQL query (-s) and a metadata file (-m) and cannot be used with --extend.")
+        sys.exit(1)
+    
+    # attributes can opt out of the conversion to ascii in the metadata, so we need to know about them before loading
+    if (not pyduq.metaFile is None and os.path.isfile(pyduq.metaFile)):
+        pyduq.unfoldColumns()
+        
+        # an extended metadata file isn't complete until the data has been loaded
+        if (args.typed and not extendFlag):
+            pyduq.typeOnLoad()
+    
+    if (not args.cache is None):
+        pyduq.useCache(args.cache, args.cachesize)
+    
+    if (args.project):
+        # column projection needs the full set of columns when the metadata is being extended
+        if (pyduq.metaFile is None or extendFlag):
+            print("Column projection requires a metadata file (-m) and cannot be used with --extend.")
+            sys.exit(1)
+        pyduq.projectColumns()
     
     if (len(sqlURI) >0 ):
-        pyduq.loadSQL()
+        # when streaming or validating in the database, the query is only loaded in full if it is also being profiled 
+        if ((not streamFlag and not pushdownFlag) or profileFlag):
+            pyduq.loadSQL()
     elif (len(pyduq.inputFile)>0):
         if(pyduq.inputFile.endswith(".csv")):
-            pyduq.loadCSV()
+            # when streaming, the file is only loaded in full if it is also being profiled 
+            if (not streamFlag or profileFlag):
+                pyduq.loadCSV(args.workers, args.lazy)
         elif(pyduq.inputFile.endswith(".xlsx") or pyduq.inputFile.endswith(".xltx")):
-            pyduq.loadXLS(args.sheet)
+            if (not args.sheets is None):
+                pyduq.loadXLSSheets(args.sheets, args.workers)
+            else:
+                pyduq.loadXLS(args.sheet, args.lazy)
+        elif(pyduq.isParquet() or pyduq.isArrow()):
+            # when streaming, the file is only loaded in full if it is also being profiled 
+            if (not streamFlag or profileFlag):
+                if (pyduq.isParquet()):
+                    pyduq.loadParquet()
+                else:
+                    pyduq.loadArrow()
         else:
             print("Unsupported source data file type. Run pyduqmain.py -h for help.")
             sys.exit(1)            
 
-    if (not pyduq.metaFile is None):
-        if (not os.path.isfile(pyduq.metaFile)):
-            print("The metadata-data file '" + pyduq.metaFile + "' does not exist")
-            sys.exit(1)
-        pyduq.loadMeta(extendFlag)
-    else:
-        if (not inferFlag):
-            print("No metadata file was supplied - schema will be inferred from the dataset.")
-        pyduq.inferMeta()
-
-    if (validateFlag):
-        pyduq.validate()
-
-    if (profileFlag):
-        pyduq.profile()
+    # a multi-sheet spreadsheet is validated one sheet at a time
+    sheets = ([None] if pyduq.sheets is None else list(pyduq.sheets))
+    metaFile = pyduq.metaFile
+    
+    for sheet_name in sheets:
+        if (not sheet_name is None):
+            pyduq.useSheet(sheet_name, metaFile)
+            
+        if (not pyduq.metaFile is None):
+            if (not os.path.isfile(pyduq.metaFile)):
+                print("The metadata-data file '" + pyduq.metaFile + "' does not exist")
+                sys.exit(1)
+            pyduq.loadMeta(extendFlag)
+        else:
+            if (not inferFlag):
+                print("No metadata file was supplied - schema will be inferred from the dataset.")
+            pyduq.inferMeta()
+        
+        if (args.typed and len(pyduq.dataset) > 0):
+            pyduq.typeColumns()
+
+        if (validateFlag):
+            if (pushdownFlag):
+                pyduq.validatePushdown(args.pushdown)
+            elif (streamFlag):
+                pyduq.validateStream(args.chunksize, args.typed)
+            else:
+                pyduq.validate(args.workers)
+
+        if (profileFlag):
+            pyduq.profile()
+        
         
     sys.exit(0)
 
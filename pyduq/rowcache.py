@@ -0,0 +1,120 @@
+import os
+import pickle
+import hashlib
+import tempfile
+from array import array
+
+
+class RowCache(object):
+    """ RowCache:
+    The sidecar file of an incremental validation (see DUQValidator.validateIncremental). It holds a fingerprint of
+    each row, in row order, which is a 64 bit hash of the values of the columns that the metadata refers to. It also
+    holds the row level errors of each fingerprint that had any, keyed on the fingerprint: for each attribute, the
+    Mandatory, Size, Type, Min/Max, Enum and StartsWith errors, the Format error template and the Expression outcome.
+    These only depend on the values of the row, so a row with a known fingerprint doesn't have to be checked again
+    wherever it appears. Rows without errors cost nothing more than their fingerprint.
+
+    The Unique and Composite key indexes (see KeyIndex) and the NonRepeatingGroup indexes (see GroupIndex) are kept
+    along with the duplicates found so far, so rows appended to the previous rows only have to be added to them.
+    Indexes that were spilled to temporary files are not kept, and are rebuilt on the next run. counts is the number
+    of errors for each (attribute, error_dimension) in the run.
+
+    A sidecar is only used if it was written for the same metadata and settings (signature) and the same columns.
+    """
+
+    MAGIC = "DUQROWS"
+    VERSION = 1
+    # the number of fingerprints compared at a time when looking for the unchanged rows
+    BLOCK = 65536
+
+    def __init__(self:object, signature:str, columns:list):
+        self.signature = signature
+        self.columns = columns
+        self.fingerprints = array("Q")
+        self.entries = {}
+        self.unique = {}
+        self.composite = {}
+        self.groups = {}
+        self.counts = None
+
+
+    @staticmethod
+    def fingerprintRows(rows) -> array:
+        """
+        The fingerprints of some rows (tuples of values). repr keeps the values apart whatever characters they contain.
+        """
+        fingerprints = array("Q")
+        fingerprints.frombytes(b"".join([hashlib.blake2b(repr(row).encode("utf-8", "surrogatepass"), digest_size=8).digest() for row in rows]))
+
+        return fingerprints
+
+
+    @staticmethod
+    def signatureOf(*settings) -> str:
+        return hashlib.sha1(pickle.dumps(settings, pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+
+    def unchangedRows(self:object, fingerprints:array) -> int:
+        """
+        The number of leading rows whose fingerprints are the same as the previous run's.
+        """
+        count = min(len(self.fingerprints), len(fingerprints))
+        start = 0
+
+        while (start < count):
+            end = min(start + RowCache.BLOCK, count)
+
+            if (self.fingerprints[start:end] != fingerprints[start:end]):
+                while (self.fingerprints[start] == fingerprints[start]):
+                    start += 1
+
+                return start
+
+            start = end
+
+        return count
+
+
+    @staticmethod
+    def load(sidecar:str, signature:str, columns:list):
+        """
+        The sidecar of the previous run, or None if there isn't one that can be used.
+        """
+        if (not os.path.isfile(sidecar)):
+            print("No incremental sidecar found, validating every row.")
+            return None
+
+        try:
+            with open(sidecar, "rb") as f:
+                magic, version, cache = pickle.load(f)
+        except Exception as e:
+            print("The incremental sidecar '" + sidecar + "' could not be read (" + str(e) + "), validating every row.")
+            return None
+
+        if (magic != RowCache.MAGIC or version != RowCache.VERSION or cache.signature != signature or cache.columns != columns):
+            print("The metadata, settings or columns have changed since the incremental sidecar was written, validating every row.")
+            return None
+
+        return cache
+
+
+    def save(self:object, sidecar:str):
+        # the indexes don't need to hold on to the last rows that were added to them
+        for entry in list(self.unique.values()) + list(self.composite.values()):
+            if (not entry is None):
+                entry[0].dataset = None
+                entry[0].duplicates = []
+
+        folder = os.path.dirname(os.path.abspath(sidecar))
+        handle, temp_name = tempfile.mkstemp(dir=folder, suffix=".tmp")
+
+        try:
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump((RowCache.MAGIC, RowCache.VERSION, self), f, pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_name, sidecar)
+        except Exception as e:
+            if (os.path.isfile(temp_name)):
+                os.remove(temp_name)
+
+            raise
@@ -0,0 +1,180 @@
+from pyduq.metautils import MetaUtils
+from pyduq.dataqualityerror import DataQualityDimension
+from pyduq.prefixindex import PrefixIndex
+from pyduq.formatengine import FormatEngine, FormatPattern
+
+
+class RulePlan(object):
+    """ RulePlan:
+    The checks that apply to an attribute, compiled from its metadata once before the data is scanned.
+    Thresholds are parsed, Enum becomes a frozenset, StartsWith a PrefixIndex, Format a compiled regex (see
+    FormatEngine), and only the checks that actually apply are run. checkValue and checkFormat have no side effects.
+    They return (dimension, template, value) specs that the validators turn into errors, including the sample errors
+    of SQLPushdownValidator. A template is a (prefix, suffix) pair that is built once per attribute, the description
+    of an error is prefix + value + suffix (see ErrorStore).
+    """
+
+    BOOL_VALUES = frozenset(["false", "true", "f", "t", "n", "y", "no", "yes", "0", "1"])
+
+    def __init__(self:object, meta_attribute_definition:dict, meta_attribute_key:str, format_engine:FormatEngine=None):
+        self.attribute = meta_attribute_key
+        allow_blank = MetaUtils.isAllowBlank(meta_attribute_definition)
+
+        # mandatory / optional field check
+        self.blank_spec = None
+
+        if (not allow_blank):
+            if (MetaUtils.isTrue(meta_attribute_definition, "Mandatory")):
+                self.blank_spec = (DataQualityDimension.COMPLETENESSMANDATORY.value, ("Error: Mandatory field is BLANK or NULL. A value is required.", ""), "")
+            else:
+                self.blank_spec = (DataQualityDimension.COMPLETENESSOPTIONAL.value, ("Error: Optional field is BLANK or NULL. A default value is required.", ""), "")
+
+        # field length check
+        self.size = None
+
+        if (MetaUtils.exists(meta_attribute_definition, "Size")):
+            self.size = int(meta_attribute_definition["Size"])
+            self.size_template = ("Error: Value '", "' is longer than size '" + str(meta_attribute_definition["Size"]) + "'")
+
+        self.has_default = MetaUtils.exists(meta_attribute_definition, "Default")
+        self.default = (meta_attribute_definition["Default"] if self.has_default else None)
+
+        # field type check, the type errors are only reported if blanks are not allowed
+        self.has_type = MetaUtils.exists(meta_attribute_definition, "Type")
+        self.type = None
+
+        if (self.has_type):
+            if (meta_attribute_definition["Type"] in ["int","integer"]):
+                self.type = "int"
+            elif (meta_attribute_definition["Type"] in ["float","number"]):
+                self.type = "float"
+            elif (meta_attribute_definition["Type"] in ["bool","boolean"]):
+                self.type = "bool"
+
+        self.report_type = (not allow_blank)
+        self.type_template = ("Error: Value '", {"int":"' is not an int. An int was expected", "float":"' is not a float. A float was expected", "bool":"' is not a boolean. A boolean was expected", None:""}[self.type])
+
+        # field value range check. -1 means not set
+        self.min = RulePlan.parseFloat(meta_attribute_definition, "Min")
+        self.max = RulePlan.parseFloat(meta_attribute_definition, "Max")
+        self.default_number = RulePlan.parseFloat(meta_attribute_definition, "Default")
+        self.has_range = (self.has_type and (self.min != -1 or self.max != -1))
+        self.min_template = ("Error: Value '", "' must be >= " + str(self.min))
+        self.max_template = ("Error: Value '", "' must be <= " + str(self.max))
+
+        # enumerated field check. Only strings can ever match a value
+        self.enum = None
+
+        if (MetaUtils.exists(meta_attribute_definition, "Enum")):
+            self.enum = frozenset([item for item in meta_attribute_definition["Enum"] if isinstance(item, str)])
+            self.enum_template = ("Error: Value '", "' is outside the enumeration set '" + str(meta_attribute_definition["Enum"]) + "'")
+
+        # starts with check
+        self.starts_with = None
+
+        if (MetaUtils.exists(meta_attribute_definition, "StartsWith")):
+            self.starts_with = PrefixIndex(meta_attribute_definition["StartsWith"])
+            self.starts_with_template = ("Error: Value '", "' does not begin with any of: '" + str(meta_attribute_definition["StartsWith"]) + "'")
+
+        # format check
+        self.format = None
+
+        if (MetaUtils.exists(meta_attribute_definition, "Format")):
+            self.format = (FormatEngine() if format_engine is None else format_engine).compile(meta_attribute_key, meta_attribute_definition["Format"])
+            self.format_template = ("Error: Value '", "' does not match regex #'" + meta_attribute_definition["Format"] + "'")
+            self.timeout_template = ("Error: Value '", "' could not be matched against regex #'" + meta_attribute_definition["Format"] + "' within " + str(self.format.timeout) + " seconds")
+
+        self.row_checks = (not self.blank_spec is None or not self.size is None or (self.report_type and not self.type is None) or self.has_range or not self.enum is None or not self.starts_with is None)
+
+
+    @staticmethod
+    def parseFloat(meta_attribute_definition:dict, tag:str) -> float:
+        if (MetaUtils.exists(meta_attribute_definition, tag)):
+            try:
+                return float(meta_attribute_definition[tag])
+            except Exception as e:
+                pass
+
+        return -1
+
+
+    def checkValue(self:object, value:str, number=None) -> list:
+        """
+        Run the row level checks against a single value and return a list of (dimension, template, value) specs.
+        number is the already parsed value from a TypedColumn, if there is one.
+        """
+        errors = []
+        blank = (len(value) == 0 or value == "(Null)")
+
+        if (blank and not self.blank_spec is None):
+            errors.append(self.blank_spec)
+
+        if (not self.size is None and not blank and len(value) > self.size):
+            errors.append((DataQualityDimension.METADATACOMPLIANCE.value, self.size_template, value))
+
+        if (self.has_type):
+            self.checkType(value, number, blank, errors)
+
+        if (not self.enum is None and not blank and not (self.has_default and value == self.default) and not value in self.enum):
+            errors.append((DataQualityDimension.METADATACOMPLIANCE.value, self.enum_template, value))
+
+        if (not self.starts_with is None and not blank and not self.starts_with.matches(value)):
+            errors.append((DataQualityDimension.FORMATCONSISTENCY.value, self.starts_with_template, value))
+
+        return errors
+
+
+    def checkType(self:object, value:str, number, blank:bool, errors:list):
+        # the range check is skipped if the value is the default or isn't a valid value for the type
+        is_valid_type = not (self.has_default and value == self.default)
+
+        if (number is None and not self.type is None):
+            if (self.type == "int"):
+                valid = (not blank and MetaUtils.isInt(value))
+            elif (self.type == "float"):
+                valid = (not blank and MetaUtils.isFloat(value))
+            else:
+                valid = (not blank and value.lower() in RulePlan.BOOL_VALUES)
+
+            if (not valid and self.report_type):
+                errors.append((DataQualityDimension.METADATACOMPLIANCE.value, self.type_template, value))
+                is_valid_type = False
+
+        if (is_valid_type and self.has_range):
+            self.checkMinMax(value, (None if isinstance(number, bool) else number), errors)
+
+
+    def checkMinMax(self:object, value:str, number, errors:list):
+        val = -1
+
+        try:
+            val = float(value if number is None else number)
+        except Exception as e:
+            pass
+
+        if (val == -1 or val == self.default_number):
+            return
+
+        if (self.min != -1 and val < self.min):
+            errors.append((DataQualityDimension.METADATACOMPLIANCE.value, self.min_template, value))
+
+        if (self.max != -1 and val > self.max):
+            errors.append((DataQualityDimension.METADATACOMPLIANCE.value, self.max_template, value))
+
+
+    def checkFormat(self:object, value:str) -> tuple:
+        """
+        Return the template of the Format error for a value, or None if the value matches (or is blank).
+        """
+        if (len(value) == 0 or value == "(Null)"):
+            return None
+
+        match = self.format.match(value)
+
+        if (match is None):
+            return self.format_template
+
+        if (match is FormatPattern.TIMEOUT):
+            return self.timeout_template
+
+        return None
@@ -0,0 +1,634 @@
+import re
+import sqlite3
+from pyduq.metautils import MetaUtils
+from pyduq.AbstractDUQValidator import AbstractDUQValidator
+from pyduq.duqvalidator import DUQValidator
+from pyduq.duqerror import ValidationError
+from pyduq.dataqualityerror import DataQualityError, DataQualityDimension
+from pyduq.expressionbuilder import ExpressionBuilder
+from pyduq.formatengine import FormatEngine
+from pyduq.ruleplan import RulePlan
+from pyduq.SQLTools import SQLTools
+from pyduq.asciifold import AsciiFold
+
+
+class SQLDialect(object):
+    """ SQLDialect:
+    Renders the SQL used by the SQLPushdownValidator. This base class sticks to ANSI SQL. There is no portable way to
+    test whether a string is a number or matches a regex, so isInt, isFloat, toFloat and matches return None and the
+    validator checks the Type, Min/Max and Format rules client side instead. Likewise fold returns None as
+    unicode text can't be converted to ascii, so the values are checked as they are stored.
+    """
+
+    def quote(self:object, name:str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def literal(self:object, value) -> str:
+        return "'" + str(value).replace("'", "''") + "'"
+
+    def text(self:object, col:str) -> str:
+        return "TRIM(CAST(" + self.quote(col) + " AS VARCHAR(4000)))"
+
+    def length(self:object, expr:str) -> str:
+        return "CHAR_LENGTH(" + expr + ")"
+
+    def prefix(self:object, expr:str, length:int) -> str:
+        return "SUBSTRING(" + expr + " FROM 1 FOR " + str(length) + ")"
+
+    def rowNumber(self:object) -> str:
+        return "ROW_NUMBER() OVER (ORDER BY (SELECT NULL))"
+
+    def limit(self:object, sql:str, limit:int) -> str:
+        return sql + " FETCH FIRST " + str(int(limit)) + " ROWS ONLY"
+
+    def prepare(self:object, connection):
+        pass
+
+    def isInt(self:object, expr:str) -> str:
+        return None
+
+    def isFloat(self:object, expr:str) -> str:
+        return None
+
+    def toFloat(self:object, expr:str) -> str:
+        return None
+
+    def matches(self:object, expr:str, regex:str) -> str:
+        return None
+
+    def fold(self:object, expr:str) -> str:
+        return None
+
+
+class SQLiteDialect(SQLDialect):
+    """ SQLiteDialect:
+    SQLite has no regex or safe numeric cast so the missing predicates are registered as deterministic functions on
+    the connection. They use the same tests as DUQValidator, so the counts are identical to an in-memory validation.
+    """
+
+    def __init__(self:object):
+        self.patterns = {}
+
+    def text(self:object, col:str) -> str:
+        return "TRIM(CAST(" + self.quote(col) + " AS TEXT), ' ' || char(9, 10, 11, 12, 13))"
+
+    def length(self:object, expr:str) -> str:
+        return "LENGTH(" + expr + ")"
+
+    def prefix(self:object, expr:str, length:int) -> str:
+        return "SUBSTR(" + expr + ", 1, " + str(length) + ")"
+
+    def rowNumber(self:object) -> str:
+        return "ROW_NUMBER() OVER ()"
+
+    def limit(self:object, sql:str, limit:int) -> str:
+        return sql + " LIMIT " + str(int(limit))
+
+    def prepare(self:object, connection):
+        connection.create_function("duq_isint", 1, SQLiteDialect.sqlIsInt, deterministic=True)
+        connection.create_function("duq_isfloat", 1, SQLiteDialect.sqlIsFloat, deterministic=True)
+        connection.create_function("duq_float", 1, SQLiteDialect.sqlFloat, deterministic=True)
+        connection.create_function("duq_match", 2, self.sqlMatch, deterministic=True)
+        connection.create_function("duq_fold", 1, AsciiFold.foldValue, deterministic=True)
+
+    def isInt(self:object, expr:str) -> str:
+        return "duq_isint(" + expr + ")"
+
+    def isFloat(self:object, expr:str) -> str:
+        return "duq_isfloat(" + expr + ")"
+
+    def toFloat(self:object, expr:str) -> str:
+        return "duq_float(" + expr + ")"
+
+    def matches(self:object, expr:str, regex:str) -> str:
+        return "duq_match(" + self.literal(regex) + ", " + expr + ")"
+
+    def fold(self:object, expr:str) -> str:
+        return "duq_fold(" + expr + ")"
+
+    @staticmethod
+    def sqlIsInt(value) -> int:
+        return (1 if MetaUtils.isInt(value) else 0)
+
+    @staticmethod
+    def sqlIsFloat(value) -> int:
+        return (1 if MetaUtils.isFloat(value) else 0)
+
+    @staticmethod
+    def sqlFloat(value):
+        try:
+            return float(value)
+        except Exception as e:
+            return None
+
+    def sqlMatch(self:object, regex:str, value) -> int:
+        if (not regex in self.patterns):
+            self.patterns[regex] = re.compile(regex)
+
+        return (0 if self.patterns[regex].match(value) is None else 1)
+
+
+class SQLRule(object):
+    """ SQLRule:
+    A row level rule compiled into a SQL condition that is true for the rows that violate it. The errors of a violating
+    value are the specs of the attribute's RulePlan with one of the rule's templates, so the sample errors read exactly
+    as they would in memory.
+    """
+
+    def __init__(self:object, name:str, attribute:str, dimension:DataQualityDimension, condition:str, plan:RulePlan, templates:list):
+        self.name = name
+        self.attribute = attribute
+        self.dimension = dimension
+        self.condition = condition
+        self.plan = plan
+        self.templates = templates
+
+
+    def errorSpecs(self:object, value:str) -> list:
+        """
+        The (dimension, template, value) specs of the rule's errors for a value (see RulePlan.checkValue).
+        """
+        if (self.name == "Format"):
+            template = self.plan.checkFormat(value)
+            return ([] if template is None else [(self.dimension.value, template, value)])
+
+        return [spec for spec in self.plan.checkValue(value) if spec[1] in self.templates]
+
+
+class SQLPushdownValidator(AbstractDUQValidator):
+    """ SQLPushdownValidator:
+    Validates the result of a SQL query inside the database. The metadata rules are compiled into COUNT(CASE ...)
+    aggregates, GROUP BY ... HAVING COUNT(*) > 1 queries and LENGTH() tests, so only the counters and at most
+    'limit' example rows per rule are fetched. The counters are the same as AbstractDUQValidator.summariseCounters
+    would produce for a full validation and validation_errors holds the examples.
+
+    Rules that the dialect can't express (and Expression rules) are checked client side by streaming just the
+    columns they need through a DUQValidator. If the dialect can't fold unicode text to ascii then the values
+    are checked as they are stored, client side too.
+    """
+
+    def __init__(self:object, connection, query:str, meta:dict, dialect:SQLDialect=None, limit:int=100):
+        super().__init__({}, meta)
+
+        if (connection is None):
+            raise ValidationError("LANG Exception: connection has not been set", None)
+
+        if (query is None or len(query.strip()) == 0):
+            raise ValidationError("LANG Exception: query has not been set", None)
+
+        self.connection = connection
+        self.query = query.strip().rstrip(";")
+        self.dialect = (SQLPushdownValidator.getDialect(connection) if dialect is None else dialect)
+        self.limit = limit
+        self.batch_size = 10000
+        self.counters = {}
+        self.sample_counts = {}
+        self.fallbacks = []
+        self.primary_key = None
+        self.unfolded = set()
+        self.source = "(SELECT q.*, " + self.dialect.rowNumber() + " AS duq_row FROM (" + self.query + ") q) src"
+
+        # a scratch validator that is used to word the errors for the example rows
+        self.checker = DUQValidator({}, meta)
+
+
+    @staticmethod
+    def getDialect(connection) -> SQLDialect:
+        if (isinstance(connection, sqlite3.Connection)):
+            return SQLiteDialect()
+
+        return SQLDialect()
+
+
+    def validate(self:object, customValidator:str=None):
+        """
+        Validate the query against the metadata inside the database.
+        """
+        if (not customValidator is None and len(customValidator) > 0):
+            print("Custom validators need the data in memory and are not run when validating in the database.")
+
+        self.dialect.prepare(self.connection)
+        columns = self.getColumns()
+        self.unfolded = (MetaUtils.unfoldedColumns(self.metadata) if not self.dialect.fold("") is None else set(columns))
+        rules = []
+        self.fallbacks = []
+
+        for key, item in self.metadata.items():
+            if (MetaUtils.isTrue(item, "PrimaryKey") and key in columns):
+                self.primary_key = key
+                break
+
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():
+            if (meta_attribute_key in columns):
+                rules.extend(self.compileRules(meta_attribute_definition, meta_attribute_key))
+            else:
+                self.addDataQualityError(DataQualityError(meta_attribute_key, error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Attribute '" + meta_attribute_key + "' was not found in the dataset."))
+                self.count(meta_attribute_key, DataQualityDimension.METADATACOMPLIANCE, 1)
+
+        print("Counting " + str(len(rules)) + " rules in the database...")
+        self.countRules(rules)
+
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():
+            if (meta_attribute_key in columns):
+                print("Validating attribute \t'" + meta_attribute_key + "'...", end='\r')
+                self.checkUnique(meta_attribute_definition, meta_attribute_key)
+                self.checkComposite(meta_attribute_definition, meta_attribute_key, columns)
+                self.checkNonRepeatingGroups(meta_attribute_definition, meta_attribute_key, columns)
+                print("Validating attribute \t'" + meta_attribute_key + "'...\t\t..Complete.")
+
+        # anything that couldn't be pushed down to the database is checked client side
+        for meta_attribute_key, meta_attribute_definition, tag in self.fallbacks:
+            print("Checking '" + tag + "' for attribute '" + meta_attribute_key + "' client side...")
+            self.checkClientSide(meta_attribute_definition, meta_attribute_key, tag)
+
+        for meta_attribute_key, meta_attribute_definition in self.metadata.items():
+            if (meta_attribute_key in columns and MetaUtils.exists(meta_attribute_definition, "Expression")):
+                self.evaluateExpression(meta_attribute_definition, meta_attribute_key)
+
+
+    def getColumns(self:object) -> list:
+        cursor = self.execute("SELECT * FROM (" + self.query + ") q WHERE 1 = 0")
+        columns = [column[0] for column in cursor.description]
+        cursor.close()
+
+        return columns
+
+
+    def execute(self:object, sql:str):
+        cursor = self.connection.cursor()
+        cursor.execute(sql)
+        return cursor
+
+
+    def scalar(self:object, sql:str):
+        cursor = self.execute(sql)
+        row = cursor.fetchone()
+        cursor.close()
+
+        return (0 if row is None or row[0] is None else row[0])
+
+
+    def value(self:object, col:str) -> str:
+        """
+        The SQL for the string value the validators would see for a column, i.e. trimmed ascii text with NULL as '(Null)'.
+        """
+        text = self.dialect.text(col)
+        
+        if (not col in self.unfolded):
+            text = self.dialect.fold(text)
+        
+        return "COALESCE(" + text + ", '(Null)')"
+
+
+    def blank(self:object, col:str) -> str:
+        value = self.value(col)
+        return "(" + value + " = '' OR " + value + " = '(Null)')"
+
+
+    def compileRules(self:object, meta_attribute_definition:dict, meta_attribute_key:str) -> list:
+        """
+        Compile the row level rules for an attribute into SQLRules.
+        """
+        rules = []
+        plan = self.checker.getRulePlan(meta_attribute_definition, meta_attribute_key)
+        value = self.value(meta_attribute_key)
+        blank = self.blank(meta_attribute_key)
+        not_blank = "(" + value + " <> '' AND " + value + " <> '(Null)')"
+
+        # mandatory / optional field check
+        if (not MetaUtils.isAllowBlank(meta_attribute_definition)):
+            dimension = (DataQualityDimension.COMPLETENESSMANDATORY if MetaUtils.isTrue(meta_attribute_definition, "Mandatory") else DataQualityDimension.COMPLETENESSOPTIONAL)
+            rules.append(SQLRule("Mandatory", meta_attribute_key, dimension, blank, plan, [plan.blank_spec[1]]))
+
+        # field length check
+        if (MetaUtils.exists(meta_attribute_definition, "Size")):
+            condition = "(" + self.dialect.length(value) + " > " + str(int(meta_attribute_definition["Size"])) + " AND NOT " + blank + ")"
+            rules.append(SQLRule("Size", meta_attribute_key, DataQualityDimension.METADATACOMPLIANCE, condition, plan, [plan.size_template]))
+
+        # field type and range checks
+        if (MetaUtils.exists(meta_attribute_definition, "Type")):
+            type_rules = self.compileTypeRules(meta_attribute_definition, meta_attribute_key, plan)
+
+            if (type_rules is None):
+                self.fallbacks.append((meta_attribute_key, meta_attribute_definition, "Type"))
+            else:
+                rules.extend(type_rules)
+
+        # enumerated field check. Values that equal the default are ignored
+        if (MetaUtils.exists(meta_attribute_definition, "Enum")):
+            enum = [self.dialect.literal(e) for e in meta_attribute_definition["Enum"] if isinstance(e, str)]
+            condition = not_blank
+
+            if (len(enum) > 0):
+                condition += " AND " + value + " NOT IN (" + ", ".join(enum) + ")"
+
+            if (MetaUtils.exists(meta_attribute_definition, "Default") and isinstance(meta_attribute_definition["Default"], str)):
+                condition += " AND " + value + " <> " + self.dialect.literal(meta_attribute_definition["Default"])
+
+            rules.append(SQLRule("Enum", meta_attribute_key, DataQualityDimension.METADATACOMPLIANCE, "(" + condition + ")", plan, [plan.enum_template]))
+
+        # starts with check. An empty prefix matches everything
+        if (MetaUtils.exists(meta_attribute_definition, "StartsWith")):
+            prefixes = meta_attribute_definition["StartsWith"]
+
+            if (not "" in prefixes):
+                tests = [self.dialect.prefix(value, len(s)) + " = " + self.dialect.literal(s) for s in prefixes]
+                condition = "(" + not_blank + ((" AND NOT (" + " OR ".join(tests) + ")") if len(tests) > 0 else "") + ")"
+                rules.append(SQLRule("StartsWith", meta_attribute_key, DataQualityDimension.FORMATCONSISTENCY, condition, plan, [plan.starts_with_template]))
+
+        # format check
+        if (MetaUtils.exists(meta_attribute_definition, "Format")):
+            matches = self.dialect.matches(value, FormatEngine.resolve(meta_attribute_definition["Format"]))
+
+            if (matches is None):
+                self.fallbacks.append((meta_attribute_key, meta_attribute_definition, "Format"))
+            else:
+                condition = "(" + not_blank + " AND " + matches + " = 0)"
+                rules.append(SQLRule("Format", meta_attribute_key, DataQualityDimension.FORMATCONSISTENCY, condition, plan, [plan.format_template, plan.timeout_template]))
+
+        return rules
+
+
+    def compileTypeRules(self:object, meta_attribute_definition:dict, meta_attribute_key:str, plan:RulePlan) -> list:
+        """
+        Compile the Type and Min/Max checks, following the logic of RulePlan.checkType and checkMinMax.
+        Returns None if the dialect can't express them, in which case they are checked client side.
+        """
+        rules = []
+        value = self.value(meta_attribute_key)
+        blank = self.blank(meta_attribute_key)
+        type_name = meta_attribute_definition["Type"]
+        invalid = None
+
+        if (type_name in ["int","integer"]):
+            is_int = self.dialect.isInt(value)
+            invalid = (None if is_int is None else "(" + blank + " OR " + is_int + " = 0)")
+        elif (type_name in ["float","number"]):
+            is_float = self.dialect.isFloat(value)
+            invalid = (None if is_float is None else "(" + blank + " OR " + is_float + " = 0)")
+        elif (type_name in ["bool","boolean"]):
+            invalid = "(" + blank + " OR LOWER(" + value + ") NOT IN ('false', 'true', 'f', 't', 'n', 'y', 'no', 'yes', '0', '1'))"
+
+        if (invalid is None and type_name in ["int","integer","float","number"]):
+            return None
+
+        # the range check is only made when the type is valid and the value isn't the default
+        valid = []
+
+        if (not invalid is None and not MetaUtils.isAllowBlank(meta_attribute_definition)):
+            # only report the type error, not the range error
+            rules.append(SQLRule("Type", meta_attribute_key, DataQualityDimension.METADATACOMPLIANCE, invalid, plan, [plan.type_template]))
+            valid.append("NOT " + invalid)
+
+        default = -1
+
+        if (MetaUtils.exists(meta_attribute_definition, "Default")):
+            if (isinstance(meta_attribute_definition["Default"], str)):
+                valid.append(value + " <> " + self.dialect.literal(meta_attribute_definition["Default"]))
+
+            try:
+                default = float(meta_attribute_definition["Default"])
+            except Exception as e:
+                pass
+
+        for tag, operator in [("Min", "<"), ("Max", ">")]:
+            if (MetaUtils.exists(meta_attribute_definition, tag)):
+                try:
+                    limit = float(meta_attribute_definition[tag])
+                except Exception as e:
+                    continue
+
+                # -1 means 'not set' to RulePlan.checkMinMax
+                if (limit == -1):
+                    continue
+
+                number = self.dialect.toFloat(value)
+
+                if (number is None):
+                    return None
+
+                condition = "(" + " AND ".join(valid + [number + " IS NOT NULL", number + " " + operator + " " + repr(limit), number + " <> -1", number + " <> " + repr(default)]) + ")"
+                rules.append(SQLRule(tag, meta_attribute_key, DataQualityDimension.METADATACOMPLIANCE, condition, plan, [plan.min_template if tag == "Min" else plan.max_template]))
+
+        return rules
+
+
+    def countRules(self:object, rules:list):
+        """
+        Count the violations of every row level rule in a single pass over the data, then fetch some examples.
+        """
+        if (len(rules) == 0):
+            return
+
+        counts = "SELECT " + ", ".join(["COUNT(CASE WHEN " + rule.condition + " THEN 1 END)" for rule in rules]) + " FROM " + self.source
+        cursor = self.execute(counts)
+        row = cursor.fetchone()
+        cursor.close()
+
+        for rule, count in zip(rules, row):
+            self.count(rule.attribute, rule.dimension, count)
+
+            if (count > 0 and self.limit > 0):
+                self.fetchSamples(rule)
+
+
+    def fetchSamples(self:object, rule:SQLRule):
+        key = (self.value(self.primary_key) if not self.primary_key is None else "duq_row")
+        sql = self.dialect.limit("SELECT " + key + ", " + self.value(rule.attribute) + " FROM " + self.source + " WHERE " + rule.condition, self.limit)
+        cursor = self.execute(sql)
+
+        for row in cursor.fetchall():
+            primary_key_value = (SQLTools.cleanValue(row[0]) if not self.primary_key is None else "Row: " + str(row[0]))
+
+            # the Format check doesn't report the primary key in memory either
+            if (rule.name == "Format"):
+                primary_key_value = "<Unspecified>"
+
+            self.checker.addErrorSpecs(rule.attribute, rule.errorSpecs(SQLTools.cleanValue(row[1])), primary_key_value)
+
+        cursor.close()
+        self.keepSamples(rule.name, False)
+
+
+    def checkUnique(self:object, meta_attribute_definition:dict, meta_attribute_key:str):
+        if (MetaUtils.isTrue(meta_attribute_definition, "Unique")):
+            self.checkDuplicates(meta_attribute_definition, meta_attribute_key, [meta_attribute_key], "Unique")
+
+
+    def checkComposite(self:object, meta_attribute_definition:dict, meta_attribute_key:str, columns:list):
+        if (MetaUtils.exists(meta_attribute_definition, "Composite")):
+            composite = self.getColumnList(meta_attribute_definition, meta_attribute_key, "Composite", columns)
+            self.checkDuplicates(meta_attribute_definition, meta_attribute_key, composite, "Composite")
+
+
+    def checkDuplicates(self:object, meta_attribute_definition:dict, meta_attribute_key:str, cols:list, tag:str):
+        """
+        Count the duplicates of a column (Unique) or a set of columns (Composite) with GROUP BY ... HAVING COUNT(*) > 1.
+        Every occurrence after the first is an error, just like the in-memory check.
+        """
+        values = [self.value(col) for col in cols]
+        groups = "SELECT " + ", ".join(values) + ", COUNT(*) AS n FROM " + self.source + " GROUP BY " + ", ".join(values) + " HAVING COUNT(*) > 1"
+        count = self.scalar("SELECT COALESCE(SUM(n - 1), 0) FROM (" + groups + ") d")
+        self.count(meta_attribute_key, DataQualityDimension.UNIQUENESS, count)
+
+        if (count == 0 or self.limit <= 0):
+            return
+
+        cursor = self.execute(self.dialect.limit(groups, self.limit))
+
+        for row in cursor.fetchall():
+            # reproduce the group in a scratch dataset so the checker words the errors
+            if (tag == "Unique"):
+                self.checker.unique_values = {}
+                self.checker.checkUnique(meta_attribute_definition, meta_attribute_key, [row[0]] * row[-1])
+            else:
+                self.checker.composite_keys = {}
+                self.checker.dataset = {col:[row[i]] * row[-1] for i, col in enumerate(cols)}
+                self.checker.checkComposite(meta_attribute_definition, meta_attribute_key)
+
+        cursor.close()
+        self.keepSamples(tag, False)
+
+
+    def checkNonRepeatingGroups(self:object, meta_attribute_definition:dict, meta_attribute_key:str, columns:list):
+        """
+        Count the non-repeating groups: for each value of X with more than one distinct (X, Y, Z, ...) tuple, every
+        distinct tuple is an error.
+        """
+        if (not MetaUtils.exists(meta_attribute_definition, "NonRepeatingGroup")):
+            return
+
+        cols = self.getColumnList(meta_attribute_definition, meta_attribute_key, "NonRepeatingGroup", columns)
+
+        if (len(cols) < 2):
+            raise ValidationError("LANG Exception: " + meta_attribute_key + " - NonRepeatingGroup tag requires at least 2 attributes to be defined. Please refer to the documentation.", None)
+
+        if (not meta_attribute_key in cols):
+            raise ValidationError("LANG Exception: " + meta_attribute_key + " - NonRepeatingGroup tag must include the attribute itself (%1).", None)
+
+        values = [self.value(col) + " AS k" + str(i) for i, col in enumerate(cols)]
+        x = "k" + str(cols.index(meta_attribute_key))
+        distinct = "SELECT DISTINCT " + ", ".join(values) + " FROM " + self.source
+        groups = "SELECT " + x + " FROM (" + distinct + ") d GROUP BY " + x + " HAVING COUNT(*) > 1"
+        count = self.scalar("SELECT COALESCE(SUM(n), 0) FROM (SELECT COUNT(*) AS n FROM (" + distinct + ") d GROUP BY " + x + " HAVING COUNT(*) > 1) g")
+        self.count(meta_attribute_key, DataQualityDimension.UNIQUENESS, count)
+
+        if (count == 0 or self.limit <= 0):
+            return
+
+        sql = "SELECT * FROM (" + distinct + ") d WHERE " + x + " IN (" + groups + ") ORDER BY " + x
+        cursor = self.execute(self.dialect.limit(sql, self.limit))
+        group_data = {}
+
+        for row in cursor.fetchall():
+            group = group_data.setdefault(row[cols.index(meta_attribute_key)], {col:[] for col in cols})
+
+            for i, col in enumerate(cols):
+                group[col].append(row[i])
+
+        cursor.close()
+
+        for group in group_data.values():
+            self.checker.dataset = group
+            self.checker.checkNonRepeatingGroups(meta_attribute_definition, meta_attribute_key)
+
+        self.keepSamples("NonRepeatingGroup", False)
+
+
+    def checkClientSide(self:object, meta_attribute_definition:dict, meta_attribute_key:str, tag:str):
+        """
+        Stream a single column through the checker for a rule that the dialect can't express in SQL.
+        """
+        key = (self.dialect.quote(self.primary_key) if not self.primary_key is None else "duq_row")
+        cursor = self.execute("SELECT " + self.dialect.quote(meta_attribute_key) + ", " + key + " FROM " + self.source)
+        plan = self.checker.getRulePlan(meta_attribute_definition, meta_attribute_key)
+        # the Type check and the range check that follows it
+        rule = SQLRule(tag, meta_attribute_key, DataQualityDimension.METADATACOMPLIANCE, None, plan, [plan.type_template, plan.min_template, plan.max_template])
+
+        for chunk in SQLTools.resultsetChunks(cursor, self.batch_size, unfolded=self.unfolded):
+            attribute = next(iter(chunk.values()))
+            keys = list(chunk.values())[-1]
+
+            if (tag == "Format"):
+                self.checker.checkFormat(meta_attribute_definition, meta_attribute_key, attribute)
+            else:
+                for row_count in range(len(attribute)):
+                    primary_key_value = (keys[row_count] if not self.primary_key is None else "Row: " + keys[row_count])
+                    self.checker.addErrorSpecs(meta_attribute_key, rule.errorSpecs(attribute[row_count]), primary_key_value)
+
+            self.keepSamples(tag, True)
+
+        cursor.close()
+
+
+    def evaluateExpression(self:object, meta_attribute_definition:dict, meta_attribute_key:str):
+        """
+        Expressions are arbitrary python so they are always evaluated client side, streaming only the columns they refer to.
+        """
+        expr = meta_attribute_definition["Expression"].replace("%1", "[" + meta_attribute_key + "]")
+        fields = list(dict.fromkeys(ExpressionBuilder().parseExpr(expr)))
+
+        if (len(fields) == 0):
+            return
+
+        cursor = self.execute("SELECT " + ", ".join([self.dialect.quote(field) for field in fields]) + " FROM " + self.source)
+
+        for chunk in SQLTools.resultsetChunks(cursor, self.batch_size, unfolded=self.unfolded):
+            self.checker.dataset = chunk
+            self.checker.evaluateExpression(meta_attribute_definition, meta_attribute_key)
+            self.keepSamples("Expression", True)
+
+        cursor.close()
+
+
+    def getColumnList(self:object, meta_attribute_definition:dict, meta_attribute_key:str, tag:str, columns:list) -> list:
+        cols = [col.replace("%1", meta_attribute_key) for col in meta_attribute_definition[tag]]
+
+        for col in cols:
+            if (not col in columns):
+                raise ValidationError("LANG Exception: " + meta_attribute_key + " - " + tag + " column '" + col + "' was not found in the query", None)
+
+        return cols
+
+
+    def count(self:object, meta_attribute_key:str, dimension:DataQualityDimension, count:int):
+        counters = self.counters.setdefault(meta_attribute_key, {})
+        counters[dimension.value] = counters.get(dimension.value, 0) + count
+
+
+    def keepSamples(self:object, rule:str, counted:bool):
+        """
+        Move the errors raised by the checker into validation_errors, keeping at most 'limit' examples per attribute and rule.
+        If the errors haven't already been counted by the database (i.e. they were found client side) then count them too.
+        """
+        for error in self.checker.validation_errors:
+            key = (error["attribute"], rule)
+
+            if (counted):
+                counters = self.counters.setdefault(error["attribute"], {})
+                counters[error["error_dimension"]] = counters.get(error["error_dimension"], 0) + 1
+
+            if (self.sample_counts.get(key, 0) < self.limit):
+                self.validation_errors.append(error)
+                self.sample_counts[key] = self.sample_counts.get(key, 0) + 1
+
+        self.checker.validation_errors.clear()
+
+
+    def summariseCounters(self:object) -> dict:
+        """
+        The counters come from the database rather than from the list of errors, which only holds examples.
+        """
+        summary = {}
+
+        for item in self.metadata:
+            summary_row = {}
+            summary_row["attribute"] = item
+            counters = self.counters.get(item, {})
+
+            for name in list(DataQualityDimension):
+                summary_row[name.name] = counters.get(name.value, 0)
+
+            summary[item] = [summary_row]
+
+        return summary
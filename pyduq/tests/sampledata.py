@@ -0,0 +1,98 @@
+import io
+import csv
+import random
+import contextlib
+
+
+class SampleData(object):
+    """ SampleData:
+    A small, reproducible dataset and metadata for the behaviour tests, with errors for every LANG rule
+    (blanks, sizes, types, ranges, enums, prefixes, formats, expressions, duplicate keys and repeating groups).
+    Every mode of validation is checked against a plain DUQValidator.validate of the same data.
+    """
+
+    META = {
+        "id":{"Type":"int", "Mandatory":True, "Unique":True, "PrimaryKey":True},
+        "code":{"Type":"string", "Size":2, "Enum":["A1", "A2", "B1"], "Default":"C9", "Mandatory":True, "Composite":["%1", "name"]},
+        "qty":{"Type":"int", "Min":0, "Max":100, "Default":"-1", "AllowBlank":True, "Expression":"[qty] != '' and int([qty]) < 110"},
+        "price":{"Type":"float", "Min":1, "Max":150},
+        "flag":{"Type":"bool", "Size":4},
+        "name":{"Type":"string", "Size":10, "Format":"^[A-Za-z|]+$", "Composite":["name", "code"]},
+        "grp":{"Type":"int", "NonRepeatingGroup":["%1", "city"]},
+        "city":{"Type":"string", "StartsWith":["Bri", "Syd"], "AllowBlank":True},
+        "pc":{"Type":"string", "Format":"^[0-9]{4}$", "StartsWith":["4", "6"]},
+        "missing":{"Type":"string"}
+    }
+
+    # integers and decimals written with non-ascii digits, which python accepts but the vector masks must not
+    UNICODE_NUMBERS = ["١٢", "１２", "-٣", "1.٥", "१०"]
+
+    @staticmethod
+    def meta() -> dict:
+        return {col:dict(definition) for col, definition in SampleData.META.items()}
+
+
+    @staticmethod
+    def row(rng:random.Random, number:int) -> dict:
+        return {
+            "id":str(number if number % 97 else number - 1),
+            "code":rng.choice(["A1", "A2", "B1", "C9", "", "Zx|y"]),
+            "qty":rng.choice([str(rng.randint(-5, 120)), "abc", "", "1.5", "-1", rng.choice(SampleData.UNICODE_NUMBERS)]),
+            "price":rng.choice([str(round(rng.uniform(0, 200), 2)), "n/a", "", rng.choice(SampleData.UNICODE_NUMBERS)]),
+            "flag":rng.choice(["Y", "N", "maybe", "", "true"]),
+            "name":rng.choice(["Zoë", "José", "Ann", "Bob|x", "Bob", "x" * 30, ""]),
+            "grp":str(rng.randint(0, 40)),
+            "city":rng.choice(["Brisbane", "Perth", "Sydney", ""]),
+            "pc":rng.choice(["4000", "4101", "6000", "2000", "abcd", ""]),
+            "extra":"foo"
+        }
+
+
+    @staticmethod
+    def rows(count:int, seed:int=7, start:int=0) -> list:
+        rng = random.Random(seed)
+        return [SampleData.row(rng, number) for number in range(start, start + count)]
+
+
+    @staticmethod
+    def dataset(rows:list) -> dict:
+        """
+        The rows as a dataset, i.e. a dictionary of columns.
+        """
+        return {col:[row[col] for row in rows] for col in rows[0]}
+
+
+    @staticmethod
+    def writeCSV(fileName:str, rows:list):
+        with open(fileName, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+    @staticmethod
+    def run(validator:object, method:str="validate", *args) -> object:
+        """
+        Run one of the validate methods of a validator without its progress messages, and return the validator.
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            getattr(validator, method)(*args)
+
+        return validator
+
+
+    @staticmethod
+    def errors(validator:object) -> list:
+        """
+        The errors of a validator as plain dictionaries. The primary key is compared as text since a TypedColumn
+        key is reported as a number.
+        """
+        return [{key:(str(value) if key == "primary_key_value" else value) for key, value in dict(error).items()} for error in validator.validation_errors]
+
+
+    @staticmethod
+    def sortedErrors(validator:object) -> list:
+        """
+        The errors of a validator in a fixed order, for the modes that don't report them in the order of validate.
+        """
+        return sorted(SampleData.errors(validator), key=lambda error: sorted([(key, str(value)) for key, value in error.items()]))
@@ -0,0 +1,73 @@
+import unittest
+from collections import Counter
+from sampledata import SampleData
+from pyduq.errorstore import AggregatedStore
+from pyduq.duqvalidator import DUQValidator
+
+
+class AggregatedStoreTestSuite(unittest.TestCase):
+
+    """Identical errors are reported once, with a count and the rows or primary keys that have them as ranges."""
+
+    TEMPLATE = ("Error: Value '", "' is bad")
+
+    def setUp(self):
+        self.dataset = SampleData.dataset(SampleData.rows(600))
+        self.full = SampleData.run(DUQValidator(self.dataset, SampleData.meta()))
+
+
+    def aggregated(self, workers:int=None) -> DUQValidator:
+        validator = DUQValidator(self.dataset, SampleData.meta())
+        validator.aggregateErrors()
+
+        return SampleData.run(validator, "validate", None, workers)
+
+
+    def store(self, locations:list) -> AggregatedStore:
+        errors = AggregatedStore()
+
+        for location in locations:
+            errors.add("x", "Precision", AggregatedStoreTestSuite.TEMPLATE, "v", location)
+
+        return errors
+
+
+    def test_each_distinct_error_is_reported_once(self):
+        validator = self.aggregated()
+        full = Counter((error["attribute"], error["error_dimension"], error["description"]) for error in self.full.validation_errors)
+
+        self.assertEqual({(error["attribute"], error["error_dimension"], error["description"]):error["count"] for error in validator.validation_errors}, dict(full))
+        self.assertEqual(len(validator.validation_errors), len(full))
+        self.assertEqual(validator.summariseCounters(), self.full.summariseCounters())
+
+
+    def test_workers_merge_the_same_entries(self):
+        self.assertEqual([dict(error) for error in self.aggregated(2).validation_errors], [dict(error) for error in self.aggregated().validation_errors])
+
+
+    def test_consecutive_rows_become_ranges(self):
+        for locations, text in [(["Row: 3", "Row: 4", "Row: 5", "Row: 9", "Row: 10", "Row: 12"], "Row: 3-5, Row: 9-10, Row: 12"),
+                                ([7, 8, "9", "Row: 10"], "7-9, Row: 10"),
+                                (["007", "008", "abc", "abc", "abc2", "0"], "007, 008, abc, abc2, 0"),
+                                (["<Unspecified>", "<Unspecified>"], "<Unspecified>"),
+                                ([True, 1, 2], "True, 1-2")]:
+            with self.subTest(locations=locations):
+                errors = self.store(locations)
+
+                self.assertEqual(len(errors), 1)
+                self.assertEqual(dict(errors[0]), {"attribute":"x", "error_dimension":"Precision", "description":"Error: Value 'v' is bad", "count":len(locations), "primary_key_value":text})
+
+
+    def test_merged_ranges_are_joined(self):
+        errors = self.store(["Row: 1", "Row: 2", "Row: 3"])
+        errors.add("y", "Precision", AggregatedStoreTestSuite.TEMPLATE, "w", "Row: 4")
+        errors.extend(self.store(["Row: 4", "Row: 5", "Row: 8"]))
+
+        self.assertEqual([(error["attribute"], error["count"], error["primary_key_value"]) for error in errors], [("x", 6, "Row: 1-5, Row: 8"), ("y", 1, "Row: 4")])
+        self.assertIsInstance(errors[1:], AggregatedStore)
+        self.assertEqual(dict(errors[1:][0]), dict(errors[1]))
+        self.assertEqual(errors.counts(), {("x", "Precision"):6, ("y", "Precision"):1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import random
+import tempfile
+import unittest
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+from pyduq.columnstore import ColumnStore, TypedColumn
+from pyduq.asciifold import AsciiFold
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather
+    from pyduq.arrowtools import ArrowTools
+except ImportError:
+    pa = None
+
+
+@unittest.skipIf(pa is None, "the Arrow loaders require pyarrow")
+class ArrowTestSuite(unittest.TestCase):
+
+    """Int, float and bool Arrow columns are copied into TypedColumns with the same cells as the columns converted from strings."""
+
+    FLOATS = [0.0, -0.0, 1.0, -2.5, 0.1, 1e-4, 9.5e-5, 1e-6, 1e-7, 5e-10, 1e10, 12345678901.5, 1e15, 1e16, 1.5e300, float("inf"), float("-inf"), float("nan"), None]
+
+    def converted(self, column, type_name:str) -> TypedColumn:
+        return ColumnStore.toColumn({"Type":type_name}, ArrowTools.columnToList(column))
+
+
+    def assertSameColumn(self, typed:TypedColumn, converted:TypedColumn):
+        self.assertIsInstance(typed, TypedColumn)
+        self.assertEqual(list(typed), list(converted))
+
+        for row in range(len(converted)):
+            self.assertEqual(typed.isNull(row), converted.isNull(row))
+            self.assertEqual(typed.isValid(row), converted.isValid(row))
+            self.assertEqual(str(typed.number(row)), str(converted.number(row)))
+
+        # the column can still be appended to
+        typed.extend(["7", "(Null)"])
+        converted.extend(["7", "(Null)"])
+        self.assertEqual(list(typed), list(converted))
+
+
+    def test_numbers_are_copied_with_the_same_text(self):
+        rng = random.Random(3)
+        ints = pa.array([(None if rng.random() < 0.1 else rng.randint(-2**63, 2**63 - 1)) for row in range(100)], pa.int64())
+        floats = pa.array(ArrowTestSuite.FLOATS + [rng.uniform(-1, 1) * 10 ** rng.randint(-12, 18) for row in range(100)], pa.float64())
+
+        for column, type_name in [(pa.chunked_array([ints.slice(3), ints.slice(50, 13)]), "int"), (pa.array([1, None, -128], pa.int8()), "integer"),
+                                  (pa.chunked_array([floats, floats.slice(7)]), "float"), (pa.array([True, None, False]), "boolean")]:
+            with self.subTest(type=str(column.type), type_name=type_name):
+                self.assertSameColumn(ArrowTools.typedColumn(column, {"Type":type_name}), self.converted(column, type_name))
+
+
+    def test_other_columns_are_converted_from_strings(self):
+        for column, type_name in [(pa.array([1, 2**64 - 1], pa.uint64()), "int"), (pa.array([0.1], pa.float32()), "float"),
+                                  (pa.array([1, 2]), "float"), (pa.array(["1", "2"]), "int"), (pa.array([1, 2]), "string")]:
+            with self.subTest(type=str(column.type), type_name=type_name):
+                self.assertIsNone(ArrowTools.typedColumn(column, {"Type":type_name}))
+
+
+    def test_typed_parquet_matches_converted(self):
+        rows = SampleData.rows(600)
+        meta = SampleData.meta()
+        flags = {"Y":True, "N":False}
+        columns = {col:pa.array([row[col] for row in rows]) for col in rows[0]}
+        columns.update({
+            "id":pa.array([int(row["id"]) for row in rows]),
+            "qty":pa.array([(int(row["qty"]) if row["qty"].lstrip("-").isdecimal() and row["qty"].isascii() else None) for row in rows]),
+            "price":pa.array([(float(row["price"]) if row["price"].replace(".", "").isdecimal() and row["price"].isascii() else None) for row in rows]),
+            "flag":pa.array([flags.get(row["flag"]) for row in rows]),
+            "grp":pa.array([int(row["grp"]) for row in rows], pa.int32())
+        })
+        table = pa.table(columns)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = os.path.join(temp_dir, "sample.parquet")
+            pq.write_table(table, fileName, row_group_size=200)
+            typed = ArrowTools.parquetFileToDict(fileName, meta)
+            converted = ColumnStore.fromDataset(ArrowTools.parquetFileToDict(fileName), meta)
+
+        for col in ["id", "qty", "price", "flag", "grp"]:
+            self.assertSameColumn(typed[col], converted[col])
+
+        meta = {col:definition for col, definition in meta.items() if col in typed}
+        self.assertEqual(SampleData.errors(SampleData.run(DUQValidator(typed, meta))), SampleData.errors(SampleData.run(DUQValidator(converted, meta))))
+
+
+    def test_row_groups_and_batches_are_read_one_at_a_time(self):
+        table = pa.table({"id":pa.array(range(250)), "name":pa.array([" Zoë "] * 250), "unused":pa.array([None] * 250, pa.string())})
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            parquetFile = os.path.join(temp_dir, "sample.parquet")
+            arrowFile = os.path.join(temp_dir, "sample.arrow")
+            featherFile = os.path.join(temp_dir, "sample.feather")
+            pq.write_table(table, parquetFile, row_group_size=100)
+            pq.write_table(table.slice(0, 0), os.path.join(temp_dir, "empty.parquet"))
+
+            with pa.OSFile(arrowFile, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    for batch in table.to_batches(max_chunksize=60):
+                        writer.write_batch(batch)
+
+            pa.feather.write_feather(table, featherFile)
+
+            for chunks, sizes in [(ArrowTools.parquetFileChunks(parquetFile, columns={"id", "name"}), [100, 100, 50]),
+                                  (ArrowTools.arrowFileChunks(arrowFile, columns={"id", "name"}), [60, 60, 60, 60, 10])]:
+                chunks = list(chunks)
+
+                self.assertEqual([len(chunk["id"]) for chunk in chunks], sizes)
+                self.assertTrue(all(list(chunk) == ["id", "name"] for chunk in chunks))
+                self.assertEqual([value for chunk in chunks for value in chunk["id"]], [str(row) for row in range(250)])
+
+            # trimmed and folded, like the csv loader
+            self.assertEqual(set(ArrowTools.arrowFileToDict(featherFile, columns={"name"})["name"]), {"Zoe"})
+            self.assertEqual(set(ArrowTools.parquetFileToDict(parquetFile, unfolded={"name"})["name"]), {"Zoë"})
+            self.assertEqual(ArrowTools.parquetFileToDict(parquetFile, columns={"unused"})["unused"], ["(Null)"] * 250)
+            self.assertEqual(list(ArrowTools.parquetFileChunks(os.path.join(temp_dir, "empty.parquet"), columns={"id"})), [{"id":[]}])
+
+
+    def test_streamed_parquet_matches_full(self):
+        rows = SampleData.rows(600)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = os.path.join(temp_dir, "sample.parquet")
+            pq.write_table(pa.table({col:pa.array([row[col] for row in rows]) for col in rows[0]}), fileName, row_group_size=64)
+            stream = SampleData.run(DUQValidator({}, SampleData.meta()), "validateStream", ArrowTools.parquetFileChunks(fileName, SampleData.meta()))
+
+        full = SampleData.run(DUQValidator({col:AsciiFold.foldColumn(values) for col, values in SampleData.dataset(rows).items()}, SampleData.meta()))
+
+        self.assertEqual(stream.summariseCounters(), full.summariseCounters())
+
+
+    def test_values_that_cannot_be_cast_are_converted_one_at_a_time(self):
+        self.assertEqual(ArrowTools.columnToList(pa.array([[1, 2], None, []])), ["[1, 2]", "(Null)", "[]"])
+        self.assertEqual(ArrowTools.columnToList(pa.array([1.5, None, 2.0])), ["1.5", "(Null)", "2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import json
+import tempfile
+import unittest
+from sampledata import SampleData
+from pyduq.asciifold import AsciiFold
+from pyduq.metautils import MetaUtils
+from pyduq.filetools import FileTools
+from pyduq.duqvalidator import DUQValidator
+
+
+class AsciiFoldTestSuite(unittest.TestCase):
+
+    """Columns are folded to ascii a column at a time unless their attribute opts out with "AsciiFold": false."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.csv")
+        self.rows = SampleData.rows(300)
+        SampleData.writeCSV(self.fileName, self.rows)
+        self.meta = SampleData.meta()
+        self.meta["name"]["AsciiFold"] = False
+        self.meta["city"]["AsciiFold"] = "false"
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def test_ascii_column_is_returned_as_is(self):
+        values = ["Ann", "Bob", "(Null)", ""]
+
+        self.assertIs(AsciiFold.foldColumn(values), values)
+        self.assertEqual(AsciiFold.foldColumn(["Zoë", "Ann", "Müller", "日本"]), ["Zoe", "Ann", "Muller", "Ri Ben "])
+        self.assertEqual(AsciiFold.foldValue(12), 12)
+
+
+    def test_repeated_values_are_transliterated_once(self):
+        AsciiFold.transliterate.cache_clear()
+        AsciiFold.foldColumn(["Zoë", "José", "Ann"] * 100)
+
+        self.assertEqual(AsciiFold.transliterate.cache_info().misses, 2)
+
+
+    def test_only_false_opts_out(self):
+        self.assertEqual(MetaUtils.unfoldedColumns(self.meta), {"name"})
+
+
+    def test_opted_out_column_keeps_unicode(self):
+        unfolded = MetaUtils.unfoldedColumns(self.meta)
+        names = [row["name"] for row in self.rows]
+
+        for loaded in [FileTools.csvFileToDict(self.fileName, unfolded=unfolded), FileTools.csvFileToDictParallel(self.fileName, 2, None, unfolded),
+                       FileTools.rowsToDict(["name", "city"], self.rows, unfolded=unfolded)]:
+            self.assertEqual(loaded["name"], names)
+
+        folded = FileTools.csvFileToDict(self.fileName)
+        self.assertEqual(folded["name"], AsciiFold.foldColumn(names))
+        self.assertNotEqual(folded["name"], names)
+
+
+    def test_opted_out_column_fails_its_format(self):
+        metaFile = os.path.join(self.temp_dir.name, "sample_meta.json")
+
+        with open(metaFile, 'w') as f:
+            json.dump(self.meta, f)
+
+        unfolded = MetaUtils.unfoldedColumns(FileTools.JSONtoMeta(metaFile))
+        errors = {}
+
+        for name, columns in [("folded", None), ("unfolded", unfolded)]:
+            validator = SampleData.run(DUQValidator(FileTools.csvFileToDict(self.fileName, unfolded=columns), SampleData.meta()))
+            errors[name] = [error["description"] for error in SampleData.errors(validator) if error["attribute"] == "name" and error["error_dimension"] == "Format Consistency"]
+
+        # 'Zoë' and 'José' only fail the ascii Format of name when they are not folded
+        self.assertEqual(set(errors["unfolded"]) - set(errors["folded"]), set(["Error: Value 'Zoë' does not match regex #'^[A-Za-z|]+$'", "Error: Value 'José' does not match regex #'^[A-Za-z|]+$'"]))
+        self.assertEqual(len(errors["unfolded"]) - len(errors["folded"]), [row["name"] for row in self.rows].count("Zoë") + [row["name"] for row in self.rows].count("José"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from openpyxl import Workbook
+from sampledata import SampleData
+from pyduq.SQLTools import SQLTools
+from pyduq.filetools import FileTools
+from pyduq.columnstore import ColumnStore, TypedColumn
+from pyduq.duqerror import ValidationError
+
+
+class ColumnStoreTestSuite(unittest.TestCase):
+
+    """The loaders build the typed columns as they read the data, with the same cells as the loaded strings converted afterwards."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.rows = SampleData.rows(600)
+        self.meta = SampleData.meta()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.csv")
+        SampleData.writeCSV(self.fileName, self.rows)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def assertTyped(self, typed:dict, loaded:dict):
+        self.assertEqual(list(typed), list(loaded))
+
+        for col in loaded:
+            if (ColumnStore.columnType(self.meta.get(col)) is None):
+                self.assertEqual(typed[col], loaded[col])
+                continue
+
+            converted = ColumnStore.toColumn(self.meta[col], loaded[col])
+
+            self.assertIsInstance(typed[col], TypedColumn)
+            self.assertEqual(list(typed[col]), list(loaded[col]))
+            self.assertEqual([typed[col].number(row) for row in range(len(converted))], [converted.number(row) for row in range(len(converted))])
+
+
+    def writeExcel(self, fileName:str, sheets:dict):
+        workbook = Workbook()
+        workbook.remove(workbook.active)
+
+        for sheet_name, rows in sheets.items():
+            sheet = workbook.create_sheet(sheet_name)
+            sheet.append(list(rows[0]))
+
+            for row in rows:
+                sheet.append(list(row.values()))
+
+        workbook.save(fileName)
+
+
+    def test_csv_loads_typed(self):
+        self.assertTyped(FileTools.csvFileToDict(self.fileName, self.meta), FileTools.csvFileToDict(self.fileName))
+
+
+    def test_parallel_csv_loads_typed(self):
+        self.assertTyped(FileTools.csvFileToDictParallel(self.fileName, 3, meta=self.meta), FileTools.csvFileToDict(self.fileName))
+
+
+    def test_lazy_csv_loads_typed(self):
+        lazy = FileTools.csvFileToLazyDict(self.fileName, self.meta, columns=set(["id", "qty", "price", "flag"]))
+
+        self.assertTyped({col:lazy[col] for col in lazy}, FileTools.csvFileToDict(self.fileName, columns=set(["id", "qty", "price", "flag"])))
+
+
+    def test_excel_loads_typed(self):
+        fileName = os.path.join(self.temp_dir.name, "sample.xlsx")
+        self.writeExcel(fileName, {"first":self.rows[:300], "second":self.rows[300:]})
+
+        self.assertTyped(FileTools.xlsFileToDict(fileName, "first", self.meta), FileTools.xlsFileToDict(fileName, "first"))
+
+        typed = FileTools.xlsFileSheetsToDict(fileName, ["first", "second"], self.meta, workers=2)
+        self.assertTyped(typed["second"], FileTools.xlsFileToDict(fileName, "second"))
+
+
+    def test_sql_loads_typed(self):
+        columns = list(self.rows[0])
+        connection = sqlite3.connect(":memory:")
+        connection.execute("create table sample (" + ", ".join(['"' + col + '" TEXT' for col in columns]) + ")")
+        connection.executemany("insert into sample values (" + ", ".join(["?"] * len(columns)) + ")", [[row[col] for col in columns] for row in self.rows])
+        loaded = []
+
+        for meta in [self.meta, None]:
+            cursor = connection.cursor()
+            cursor.execute("select * from sample")
+            loaded.append(SQLTools(cursor, meta).dataset)
+
+        connection.close()
+        self.assertTyped(*loaded)
+
+
+    def test_typed_parts_join_without_parsing(self):
+        values = [row["flag"] for row in self.rows] + ["(Null)", "", "TRUE", "yes"]
+
+        for type_name, cells in [("bool", values), ("int", [row["qty"] for row in self.rows]), ("float", [row["price"] for row in self.rows])]:
+            with self.subTest(type_name=type_name):
+                joined = TypedColumn(type_name)
+
+                # each part sees the bool spellings in a different order and most parts don't end on a byte of the bitmaps
+                for start, end in [(0, 13), (13, 16), (16, 300), (300, len(cells))]:
+                    joined.extend(ColumnStore.toColumn({"Type":type_name}, cells[start:end]))
+
+                whole = ColumnStore.toColumn({"Type":type_name}, cells)
+
+                self.assertEqual(list(joined), list(whole))
+                self.assertEqual([joined.number(row) for row in range(len(whole))], [whole.number(row) for row in range(len(whole))])
+                self.assertEqual([joined.isValid(row) for row in range(len(whole))], [whole.isValid(row) for row in range(len(whole))])
+
+
+    def test_cells_round_trip(self):
+        cells = {
+            "int":["1", "-7", "007", "+3", "1_000", " 4", "99999999999999999999", "1.0", "abc", "(Null)", ""],
+            "float":["1.5", "2", "-0", "0.0", "1e5", "1E-7", "inf", "nan", "12345678901234567890", "1.", "n/a", "(Null)", ""],
+            "bool":["Y", "n", "True", "FALSE", "0", "yes", "maybe", "(Null)", ""]
+        }
+        numbers = {
+            "int":[1, -7, 7, 3, 1000, 4, 99999999999999999999, None, None, None, None],
+            "float":[1.5, 2.0, -0.0, 0.0, 1e5, 1e-7, float("inf"), "nan", 1.2345678901234567e19, 1.0, None, None, None],
+            "bool":[True, False, True, False, False, True, None, None, None]
+        }
+
+        for type_name, values in cells.items():
+            with self.subTest(type_name=type_name):
+                column = ColumnStore.toColumn({"Type":type_name}, values)
+
+                self.assertEqual(list(column), values)
+                self.assertEqual(column[-1], values[-1])
+                self.assertEqual(column[2:5], values[2:5])
+                self.assertEqual([(str(number) if number != number else number) for number in map(column.number, range(len(values)))], numbers[type_name])
+                self.assertEqual([column.isNull(row) for row in range(len(values))], [value == "(Null)" for value in values])
+                self.assertEqual([column.isBlank(row) for row in range(len(values))], [value == "" for value in values])
+
+        # only the cells that can't be rebuilt from the typed value keep their text
+        self.assertEqual(sorted(ColumnStore.toColumn({"Type":"float"}, ["1.5", "2", "1e5", "-0"]).text.values()), ["-0", "1e5"])
+
+
+    def test_only_typed_attributes_are_converted(self):
+        dataset = {"qty":["1", "2"], "name":["a", "b"], "extra":["x", "y"]}
+
+        ColumnStore.fromDataset(dataset, {"qty":{"Type":"integer"}, "name":{"Type":"string"}})
+
+        self.assertIsInstance(dataset["qty"], TypedColumn)
+        self.assertTrue(dataset["qty"].matches("int"))
+        self.assertIsInstance(dataset["name"], list)
+        self.assertIsInstance(dataset["extra"], list)
+        self.assertRaises(IndexError, dataset["qty"].__getitem__, 2)
+        self.assertRaises(ValidationError, TypedColumn, "date")
+        self.assertRaises(ValidationError, ColumnStore.fromDataset, dataset, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+from sampledata import SampleData
+from pyduq.keyindex import KeyIndex
+from pyduq.columnstore import ColumnStore
+from pyduq.duqvalidator import DUQValidator
+
+
+class CompositeKeysTestSuite(unittest.TestCase):
+
+    """Composite keys are tuples of the column values, shared by every attribute that declares the same columns."""
+
+    def descriptions(self, validator:DUQValidator, attribute:str) -> list:
+        return [error["description"] for error in validator.validation_errors if error["attribute"] == attribute]
+
+
+    def test_separator_in_a_value_is_not_a_duplicate(self):
+        dataset = {"a":["x|y", "x", "x|y", "p"], "b":["z", "y|z", "z", "q|r"], "c":["1", "2", "3", "4"]}
+        validator = SampleData.run(DUQValidator(dataset, {"a":{"Composite":["%1", "b"]}, "b":{}, "c":{}}))
+
+        # 'x|y' + 'z' and 'x' + 'y|z' are different keys even though they join to the same text
+        self.assertEqual(self.descriptions(validator, "a"), ["Error: Duplicate composite meta_attribute_key: 'a+b', values: 'x|y|z'"])
+
+
+    def test_attributes_with_the_same_columns_share_an_index(self):
+        dataset = {"a":["1", "1", "2", "1"], "b":["x", "x", "y", "x"]}
+        meta = {"a":{"Composite":["%1", "b", "a"]}, "b":{"Composite":["a", "b"]}}
+
+        with mock.patch.object(KeyIndex, "add", autospec=True, side_effect=KeyIndex.add) as add:
+            validator = SampleData.run(DUQValidator(dataset, meta))
+
+        self.assertEqual(list(validator.composite_keys), [("a", "b")])
+        # the rows are hashed once, the second attribute gets the duplicates that were already found
+        self.assertEqual(len(set(map(id, [call.args[0] for call in add.call_args_list]))), 1)
+        self.assertEqual(self.descriptions(validator, "a"), ["Error: Duplicate composite meta_attribute_key: 'a+b+a', values: '1|x'"] * 2)
+        self.assertEqual(self.descriptions(validator, "b"), ["Error: Duplicate composite meta_attribute_key: 'a+b', values: '1|x'"] * 2)
+
+
+    def test_keys_share_the_column_values(self):
+        first = ["k" + str(row % 5) for row in range(20)]
+        second = [str(row % 2) for row in range(20)]
+        index = KeyIndex()
+
+        duplicates = index.add(first, [first, second])
+
+        self.assertEqual(duplicates, list(zip(first, second))[10:])
+        self.assertEqual(len(index.seen), 10)
+        self.assertTrue(all(isinstance(key, tuple) and any(value is key[0] for value in first) for key in index.seen))
+        # adding the same dataset again just returns the same duplicates
+        self.assertIs(index.add(first, [first, second]), duplicates)
+
+
+    def test_typed_columns_are_keyed_on_their_text(self):
+        dataset = {"n":ColumnStore.toColumn({"Type":"int"}, ["1", "01", "1", "(Null)", "(Null)"]), "s":["a", "a", "a", "b", "b"]}
+        validator = SampleData.run(DUQValidator(dataset, {"n":{"Type":"int", "AllowBlank":True, "Composite":["%1", "s"]}, "s":{}}))
+
+        self.assertEqual(self.descriptions(validator, "n"), ["Error: Duplicate composite meta_attribute_key: 'n+s', values: '1|a'", "Error: Duplicate composite meta_attribute_key: 'n+s', values: '(Null)|b'"])
+
+
+if __name__ == '__main__':
+    unittest.main()
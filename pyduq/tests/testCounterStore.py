@@ -0,0 +1,93 @@
+import unittest
+from collections import Counter
+from sampledata import SampleData
+from pyduq.errorstore import CounterStore
+from pyduq.duqerror import ValidationError
+from pyduq.duqvalidator import DUQValidator
+
+
+class CounterStoreTestSuite(unittest.TestCase):
+
+    """In counters-only mode every error is counted but only a reservoir sample of each rule's errors is kept."""
+
+    TEMPLATE = ("Error: Value '", "' is bad")
+
+    def setUp(self):
+        self.dataset = SampleData.dataset(SampleData.rows(600))
+        self.full = SampleData.run(DUQValidator(self.dataset, SampleData.meta()))
+
+
+    def counters(self, sample_size:int, workers:int=None) -> DUQValidator:
+        validator = DUQValidator(self.dataset, SampleData.meta())
+        validator.countersOnly(sample_size)
+
+        return SampleData.run(validator, "validate", None, workers)
+
+
+    def rules(self, errors) -> Counter:
+        return Counter((error["attribute"], error["error_dimension"]) for error in errors)
+
+
+    def test_totals_match_every_error(self):
+        for sample_size, workers in [(0, None), (3, None), (3, 2)]:
+            with self.subTest(sample_size=sample_size, workers=workers):
+                validator = self.counters(sample_size, workers)
+
+                self.assertEqual(validator.validation_errors.total, len(self.full.validation_errors))
+                self.assertEqual(sum(validator.validation_errors.counts().values()), len(self.full.validation_errors))
+                self.assertEqual(validator.summariseCounters(), self.full.summariseCounters())
+
+
+    def test_samples_are_errors_in_the_order_found(self):
+        validator = self.counters(3)
+        samples = SampleData.errors(validator)
+        full = SampleData.errors(self.full)
+        remaining = iter(full)
+
+        # the samples are a subsequence of the errors of validate
+        self.assertTrue(all(error in remaining for error in samples))
+        store = validator.validation_errors
+        self.assertEqual(max(Counter(zip(store.attribute_ids, store.dimension_ids, store.template_ids)).values()), 3)
+        self.assertEqual(set(self.rules(samples)), set(self.rules(full)))
+        self.assertEqual(len(self.counters(0).validation_errors), 0)
+
+
+    def test_every_error_is_equally_likely_to_be_sampled(self):
+        picked = Counter()
+
+        for seed in range(400):
+            errors = CounterStore(10, seed)
+
+            for row in range(100):
+                errors.add("x", "Precision", CounterStoreTestSuite.TEMPLATE, str(row))
+
+            picked.update(int(error["description"].split("'")[1]) // 10 for error in errors)
+
+        # each tenth of the errors is expected in 400 of the 4000 samples
+        self.assertTrue(all(300 < picked[tenth] < 500 for tenth in range(10)), picked)
+
+
+    def test_merged_samples_keep_their_counts(self):
+        left = CounterStore(5, 1)
+        right = CounterStore(5, 2)
+
+        for row in range(40):
+            left.add("x", "Precision", CounterStoreTestSuite.TEMPLATE, "left" + str(row))
+
+        for row in range(10):
+            right.add("x", "Precision", CounterStoreTestSuite.TEMPLATE, "right" + str(row))
+            right.add("y", "Precision", CounterStoreTestSuite.TEMPLATE, "y" + str(row))
+
+        left.extend(right)
+
+        self.assertEqual(left.total, 60)
+        self.assertEqual(left.counts(), {("x", "Precision"):50, ("y", "Precision"):10})
+        self.assertEqual(self.rules(left), {("x", "Precision"):5, ("y", "Precision"):5})
+        # the merged errors keep the order they were found in
+        rows = [int(error["description"].split("'")[1][1:]) for error in left if error["attribute"] == "y"]
+        self.assertEqual(rows, sorted(rows))
+        self.assertRaises(ValidationError, CounterStore, -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import gc
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sampledata import SampleData
+from pyduq.datasetcache import DatasetCache
+from pyduq.filetools import FileTools
+
+
+class DatasetCacheTestSuite(unittest.TestCase):
+
+    """A cached dataset is only used for an unchanged file, is only hashed when the modification time changes, and its map is closed."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.csv")
+        SampleData.writeCSV(self.fileName, SampleData.rows(600))
+        self.cache = DatasetCache(os.path.join(self.temp_dir.name, "cache"))
+        self.data = FileTools.csvFileToDict(self.fileName)
+        self.cache.save(self.fileName, self.data)
+
+
+    def tearDown(self):
+        self.cache.clear()
+        self.temp_dir.cleanup()
+
+
+    def mapCount(self):
+        return sum([len(maps) for maps in self.cache.maps.values()])
+
+
+    def test_hit_does_not_hash(self):
+        with mock.patch.object(DatasetCache, "fileHash", wraps=DatasetCache.fileHash) as fileHash:
+            dataset = self.cache.load(self.fileName)
+
+            self.assertEqual(fileHash.call_count, 0)
+            self.assertEqual(dict(dataset.items()), self.data)
+
+            # a touched file is hashed and, as the contents are the same, still used
+            stat = os.stat(self.fileName)
+            os.utime(self.fileName, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+            self.assertIsNotNone(self.cache.load(self.fileName))
+            self.assertEqual(fileHash.call_count, 1)
+
+            # the new modification time is recorded so the file isn't hashed again
+            self.assertEqual(dict(self.cache.load(self.fileName).items()), self.data)
+            self.assertEqual(fileHash.call_count, 1)
+
+
+    def test_changed_file_is_not_used(self):
+        with open(self.fileName, 'a') as f:
+            f.write("9999,A1,1,1,Y,Bob,1,Brisbane,4000,foo\n")
+
+        self.assertIsNone(self.cache.load(self.fileName))
+        self.assertEqual(self.cache.entries(), [])
+
+
+    def test_lazy_dataset_is_saved(self):
+        self.cache.clear()
+
+        with mock.patch.object(FileTools, "csvRowChunks", wraps=FileTools.csvRowChunks) as chunks:
+            lazy = FileTools.csvFileToLazyDict(self.fileName)
+            lazy["id"]
+
+            self.assertTrue(self.cache.save(self.fileName, lazy))
+            self.assertEqual(chunks.call_count, 2)
+
+        self.assertEqual(dict(self.cache.load(self.fileName).items()), self.data)
+
+
+    def test_maps_are_closed(self):
+        closed = self.cache.load(self.fileName)
+        released = self.cache.load(self.fileName)
+        evicted = self.cache.load(self.fileName)
+        self.assertEqual(self.mapCount(), 3)
+
+        closed["id"]
+        closed.close()
+        self.assertEqual(self.mapCount(), 2)
+        self.assertEqual(closed["id"], self.data["id"])
+
+        del released
+        gc.collect()
+        self.assertEqual(self.mapCount(), 1)
+
+        self.cache.remove(self.cache.entryName(self.fileName))
+        self.assertEqual(self.mapCount(), 0)
+        self.assertRaises(ValueError, evicted.__getitem__, "id")
+
+
+if __name__ == '__main__':
+    unittest.main()
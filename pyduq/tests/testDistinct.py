@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+from sampledata import SampleData
+from pyduq.ruleplan import RulePlan
+from pyduq.columnstore import ColumnStore
+from pyduq.duqvalidator import DUQValidator
+
+
+class DistinctTestSuite(unittest.TestCase):
+
+    """With distinct values the row checks and the Format of a column run once per distinct value, and the errors still land on every row."""
+
+    def setUp(self):
+        self.dataset = SampleData.dataset(SampleData.rows(600))
+
+
+    def distinct(self, dataset:dict, meta:dict) -> DUQValidator:
+        validator = DUQValidator(dataset, meta)
+        validator.distinctValues()
+
+        return SampleData.run(validator)
+
+
+    def test_each_distinct_value_is_checked_once(self):
+        meta = {col:SampleData.META[col] for col in ["code", "flag", "city"]}
+        dataset = {col:self.dataset[col] for col in ["code", "flag", "city", "name"]}
+
+        with mock.patch.object(RulePlan, "checkValue", autospec=True, side_effect=RulePlan.checkValue) as checkValue:
+            self.distinct(dataset, meta)
+
+        self.assertEqual(checkValue.call_count, sum(len(set(self.dataset[col])) for col in meta))
+
+
+    def test_each_distinct_value_is_matched_once(self):
+        meta = {"name":{"Format":"^[A-Za-z|]+$"}, "pc":{"Format":"^[0-9]{4}$"}}
+        validator = self.distinct({"name":self.dataset["name"], "pc":self.dataset["pc"]}, meta)
+
+        self.assertEqual({row["attribute"]:row["values"] for row in validator.formatStats()}, {"name":len(set(self.dataset["name"])), "pc":len(set(self.dataset["pc"]))})
+
+
+    def test_errors_are_added_to_every_row_with_the_value(self):
+        dataset = {"id":["1", "2", "3", "4", "5"], "code":["A1", "Zx", "A1", "Zx", ""]}
+        validator = self.distinct(dataset, {"id":{"PrimaryKey":True}, "code":{"Enum":["A1"], "Mandatory":True}})
+
+        self.assertEqual([(error["description"], error["primary_key_value"]) for error in validator.validation_errors], [
+            ("Error: Value 'Zx' is outside the enumeration set '['A1']'", "2"),
+            ("Error: Value 'Zx' is outside the enumeration set '['A1']'", "4"),
+            ("Error: Mandatory field is BLANK or NULL. A value is required.", "5")])
+
+
+    def test_typed_values_give_the_same_errors(self):
+        meta = {col:SampleData.META[col] for col in ["qty", "price", "flag"]}
+        dataset = {col:self.dataset[col] for col in meta}
+        typed = {col:ColumnStore.toColumn(meta[col], values) for col, values in dataset.items()}
+
+        # a distinct typed value is checked from its text, as it is without the column store
+        self.assertEqual(SampleData.errors(self.distinct(typed, meta)), SampleData.errors(self.distinct(dataset, meta)))
+        self.assertEqual(SampleData.errors(self.distinct(dataset, meta)), SampleData.errors(SampleData.run(DUQValidator(dataset, meta))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+from sampledata import SampleData
+from pyduq.errorstore import ErrorStore, ErrorRecord
+from pyduq.dataqualityerror import DataQualityError, DataQualityDimension
+from pyduq.duqvalidator import DUQValidator
+
+
+class ErrorStoreTestSuite(unittest.TestCase):
+
+    """The columnar error store reads like the list of error dictionaries it replaces, building each description only when it is read."""
+
+    SIZE = ("Error: Value '", "' is longer than size '2'")
+    ENUM = ("Error: Value '", "' is outside the enumeration set '['A1', 'A2']'")
+
+    def store(self) -> ErrorStore:
+        errors = ErrorStore()
+        errors.add("code", DataQualityDimension.METADATACOMPLIANCE.value, ErrorStoreTestSuite.SIZE, "Zx|y", "Row: 1")
+        errors.add("code", DataQualityDimension.METADATACOMPLIANCE.value, ErrorStoreTestSuite.ENUM, "Zx|y", "Row: 1")
+        errors.add("name", DataQualityDimension.FORMATCONSISTENCY.value, ErrorStoreTestSuite.SIZE, 123, 7)
+        errors.append(DataQualityError("id", error_dimension=DataQualityDimension.UNIQUENESS.value, description="Error: Value '1' is not UNIQUE.", primary_key_value=2).to_dict())
+
+        return errors
+
+
+    def test_records_read_like_error_dictionaries(self):
+        errors = self.store()
+        expected = DataQualityError("code", error_dimension=DataQualityDimension.METADATACOMPLIANCE.value, description="Error: Value 'Zx|y' is longer than size '2'", primary_key_value="Row: 1").to_dict()
+
+        self.assertEqual(list(errors[0].items()), list(expected.items()))
+        self.assertEqual(errors[2]["description"], "Error: Value '123' is longer than size '2'")
+        self.assertEqual(errors[-1]["description"], "Error: Value '1' is not UNIQUE.")
+        self.assertEqual([error["primary_key_value"] for error in errors], ["Row: 1", "Row: 1", 7, 2])
+        self.assertRaises(IndexError, errors.__getitem__, 4)
+        self.assertRaises(KeyError, errors[0].__getitem__, "count")
+
+
+    def test_rules_are_stored_once(self):
+        errors = ErrorStore()
+
+        for row in range(1000):
+            errors.add("code", DataQualityDimension.METADATACOMPLIANCE.value, ErrorStoreTestSuite.SIZE, "Zx|y", "Row: " + str(row))
+
+        self.assertEqual((errors.attributes, len(errors.dimensions), errors.templates), (["code"], 1, [ErrorStoreTestSuite.SIZE]))
+        self.assertEqual(set(errors.template_ids), {0})
+        self.assertEqual(errors.counts(), {("code", DataQualityDimension.METADATACOMPLIANCE.value):1000})
+
+
+    def test_descriptions_are_built_when_read(self):
+        errors = ErrorStore()
+        value = "x" * 50
+        errors.add("name", DataQualityDimension.METADATACOMPLIANCE.value, ErrorStoreTestSuite.SIZE, value)
+
+        # the value is the string from the dataset, not a copy
+        self.assertIs(errors.values[0], value)
+        self.assertIsInstance(errors[0], ErrorRecord)
+        self.assertEqual(errors[0]["primary_key_value"], "<Unspecified>")
+
+
+    def test_stores_with_different_ids_are_merged(self):
+        errors = ErrorStore()
+        errors.add("name", DataQualityDimension.FORMATCONSISTENCY.value, ErrorStoreTestSuite.ENUM, "Bob", "Row: 9")
+        expected = [dict(error) for error in errors] + [dict(error) for error in self.store()]
+
+        errors.extend(self.store())
+
+        self.assertEqual(errors, expected)
+        self.assertEqual(len(errors.templates), 3)
+        self.assertEqual(errors[1:3], expected[1:3])
+        self.assertIsInstance(errors[1:3], ErrorStore)
+
+
+    def test_validation_does_not_build_descriptions(self):
+        with mock.patch.object(ErrorStore, "description", autospec=True, side_effect=ErrorStore.description) as description:
+            validator = SampleData.run(DUQValidator(SampleData.dataset(SampleData.rows(200)), SampleData.meta()))
+            validator.summariseCounters()
+
+            self.assertEqual(description.call_count, 0)
+
+            descriptions = [error["description"] for error in validator.validation_errors]
+            self.assertEqual(description.call_count, len(validator.validation_errors))
+
+        # one template per rule, however many rows break it
+        self.assertLess(len(validator.validation_errors.templates), len(descriptions) // 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from openpyxl import Workbook
+from sampledata import SampleData
+from pyduq.filetools import FileTools
+from pyduq.duqerror import ValidationError
+
+
+class ExcelTestSuite(unittest.TestCase):
+
+    """Excel sheets are read row by row in read-only mode, and several sheets are loaded at once by a process pool."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.xlsx")
+        self.sheets = {"first":SampleData.rows(120), "second":SampleData.rows(80, 3), "third":SampleData.rows(1, 5)}
+
+        workbook = Workbook()
+        workbook.remove(workbook.active)
+
+        for sheet_name, rows in self.sheets.items():
+            sheet = workbook.create_sheet(sheet_name)
+            sheet.append(list(rows[0]))
+
+            for row in rows:
+                sheet.append(list(row.values()))
+
+        sheet = workbook.create_sheet("cells")
+        sheet.append(["n", None, "text"])
+        sheet.append([1, 2.5, "  Zoë  "])
+        sheet.append([None, True, None])
+        workbook.save(self.fileName)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def expected(self, sheet_name:str) -> dict:
+        # an empty string is saved as an empty cell
+        return {col:[FileTools.cleanValue(value or None) for value in values] for col, values in SampleData.dataset(self.sheets[sheet_name]).items()}
+
+
+    def test_sheets_are_loaded_in_a_pool(self):
+        for workers in [1, 2, 8]:
+            with self.subTest(workers=workers):
+                sheets = FileTools.xlsFileSheetsToDict(self.fileName, ["third", "first", "second", "first"], workers=workers)
+
+                # in the order asked for, once each
+                self.assertEqual(list(sheets), ["third", "first", "second"])
+
+                for sheet_name, dataset in sheets.items():
+                    self.assertEqual(dataset, self.expected(sheet_name))
+
+
+    def test_every_sheet_is_loaded_by_default(self):
+        sheets = FileTools.xlsFileSheetsToDict(self.fileName, None, columns={"id", "n"}, workers=2)
+
+        self.assertEqual(list(sheets), ["first", "second", "third", "cells"])
+        self.assertEqual(sheets["second"], {"id":self.expected("second")["id"]})
+        self.assertEqual(sheets["cells"], {"n":["1", "(Null)"]})
+        self.assertRaises(ValidationError, FileTools.xlsFileSheetsToDict, self.fileName, ["first", "fourth"])
+
+
+    def test_cells_are_cleaned(self):
+        self.assertEqual(FileTools.xlsFileToDict(self.fileName, "cells"), {"n":["1", "(Null)"], "<Undefined_1>":["2.5", "True"], "text":["Zoe", "(Null)"]})
+        self.assertEqual(FileTools.xlsFileToDict(self.fileName, "cells", unfolded={"text"})["text"], ["Zoë", "(Null)"])
+
+
+    def test_lazy_sheet_loads_the_columns_it_is_asked_for(self):
+        lazy = FileTools.xlsFileToLazyDict(self.fileName, "first", columns={"id", "qty", "nothing"})
+
+        self.assertEqual(list(lazy), ["id", "qty"])
+        self.assertEqual(lazy["qty"], self.expected("first")["qty"])
+
+
+if __name__ == '__main__':
+    unittest.main()
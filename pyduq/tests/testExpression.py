@@ -0,0 +1,88 @@
+import random
+import unittest
+import warnings
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+from pyduq.expressionbuilder import ExpressionBuilder
+
+try:
+    from pyduq.vectorvalidator import VectorDUQValidator
+except ImportError:
+    VectorDUQValidator = None
+
+
+class ExpressionTestSuite(unittest.TestCase):
+
+    """A compiled expression fails the same rows, with the same descriptions, as merging the values into the expression and evaluating it."""
+
+    VALUES = ["O'Brien", 'say "hi"', "a\\", "1_000", "'abc'", "-3", "+4", "1e5", ".5", "5.", "00", "007", "True", "None", "1.5.3", "a b", " 5", "5 ", "  ", ""]
+
+    EXPRESSIONS = ["[price] > 5 or [qty] == 3", "[qty] != '' and int([qty]) < 110", "[qty] > 5", "[price] + [qty] > 3", "not [qty]",
+                   "'[name]' == 'Bob' or [qty] == 1", "\"[name]\" != 'x' and [price] > 2", "[qty] == 1 and [price] > 2", "[qty] if [price] else 1",
+                   "[qty] in (1, 2, 3) or [price] < 10", "len('[name]') > 3", "[name] == 'Bob'", "[qty] * [price] > 100", "-[qty] < 0",
+                   "int([qty]) > 3", "[price] - [qty] < 2", "str([name]) == 'Bob'", "[qty] or [price]", "abs([qty]) < 50"]
+
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.rows = SampleData.rows(600)
+
+        for row in self.rows:
+            for col, rate in [("name", 0.2), ("qty", 0.1), ("price", 0.1)]:
+                if (rng.random() < rate):
+                    row[col] = rng.choice(ExpressionTestSuite.VALUES)
+
+        self.dataset = SampleData.dataset(self.rows)
+
+
+    def merged(self, expr:str) -> list:
+        # the errors of the original evaluator, which merged the values into the expression and evaluated the text
+        builder = ExpressionBuilder()
+        fields = builder.parseExpr(expr)
+        errors = []
+
+        for row in self.rows:
+            ev = builder.merge(expr, {field:row[field] for field in fields})
+
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    result = eval(ev)
+            except Exception as e:
+                errors.append("Error: Expression '" + ev + "' returned an error '" + str(e) + "'")
+                result = None
+
+            if ((not result is None) and (result == False)):
+                errors.append("Error: Expression '" + ev + "' returned FALSE")
+
+        return errors
+
+
+    def check(self, engine:type):
+        for expr in ExpressionTestSuite.EXPRESSIONS:
+            with self.subTest(engine=engine.__name__, expression=expr):
+                validator = SampleData.run(engine(self.dataset, {"qty":{"Expression":expr}}))
+                errors = [error["description"] for error in SampleData.errors(validator) if (error["error_dimension"] == "Business Rule Compliance")]
+
+                self.assertEqual(errors, self.merged(expr))
+
+
+    def test_python_matches_merged_eval(self):
+        self.check(DUQValidator)
+
+
+    @unittest.skipIf(VectorDUQValidator is None, "the vector engine requires numpy")
+    def test_vector_matches_merged_eval(self):
+        self.check(VectorDUQValidator)
+
+
+    def test_values_are_not_evaluated(self):
+        validator = SampleData.run(DUQValidator({"x":["__import__('os').getcwd()", "1 or 2"]}, {"x":{"Expression":"[x]"}}))
+
+        self.assertEqual([error["description"] for error in SampleData.errors(validator)],
+                         ["Error: Expression '__import__('os').getcwd()' returned an error 'name '__import__' is not defined'",
+                          "Error: Expression '1 or 2' returned an error ''1 or 2' is not a value'"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import warnings
+from sampledata import SampleData
+from pyduq.patterns import Patterns
+from pyduq.formatengine import FormatEngine, FormatPattern, regex, re2
+from pyduq.duqerror import ValidationError
+from pyduq.duqvalidator import DUQValidator
+
+
+class FormatEngineTestSuite(unittest.TestCase):
+
+    """The Format regexes are checked for catastrophic backtracking, timed per attribute and, with the regex package, given up on after a timeout."""
+
+    CATASTROPHIC = "^(a|aa)+$"
+
+    def test_backtracking_risk(self):
+        for pattern, risk in [("^(a+)+$", "a quantifier inside a quantifier"), ("^(\\d{1,20})*x$", "a quantifier inside a quantifier"),
+                              ("^(a|ab)*$", "alternatives that can match the same text inside a quantifier"), ("^(a|aa)+$", "alternatives that can match the same text inside a quantifier"),
+                              ("^(a|b|c)*$", None), ("^(ab{2})+$", None), ("^[0-9]{4}$", None), ("^(a+)$", None), ("(", None)]:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(FormatEngine.backtrackingRisk(pattern), risk)
+
+
+    def test_risky_pattern_is_warned_about_once(self):
+        FormatEngine.WARNED.discard(FormatEngineTestSuite.CATASTROPHIC)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            FormatEngine().compile("x", FormatEngineTestSuite.CATASTROPHIC)
+            FormatEngine().compile("y", FormatEngineTestSuite.CATASTROPHIC)
+            FormatEngine().compile("z", "^[0-9]{4}$")
+
+        self.assertEqual([str(warning.message) for warning in caught], ["the Format of 'x' may backtrack catastrophically (alternatives that can match the same text inside a quantifier), consider the re2 backend or a timeout"])
+
+
+    def test_patterns_and_backends(self):
+        self.assertEqual(FormatEngine.resolve("Patterns.EMAIL"), Patterns.EMAIL.value)
+        self.assertEqual(FormatEngine.resolve("EMAIL"), "EMAIL")
+        self.assertRaises(ValidationError, FormatEngine.resolve, "Patterns.NOTHING")
+        self.assertRaises(ValidationError, FormatEngine, "pcre")
+
+        if (re2 is None):
+            self.assertRaises(ValidationError, FormatEngine, "re2")
+
+        if (regex is None):
+            self.assertRaises(ValidationError, FormatEngine, "re", 1.0)
+
+
+    @unittest.skipIf(regex is None, "timeouts require the regex package")
+    def test_catastrophic_value_hits_the_timeout(self):
+        dataset = {"x":["aaaa", "a" * 40 + "b", "ab", ""]}
+        meta = {"x":{"Format":FormatEngineTestSuite.CATASTROPHIC, "AllowBlank":True}}
+        validator = DUQValidator(dataset, meta)
+        validator.matchFormats("re", 0.05)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            SampleData.run(validator)
+
+        self.assertEqual(validator.format_engine.backend, "regex")
+        self.assertEqual([error["description"] for error in validator.validation_errors], [
+            "Error: Value '" + "a" * 40 + "b' could not be matched against regex #'^(a|aa)+$' within 0.05 seconds",
+            "Error: Value 'ab' does not match regex #'^(a|aa)+$'"])
+
+        stats = validator.formatStats()[0]
+        self.assertEqual((stats["attribute"], stats["values"], stats["timeouts"], stats["backtracking risk"]), ("x", 4, 1, "alternatives that can match the same text inside a quantifier"))
+        self.assertIs(FormatEngine("regex", 0.05).compile("x", "^a+$").match("a" * 10 ** 6 + "b"), None)
+        self.assertIs(FormatPattern(FormatEngineTestSuite.CATASTROPHIC, regex.compile(FormatEngineTestSuite.CATASTROPHIC), 0.01, [0, 0.0, 0]).match("a" * 40 + "b"), FormatPattern.TIMEOUT)
+
+
+    def test_worker_timings_are_merged(self):
+        dataset = SampleData.dataset(SampleData.rows(300))
+        meta = {col:SampleData.META[col] for col in ["name", "pc"]}
+        validator = SampleData.run(DUQValidator(dataset, meta), "validate", None, 2)
+
+        self.assertEqual(sorted((row["attribute"], row["values"], row["pattern"]) for row in validator.formatStats()), [("name", 300, "^[A-Za-z|]+$"), ("pc", 300, "^[0-9]{4}$")])
+
+
+if __name__ == '__main__':
+    unittest.main()
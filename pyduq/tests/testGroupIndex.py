@@ -0,0 +1,104 @@
+import random
+import tempfile
+import unittest
+from sampledata import SampleData
+from pyduq.groupindex import GroupIndex
+from pyduq.duqerror import ValidationError
+from pyduq.duqvalidator import DUQValidator
+
+
+class GroupIndexTestSuite(unittest.TestCase):
+
+    """The single pass group index finds the same non-repeating groups, in the same order, as scanning the rows of every repeating value."""
+
+    @staticmethod
+    def scan(x_values:list, columns:list) -> list:
+        """
+        The groups found by scanning every row for each X value that repeats, in the order the values first appear.
+        """
+        rows = ['|'.join(map(str, row)) for row in zip(*columns)]
+        groups = []
+
+        for value in dict.fromkeys(x_values):
+            if (x_values.count(value) > 1):
+                keys = list(dict.fromkeys([key for key, first in zip(rows, columns[0]) if first == value]))
+
+                if (len(keys) > 1):
+                    groups.append((value, keys))
+
+        return groups
+
+
+    def columns(self, seed:int, rows:int) -> tuple:
+        rng = random.Random(seed)
+        x_values = [str(rng.randint(0, rows // 3)) for row in range(rows)]
+        # most values always appear with the same city
+        cities = [("Perth" if rng.random() < 0.9 else rng.choice(["Brisbane", "Sydney"])) if int(x) % 2 else rng.choice(["Brisbane", "Sydney", "Perth"]) for x in x_values]
+
+        return (x_values, [x_values, cities])
+
+
+    def test_groups_match_a_scan_of_every_row(self):
+        for seed in range(5):
+            x_values, columns = self.columns(seed, 300)
+            expected = GroupIndexTestSuite.scan(x_values, columns)
+
+            with tempfile.TemporaryDirectory() as spill_dir:
+                for spill, chunk_size in [(None, 300), (None, 7), (spill_dir, 300), (spill_dir, 7)]:
+                    with self.subTest(seed=seed, spill=not spill is None, chunk_size=chunk_size):
+                        index = GroupIndex(spill, 4)
+
+                        for start in range(0, 300, chunk_size):
+                            index.add(x_values[start:start + chunk_size], [column[start:start + chunk_size] for column in columns])
+
+                        self.assertEqual(list(index.groups()), expected)
+
+
+    def test_first_column_need_not_be_the_repeating_column(self):
+        x_values = ["a", "a", "b", "c", "c"]
+        columns = [["c", "b", "b", "c", "x"], ["1", "2", "3", "4", "5"]]
+
+        self.assertEqual(GroupIndexTestSuite.scan(x_values, columns), [("c", ["c|1", "c|4"])])
+
+        index = GroupIndex()
+        index.add(x_values, columns)
+        self.assertEqual(list(index.groups()), [("c", ["c|1", "c|4"])])
+
+
+    def test_repeating_groups_keep_a_single_key(self):
+        index = GroupIndex()
+        index.add(["1", "1", "2", "2", "2"], [["1", "1", "2", "2", "2"], ["A", "A", "B", "C", "B"]])
+
+        self.assertEqual(index.keys, {"1":"1|A", "2":{"2|B":None, "2|C":None}})
+        self.assertEqual(list(index.groups()), [("2", ["2|B", "2|C"])])
+
+
+    def test_spilled_index_closes_its_files(self):
+        self.assertRaises(ValidationError, GroupIndex, "/no/such/folder")
+
+        with tempfile.TemporaryDirectory() as spill_dir:
+            index = GroupIndex(spill_dir)
+            index.add(["1", "1"], [["1", "1"], ["A", "B"]])
+            files = index.files
+
+            self.assertEqual(list(index.groups()), [("1", ["1|A", "1|B"])])
+            self.assertIsNone(index.files)
+            self.assertTrue(all(f.closed for f in files))
+
+
+    def test_validator_reports_the_same_groups_when_spilled(self):
+        dataset = SampleData.dataset(SampleData.rows(600))
+        meta = {"grp":SampleData.META["grp"], "city":{"Type":"string"}}
+        full = SampleData.run(DUQValidator(dataset, meta))
+
+        with tempfile.TemporaryDirectory() as spill_dir:
+            validator = DUQValidator(dataset, meta)
+            validator.spillTo(spill_dir)
+
+            self.assertEqual(SampleData.errors(SampleData.run(validator)), SampleData.errors(full))
+
+        self.assertEqual(len([error for error in full.validation_errors if error["attribute"] == "grp"]), sum(len(keys) for value, keys in GroupIndexTestSuite.scan(dataset["grp"], [dataset["grp"], dataset["city"]])))
+
+
+if __name__ == '__main__':
+    unittest.main()
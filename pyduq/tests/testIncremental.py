@@ -0,0 +1,68 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+
+
+class IncrementalTestSuite(unittest.TestCase):
+
+    """An incremental validation reports the same errors, in the same order, as a full validation after rows are appended or changed."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.sidecar = os.path.join(self.temp_dir.name, "sample.sidecar")
+        self.rows = SampleData.rows(600)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def check(self, rows, meta, checked=None):
+        full = SampleData.run(DUQValidator(SampleData.dataset(rows), meta))
+        incremental = DUQValidator(SampleData.dataset(rows), meta)
+        out = io.StringIO()
+
+        with contextlib.redirect_stdout(out):
+            incremental.validateIncremental(self.sidecar)
+
+        if (not checked is None):
+            self.assertIn("Validating " + str(checked) + " new or changed rows of " + str(len(rows)) + ".", out.getvalue())
+
+        self.assertEqual(SampleData.errors(incremental), SampleData.errors(full))
+        self.assertEqual(incremental.summariseCounters(), full.summariseCounters())
+
+
+    def changeRows(self, meta):
+        self.check(self.rows[:400], meta, 400)
+        self.check(self.rows[:400], meta, 0)
+        self.check(self.rows, meta, 200)
+
+        changed = [dict(row) for row in self.rows]
+
+        for row in range(0, 600, 50):
+            changed[row]["qty"] = "150"
+            changed[row]["name"] = "Bob"
+
+        self.check(changed, meta, 12)
+
+        # the rows without errors that have moved are checked again, so the count depends on the data
+        self.check(changed[100:], meta)
+
+
+    def test_incremental_matches_full(self):
+        self.changeRows(SampleData.meta())
+
+
+    def test_incremental_matches_full_without_primary_key(self):
+        meta = SampleData.meta()
+        del meta["id"]["PrimaryKey"]
+
+        self.changeRows(meta)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+
+
+class KeySpillTestSuite(unittest.TestCase):
+
+    """Unique and Composite checks that spill their keys to disk, with or without a Bloom filter, match the in-memory checks."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dataset = SampleData.dataset(SampleData.rows(600))
+        self.full = SampleData.run(DUQValidator(self.dataset, SampleData.meta()))
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def bounded(self, key_budget, bloom):
+        validator = DUQValidator(self.dataset, SampleData.meta())
+        validator.spillTo(self.temp_dir.name)
+        validator.boundKeys(key_budget, bloom)
+
+        return validator
+
+
+    def test_spilled_keys_match_in_memory(self):
+        for key_budget, bloom in [(0, None), (50, None), (50, 100), (50, 20000), (10 ** 9, None)]:
+            with self.subTest(key_budget=key_budget, bloom=bloom):
+                validator = SampleData.run(self.bounded(key_budget, bloom))
+
+                self.assertEqual(SampleData.errors(validator), SampleData.errors(self.full))
+
+
+    def test_spilled_keys_match_in_memory_with_workers(self):
+        validator = SampleData.run(self.bounded(50, 100), "validate", None, 2)
+
+        self.assertEqual(SampleData.errors(validator), SampleData.errors(self.full))
+
+
+    def test_spill_is_reported_and_cleaned_up(self):
+        for workers in [None, 2]:
+            with self.subTest(workers=workers):
+                out = io.StringIO()
+                validator = self.bounded(50, None)
+
+                with contextlib.redirect_stdout(out):
+                    validator.validate(None, workers)
+
+                # the spill is left to the caller to report
+                self.assertEqual(validator.spilled_keys["id"], 51)
+                self.assertNotIn("Spill", out.getvalue())
+                self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+from pyduq.filetools import FileTools
+from pyduq.metautils import MetaUtils
+
+
+class LazyDatasetTestSuite(unittest.TestCase):
+
+    """A lazy csv dataset reads the requested columns in one pass and validates the same as a loaded one."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.csv")
+        SampleData.writeCSV(self.fileName, SampleData.rows(600))
+        self.meta = SampleData.meta()
+        self.columns = MetaUtils.referencedColumns(self.meta)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def test_requested_columns_load_in_one_pass(self):
+        with mock.patch.object(FileTools, "csvRowChunks", wraps=FileTools.csvRowChunks) as chunks:
+            lazy = FileTools.csvFileToLazyDict(self.fileName, columns=self.columns)
+            self.assertEqual(chunks.call_count, 0)
+
+            data = {col:lazy[col] for col in lazy}
+
+        self.assertEqual(chunks.call_count, 1)
+        self.assertEqual(data, FileTools.csvFileToDict(self.fileName, columns=self.columns))
+
+
+    def test_unrequested_columns_load_one_at_a_time(self):
+        lazy = FileTools.csvFileToLazyDict(self.fileName)
+        lazy["id"]
+
+        self.assertTrue(lazy.isLoaded("id"))
+        self.assertFalse(lazy.isLoaded("code"))
+
+
+    def test_lazy_matches_loaded(self):
+        lazy = SampleData.run(DUQValidator(FileTools.csvFileToLazyDict(self.fileName, columns=self.columns), self.meta))
+        loaded = SampleData.run(DUQValidator(FileTools.csvFileToDict(self.fileName, columns=self.columns), self.meta))
+
+        self.assertEqual(SampleData.errors(lazy), SampleData.errors(loaded))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from pyduq.filetools import FileTools
+
+
+class ParallelCSVTestSuite(unittest.TestCase):
+
+    """A csv file split into byte ranges, at any offset and with any block size, parses to the same columns as csvFileToDict."""
+
+    QUOTED_NEWLINE = 'id,text,n\n1,"line one\nline two",3\n2,plain,4\n3,"a\n\nb",5\n'
+    ESCAPED_QUOTES = 'id,text,n\n1,"say ""hi""\nthere",3\n2,"""",4\n3,"a"",""b\n",5\n'
+    CRLF = 'id,text,n\r\n1,"x\r\ny",3\r\n2,plain,4\r\n3,"""\r\n""",5\r\n'
+    MULTI_BYTE = 'id,text,n\n1,Zoë,3\n2,"José\nMüller",4\n3,日本語,5\n4,"€""\n€",6'
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.csv")
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def check(self, text:str):
+        with open(self.fileName, 'wb') as f:
+            f.write(text.encode('utf-8'))
+
+        expected = FileTools.csvFileToDict(self.fileName)
+        size = os.path.getsize(self.fileName)
+
+        # with one part per byte every offset is the target of a range, and every block size puts a block boundary at each offset
+        for parts in [2, 3, size]:
+            for block_size in range(1, size + 1):
+                fieldnames, ranges = FileTools.csvByteRanges(self.fileName, parts, block_size)
+                data = FileTools.newColumns(fieldnames)
+
+                for byte_range in ranges:
+                    for col, values in FileTools.csvRangeToDict(self.fileName, byte_range, fieldnames).items():
+                        data[col].extend(values)
+
+                self.assertEqual(data, expected, "parts " + str(parts) + ", block size " + str(block_size))
+
+        self.assertEqual(FileTools.csvFileToDictParallel(self.fileName, 2), expected)
+
+
+    def test_split_at_quoted_newline(self):
+        self.check(ParallelCSVTestSuite.QUOTED_NEWLINE)
+
+
+    def test_split_at_escaped_quote(self):
+        self.check(ParallelCSVTestSuite.ESCAPED_QUOTES)
+
+
+    def test_split_at_crlf(self):
+        self.check(ParallelCSVTestSuite.CRLF)
+
+
+    def test_split_inside_multi_byte_character(self):
+        self.check(ParallelCSVTestSuite.MULTI_BYTE)
+
+
+    def test_record_end_skips_quoted_newlines(self):
+        block = b'1,"a\nb",2\n3,"""\n""",4\n'
+
+        self.assertEqual(FileTools.findRecordEnd(block, 0, 0), block.index(b'2\n') + 1)
+        self.assertEqual(FileTools.findRecordEnd(block, 4, 0), block.index(b'2\n') + 1)
+        self.assertEqual(FileTools.findRecordEnd(block, 11, 0), len(block) - 1)
+
+        # a block that starts inside a quoted field
+        self.assertEqual(FileTools.findRecordEnd(b'b",2\n', 0, 1), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import random
+import unittest
+from sampledata import SampleData
+from pyduq.prefixindex import PrefixIndex
+from pyduq.ruleplan import RulePlan
+from pyduq.duqvalidator import DUQValidator
+
+
+class PrefixIndexTestSuite(unittest.TestCase):
+
+    """A long StartsWith list is looked up by prefix length and a long Enum is a set, with the same answers as str.startswith and list membership."""
+
+    def test_lookup_matches_startswith(self):
+        rng = random.Random(5)
+        alphabet = "ab1é"
+
+        for count in [1, 8, 9, 50, 500]:
+            prefixes = ["".join(rng.choice(alphabet) for char in range(rng.randint(0 if count == 500 else 1, 4))) for prefix in range(count)]
+            index = PrefixIndex(prefixes)
+            values = ["".join(rng.choice(alphabet) for char in range(rng.randint(0, 6))) for value in range(2000)]
+
+            with self.subTest(count=count):
+                self.assertEqual(index.matches == index.lookup, count > PrefixIndex.SHORT_LIST)
+                self.assertEqual([index.matches(value) for value in values], [value.startswith(tuple(prefixes)) for value in values])
+
+
+    def test_prefixes_are_grouped_by_length(self):
+        index = PrefixIndex(["4" + str(number).zfill(3) for number in range(1000)] + ["60", "61"])
+
+        self.assertEqual(index.lengths, (2, 4))
+        self.assertTrue(index.matches("4101"))
+        self.assertTrue(index.matches("6000"))
+        self.assertFalse(index.matches("410"))
+        self.assertFalse(index.matches("2000"))
+
+
+    def test_only_strings_are_indexed(self):
+        index = PrefixIndex(["1", 2] * 10)
+
+        self.assertIsNone(index.lengths)
+        # as str.startswith does
+        self.assertRaises(TypeError, index.matches, "3")
+
+
+    def test_long_lists_give_the_same_errors(self):
+        dataset = SampleData.dataset(SampleData.rows(600))
+        short = {"pc":{"StartsWith":["4", "6"]}, "code":{"Enum":["A1", "A2", "B1"]}}
+        long = {"pc":{"StartsWith":[first + str(number).zfill(3) for first in "46" for number in range(1000)]},
+                "code":{"Enum":["A1", "A2", "B1"] + [str(number) for number in range(5000)] + [1, None]}}
+
+        # only strings can match a value
+        self.assertEqual(RulePlan(long["code"], "code").enum, frozenset(long["code"]["Enum"][:5003]))
+
+        # the descriptions list the rules so only the values are compared
+        errors = [[(error["attribute"], error["error_dimension"], error["primary_key_value"], error["description"].split("'")[1:2]) for error in SampleData.run(DUQValidator(dataset, meta)).validation_errors] for meta in [short, long]]
+
+        self.assertEqual(errors[0], errors[1])
+        self.assertGreater(len(errors[0]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import sqlite3
+import unittest
+from sampledata import SampleData
+from pyduq.SQLTools import SQLTools
+from pyduq.duqvalidator import DUQValidator
+from pyduq.sqlpushdown import SQLPushdownValidator, SQLiteDialect
+
+
+class ClientSideDialect(SQLiteDialect):
+    """ A dialect without the type and regex functions, so those checks fall back to the client. """
+
+    def isInt(self, expr):
+        return None
+
+    def isFloat(self, expr):
+        return None
+
+    def toFloat(self, expr):
+        return None
+
+    def matches(self, expr, regex):
+        return None
+
+
+class PushdownTestSuite(unittest.TestCase):
+
+    """The counters of a pushdown validation on sqlite match an in-memory validation, and every sample error is one of its errors."""
+
+    def setUp(self):
+        rows = SampleData.rows(600)
+        columns = list(rows[0])
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("create table sample (" + ", ".join(['"' + col + '" TEXT' for col in columns]) + ")")
+        self.connection.executemany("insert into sample values (" + ", ".join(["?"] * len(columns)) + ")", [[row[col] for col in columns] for row in rows])
+        self.connection.commit()
+
+
+    def tearDown(self):
+        self.connection.close()
+
+
+    def check(self, meta, dialect=None):
+        cursor = self.connection.cursor()
+        cursor.execute("select * from sample")
+        full = SampleData.run(DUQValidator(SQLTools.resultsetToDict(cursor), meta))
+        pushdown = SampleData.run(SQLPushdownValidator(self.connection, "select * from sample", meta, dialect=dialect, limit=5))
+
+        self.assertEqual(pushdown.summariseCounters(), full.summariseCounters())
+
+        errors = set([json.dumps(error, sort_keys=True) for error in SampleData.errors(full)])
+        samples = SampleData.errors(pushdown)
+
+        self.assertGreater(len(samples), 0)
+        self.assertEqual([error for error in samples if not json.dumps(error, sort_keys=True) in errors], [])
+
+
+    def test_counters_match_in_memory(self):
+        self.check(SampleData.meta())
+
+
+    def test_counters_match_in_memory_without_primary_key(self):
+        meta = SampleData.meta()
+        del meta["id"]["PrimaryKey"]
+
+        self.check(meta)
+
+
+    def test_counters_match_in_memory_client_side(self):
+        self.check(SampleData.meta(), ClientSideDialect())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+from sampledata import SampleData
+from pyduq import duqvalidator
+from pyduq.duqvalidator import DUQValidator
+from pyduq.ruleplan import RulePlan
+from pyduq.filetools import FileTools
+
+
+class RulePlanTestSuite(unittest.TestCase):
+
+    """The single value check methods of DUQValidator report the same errors as the row checks of validate."""
+
+    ROW_TAGS = ["Type", "Mandatory", "AllowBlank", "Size", "Min", "Max", "Default", "Enum", "StartsWith"]
+
+    def test_check_methods_match_validate(self):
+        dataset = SampleData.dataset(SampleData.rows(600))
+        meta = {col:{tag:value for tag, value in definition.items() if tag in RulePlanTestSuite.ROW_TAGS} for col, definition in SampleData.meta().items() if col in dataset}
+        full = SampleData.run(DUQValidator(dataset, meta))
+        single = DUQValidator(dataset, meta)
+
+        for col, definition in meta.items():
+            for row, value in enumerate(dataset[col]):
+                for check in [single.checkMandatory, single.checkSize, single.checkType, single.checkEnum, single.checkStartsWith]:
+                    check(definition, col, value, "Row: " + str(row + 1))
+
+        self.assertEqual(SampleData.errors(single), SampleData.errors(full))
+
+
+    def test_min_max_is_checked_whatever_the_type(self):
+        validator = DUQValidator({}, {})
+
+        for value in ["5", "-3", "11", "-1", "abc", ""]:
+            validator.checkMinMax({"Min":0, "Max":10, "Default":"-1"}, "x", value, "Row: 1")
+
+        self.assertEqual([error["description"] for error in SampleData.errors(validator)], ["Error: Value '-3' must be >= 0.0", "Error: Value '11' must be <= 10.0"])
+
+
+    def test_type_skips_the_range_of_an_invalid_value(self):
+        validator = DUQValidator({}, {})
+        definition = {"Type":"int", "Min":0, "Default":"-5"}
+
+        for value in ["1.5", "-5", "-2"]:
+            validator.checkType(definition, "x", value, "Row: 1")
+
+        self.assertEqual([error["description"] for error in SampleData.errors(validator)], ["Error: Value '1.5' is not an int. An int was expected", "Error: Value '-2' must be >= 0.0"])
+
+
+    def test_plan_only_runs_the_checks_that_apply(self):
+        self.assertFalse(RulePlan({"Type":"string", "AllowBlank":True}, "x").row_checks)
+        self.assertFalse(RulePlan({"Type":"int", "AllowBlank":True, "Format":"^[0-9]+$"}, "x").row_checks)
+        self.assertTrue(RulePlan({"Type":"int", "Min":0}, "x").has_range)
+        self.assertFalse(RulePlan({"Min":0}, "x").has_range)
+
+        plan = RulePlan({"Enum":["A", 1, "B"], "Size":"3", "Min":"abc", "Max":"9"}, "x")
+
+        # only strings can match a value, and a Min that isn't a number is not set
+        self.assertEqual(plan.enum, frozenset(["A", "B"]))
+        self.assertEqual((plan.size, plan.min, plan.max), (3, -1, 9.0))
+        self.assertEqual(plan.enum_template, ("Error: Value '", "' is outside the enumeration set '['A', 1, 'B']'"))
+
+
+    def test_specs_share_the_plan_templates(self):
+        plan = RulePlan(SampleData.META["code"], "code")
+        specs = plan.checkValue("Zx|y")
+
+        self.assertEqual([template for dimension, template, value in specs], [plan.size_template, plan.enum_template])
+        self.assertTrue(all(template is expected for (dimension, template, value), expected in zip(specs, [plan.size_template, plan.enum_template])))
+        self.assertEqual(plan.checkValue("(Null)"), [plan.blank_spec])
+        # the default is not outside the enumeration
+        self.assertEqual(plan.checkValue("C9"), [])
+
+
+    def test_parsed_number_skips_the_type_check(self):
+        plan = RulePlan({"Type":"int", "Min":0, "Max":10}, "x")
+
+        self.assertEqual(plan.checkValue("007", 7), [])
+        self.assertEqual(plan.checkValue("11", 11), [("Metadata Compliance", plan.max_template, "11")])
+
+        # the range of a bool is checked on its text, as it is for a value that hasn't been parsed
+        plan = RulePlan({"Type":"bool", "Min":5}, "x")
+
+        for value, number in [("1", True), ("true", True), ("0", False)]:
+            self.assertEqual(plan.checkValue(value, number), plan.checkValue(value))
+
+
+    def test_plans_are_compiled_once_per_validation(self):
+        rows = SampleData.rows(100)
+        meta = SampleData.meta()
+
+        with mock.patch.object(duqvalidator, "RulePlan", wraps=RulePlan) as plans:
+            validator = SampleData.run(DUQValidator({}, meta), "validateStream", [FileTools.rowsToDict(list(rows[0]), rows[start:start + 10]) for start in range(0, 100, 10)])
+            self.assertEqual(plans.call_count, len([col for col in meta if col in rows[0]]))
+
+            SampleData.run(validator, "validateStream", [SampleData.dataset(rows)])
+            self.assertEqual(plans.call_count, 2 * len([col for col in meta if col in rows[0]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
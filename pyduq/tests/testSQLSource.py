@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from sampledata import SampleData
+from pyduq.SQLTools import SQLTools
+from pyduq.duqerror import ValidationError
+from pyduq.duqvalidator import DUQValidator
+from pyduq.asciifold import AsciiFold
+
+
+class CountingCursor(object):
+    """A DB-API cursor that records the size of every fetchmany call and the rows each call returned."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.description = cursor.description
+        self.fetches = []
+
+    def fetchmany(self, size):
+        rows = self.cursor.fetchmany(size)
+        self.fetches.append((size, len(rows)))
+        return rows
+
+
+class TrackingConnection(object):
+    """A DB-API connection that keeps the cursors it hands out."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursors = []
+
+    def cursor(self):
+        self.cursors.append(self.connection.cursor())
+        return self.cursors[-1]
+
+
+class SQLSourceTestSuite(unittest.TestCase):
+
+    """A sqlite3 database is read through the DB-API in fetchmany batches, never with fetchall."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.db")
+        self.rows = SampleData.rows(250)
+        self.columns = list(self.rows[0])
+        # the values are folded to ascii as they are read
+        self.expected = {col:AsciiFold.foldColumn(values) for col, values in SampleData.dataset(self.rows).items()}
+
+        connection = sqlite3.connect(self.fileName)
+        connection.execute("create table sample (" + ", ".join(['"' + col + '" TEXT' for col in self.columns]) + ")")
+        connection.executemany("insert into sample values (" + ", ".join(["?"] * len(self.columns)) + ")", [[row[col] for col in self.columns] for row in self.rows])
+        connection.execute("create table mixed (n INTEGER, x REAL, s TEXT)")
+        connection.executemany("insert into mixed values (?, ?, ?)", [(1, 2.5, "  Zoë  "), (None, None, None)])
+        connection.execute("create table empty (a TEXT, b TEXT)")
+        connection.commit()
+        connection.close()
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def query(self, connection, query:str) -> CountingCursor:
+        cursor = connection.cursor()
+        cursor.execute(query)
+
+        return CountingCursor(cursor)
+
+
+    def test_connect_opens_sqlite_uris(self):
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+
+        try:
+            for uri in ["sqlite:///sample.db", "sqlite:////" + self.fileName.lstrip("/"), "sqlite:sample.db"]:
+                with self.subTest(uri=uri):
+                    connection = SQLTools.connect(uri)
+                    self.assertEqual(connection.execute("select count(*) from sample").fetchone()[0], 250)
+                    connection.close()
+        finally:
+            os.chdir(cwd)
+
+        self.assertRaises(ValidationError, SQLTools.connect, "")
+        self.assertRaises(ValidationError, SQLTools.connect, None)
+
+
+    def test_result_set_is_fetched_in_batches(self):
+        connection = sqlite3.connect(self.fileName)
+
+        for batch_size, sizes in [(1, [1] * 250), (100, [100, 100, 50]), (250, [250]), (1000, [250])]:
+            with self.subTest(batch_size=batch_size):
+                cursor = self.query(connection, "select * from sample")
+                chunks = list(SQLTools.resultsetChunks(cursor, batch_size))
+
+                self.assertEqual([len(chunk["id"]) for chunk in chunks], sizes)
+                self.assertTrue(all(size == batch_size for size, rows in cursor.fetches))
+                # the last fetch finds the end of the result set
+                self.assertEqual(cursor.fetches[-1], (batch_size, 0))
+                self.assertEqual({col:[value for chunk in chunks for value in chunk[col]] for col in self.columns}, self.expected)
+
+        cursor = self.query(connection, "select * from sample")
+        self.assertEqual(SQLTools.resultsetToDict(cursor, batch_size=64), self.expected)
+        self.assertEqual([size for size, rows in cursor.fetches], [64] * 5)
+
+        connection.close()
+
+
+    def test_empty_result_set_yields_the_columns(self):
+        connection = sqlite3.connect(self.fileName)
+
+        self.assertEqual(list(SQLTools.resultsetChunks(self.query(connection, "select * from empty"), 10)), [{"a":[], "b":[]}])
+        self.assertRaises(ValidationError, list, SQLTools.resultsetChunks(self.query(connection, "select * from empty"), 0))
+
+        connection.close()
+
+
+    def test_values_are_cleaned(self):
+        connection = sqlite3.connect(self.fileName)
+
+        self.assertEqual(SQLTools.resultsetToDict(self.query(connection, "select * from mixed")), {"n":["1", "(Null)"], "x":["2.5", "(Null)"], "s":["Zoe", "(Null)"]})
+        self.assertEqual(SQLTools.resultsetToDict(self.query(connection, "select * from mixed"), unfolded={"s"})["s"], ["Zoë", "(Null)"])
+
+        connection.close()
+
+
+    def test_streamed_query_closes_its_cursor(self):
+        connection = sqlite3.connect(self.fileName)
+        stream = SampleData.run(DUQValidator({}, SampleData.meta()), "validateStream", SQLTools.queryChunks(connection, "select * from sample", 40))
+        full = SampleData.run(DUQValidator(SQLTools(connection.execute("select * from sample")).dataset, SampleData.meta()))
+
+        self.assertEqual(stream.summariseCounters(), full.summariseCounters())
+
+        connection.close()
+
+        # a stream that is abandoned part way still closes its cursor
+        connection = TrackingConnection(sqlite3.connect(self.fileName))
+        chunks = SQLTools.queryChunks(connection, "select * from sample", 40)
+        next(chunks)
+        chunks.close()
+
+        self.assertRaises(sqlite3.ProgrammingError, connection.cursors[0].fetchone)
+        connection.connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+from pyduq.filetools import FileTools
+
+
+class StreamTestSuite(unittest.TestCase):
+
+    """Validating a csv file in chunks reports the same errors as validating it in one go."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.temp_dir.name, "sample.csv")
+        SampleData.writeCSV(self.fileName, SampleData.rows(600))
+        self.full = SampleData.run(DUQValidator(FileTools.csvFileToDict(self.fileName), SampleData.meta()))
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def test_chunks_match_full(self):
+        for chunk_size in [1, 37, 600, 5000]:
+            with self.subTest(chunk_size=chunk_size):
+                stream = SampleData.run(DUQValidator({}, SampleData.meta()), "validateStream", FileTools.csvFileChunks(self.fileName, chunk_size))
+
+                self.assertEqual(SampleData.sortedErrors(stream), SampleData.sortedErrors(self.full))
+                self.assertEqual(stream.summariseCounters(), self.full.summariseCounters())
+
+
+    def test_chunks_rebuild_the_file(self):
+        chunks = list(FileTools.csvFileChunks(self.fileName, 37))
+        data = FileTools.csvFileToDict(self.fileName)
+
+        self.assertEqual(len(chunks), 17)
+        self.assertEqual({col:[value for chunk in chunks for value in chunk[col]] for col in data}, data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+from pyduq.filetools import FileTools
+from pyduq.triage import Triage
+
+
+class TriageTestSuite(unittest.TestCase):
+
+    """A triage sample of the whole dataset reports the same errors as validate, and its estimates are the exact counts."""
+
+    def setUp(self):
+        self.dataset = SampleData.dataset(SampleData.rows(600))
+        self.full = SampleData.run(DUQValidator(self.dataset, SampleData.meta()))
+
+
+    def sampled(self, triage):
+        validator = DUQValidator(self.dataset, SampleData.meta())
+        validator.triageSample(triage)
+
+        return SampleData.run(validator)
+
+
+    def test_full_size_sample_matches_validate(self):
+        for triage in [Triage(600), Triage(1000, stratify="city"), Triage(600, batch=7)]:
+            with self.subTest(stratify=triage.stratify, batch=triage.batch):
+                sampled = self.sampled(triage)
+
+                self.assertEqual(SampleData.sortedErrors(sampled), SampleData.sortedErrors(self.full))
+                self.assertEqual(sampled.summariseCounters(), self.full.summariseCounters())
+
+
+    def test_full_size_estimates_are_exact(self):
+        counts = self.full.errorCounts()
+        report = self.sampled(Triage(600)).triageReport()
+
+        for estimate in report:
+            if (estimate["error_dimension"] != "All"):
+                self.assertEqual(estimate["estimated_errors"], counts[(estimate["attribute"], estimate["error_dimension"])])
+                self.assertFalse(estimate["stopped_early"])
+                self.assertLessEqual(estimate["error_rate_low"], estimate["error_rate"])
+                self.assertLessEqual(estimate["error_rate"], estimate["error_rate_high"])
+
+        reported = set([(estimate["attribute"], estimate["error_dimension"]) for estimate in report])
+        self.assertEqual([key for key in counts if (key[0] in self.dataset and not key in reported)], [])
+
+
+    def test_error_budget_stops_early(self):
+        sampled = self.sampled(Triage(600, error_budget=20))
+
+        self.assertTrue(any([estimate["stopped_early"] for estimate in sampled.triageReport()]))
+        self.assertLess(len(sampled.validation_errors), len(self.full.validation_errors))
+
+
+    def test_full_size_stream_matches_validate(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = os.path.join(temp_dir, "sample.csv")
+            SampleData.writeCSV(fileName, SampleData.rows(600))
+            full = SampleData.run(DUQValidator(FileTools.csvFileToDict(fileName), SampleData.meta()))
+            sampled = DUQValidator({}, SampleData.meta())
+            sampled.triageSample(Triage(600))
+            SampleData.run(sampled, "validateStream", FileTools.csvFileChunks(fileName, 70))
+
+        self.assertEqual(SampleData.sortedErrors(sampled), SampleData.sortedErrors(full))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import random
+import unittest
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+from pyduq.columnstore import ColumnStore
+
+try:
+    from pyduq.vectorvalidator import VectorDUQValidator
+except ImportError:
+    VectorDUQValidator = None
+
+
+@unittest.skipIf(VectorDUQValidator is None, "the vector engine requires numpy")
+class VectorTestSuite(unittest.TestCase):
+
+    """The vector engine reports the same errors, in the same order, as the python engine."""
+
+    def check(self, dataset, meta):
+        python = SampleData.run(DUQValidator(dataset, meta))
+        vector = SampleData.run(VectorDUQValidator(dataset, meta))
+
+        self.assertEqual(SampleData.errors(vector), SampleData.errors(python))
+        self.assertEqual(vector.summariseCounters(), python.summariseCounters())
+
+
+    def test_row_checks_match_python(self):
+        self.check(SampleData.dataset(SampleData.rows(600)), SampleData.meta())
+
+
+    def test_row_checks_match_python_typed_columns(self):
+        meta = SampleData.meta()
+
+        self.check(ColumnStore.fromDataset(SampleData.dataset(SampleData.rows(600)), meta), meta)
+
+
+    def test_non_ascii_digits_match_python(self):
+        values = SampleData.UNICODE_NUMBERS + ["12", "-3", "1.5", "", "(Null)", "abc", "１e2", "٣.", "+٤"]
+        dataset = {"int":values, "float":values, "size":values}
+        meta = {"int":{"Type":"int", "Min":0, "Max":20}, "float":{"Type":"float", "Min":1, "Max":10}, "size":{"Type":"string", "Size":2}}
+
+        self.check(dataset, meta)
+
+
+    def test_expressions_match_python(self):
+        rng = random.Random(7)
+        numbers = SampleData.UNICODE_NUMBERS + ["5", "-3", "0", "007", "1.5", "-2.5", ".5", "5.", "+4", "1e5", "abc", "", "(Null)", "True", "9007199254740993"]
+        dataset = {"x":[rng.choice(numbers) for row in range(600)], "y":[rng.choice(numbers) for row in range(600)]}
+
+        for expression in ["[x] > 5", "[x] + [y] > 3", "[x] / [y] > 1", "[x] == [y]", "0 < [x] < 10", "not [x]", "[x] * [y] - 6", "-[x]", "[x] > 0 and [y] > 0", "[x] / ([y] - 2) != 1"]:
+            with self.subTest(expression=expression):
+                meta = {"x":{"Expression":expression}, "y":{}}
+                vector = SampleData.run(VectorDUQValidator(dataset, meta))
+
+                self.assertIsNotNone(vector.expressions["x"].vector_tree)
+                self.assertEqual(SampleData.errors(vector), SampleData.errors(SampleData.run(DUQValidator(dataset, meta))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from sampledata import SampleData
+from pyduq.duqvalidator import DUQValidator
+from pyduq.columnstore import ColumnStore
+
+
+class WorkersTestSuite(unittest.TestCase):
+
+    """Validating the attributes in a pool of worker processes reports the same errors, in the same order, as a serial run."""
+
+    def setUp(self):
+        self.dataset = SampleData.dataset(SampleData.rows(600))
+
+
+    def check(self, dataset, meta):
+        serial = SampleData.run(DUQValidator(dataset, meta))
+
+        for workers in [2, 3]:
+            with self.subTest(workers=workers):
+                parallel = SampleData.run(DUQValidator(dataset, meta), "validate", None, workers)
+
+                self.assertEqual(SampleData.errors(parallel), SampleData.errors(serial))
+                self.assertEqual(parallel.summariseCounters(), serial.summariseCounters())
+
+
+    def test_workers_match_serial(self):
+        self.check(self.dataset, SampleData.meta())
+
+
+    def test_workers_match_serial_without_primary_key(self):
+        meta = SampleData.meta()
+        del meta["id"]["PrimaryKey"]
+
+        self.check(self.dataset, meta)
+
+
+    def test_workers_match_serial_typed_columns(self):
+        meta = SampleData.meta()
+
+        self.check(ColumnStore.fromDataset(self.dataset, meta), meta)
+
+
+if __name__ == '__main__':
+    unittest.main()
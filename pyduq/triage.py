@@ -0,0 +1,184 @@
+import math
+import random
+import statistics
+from pyduq.duqerror import ValidationError
+from pyduq.SQLTools import SQLTools
+
+
+class Triage(object):
+    """ Triage:
+    The settings of a quick, sampled validation or profile of a new source. sample_size rows are chosen at random,
+    either a simple random sample (a reservoir sample when the rows are streamed in chunks and the row count isn't
+    known up front) or a sample stratified on the values of the stratify column, with each value getting its share
+    of the sample in proportion to its share of the rows. The sample is checked batch rows at a time in a random
+    order, and once an attribute has error_budget errors the rest of the sample is skipped for that attribute. Any
+    prefix of a random order is itself a random sample, so the estimates are still unbiased.
+
+    The error rate of each attribute and dimension is the number of errors per row checked, which can be more than 1
+    when a row fails several checks (e.g. Size and Type), with a score interval at the confidence level (see
+    interval). The null and blank rates of a profile are proportions of the rows and use a Wilson score interval
+    (see wilson). The Unique, Composite and NonRepeatingGroup checks only find the duplicates within the sample, so
+    their rates understate the rates in the full data.
+    """
+
+    BATCH = 100
+
+    def __init__(self:object, sample_size:int, error_budget:int=None, stratify:str=None, seed:int=0, confidence:float=0.95, batch:int=BATCH):
+        if (sample_size is None or sample_size < 1):
+            raise ValidationError("LANG Exception: the triage sample size must be at least 1", None)
+
+        if (not error_budget is None and error_budget < 1):
+            raise ValidationError("LANG Exception: the triage error budget must be at least 1", None)
+
+        if (confidence <= 0 or confidence >= 1):
+            raise ValidationError("LANG Exception: the triage confidence must be between 0 and 1", None)
+
+        self.sample_size = sample_size
+        self.error_budget = error_budget
+        self.stratify = stratify
+        self.seed = seed
+        self.confidence = confidence
+        self.batch = batch
+
+
+    def sampleRows(self:object, dataset:dict) -> list:
+        """
+        The row numbers of a sample of a dataset, in a random order.
+        """
+        rng = random.Random(self.seed)
+        row_count = SQLTools.rowCount(dataset)
+
+        if (self.stratify is None):
+            return rng.sample(range(row_count), min(self.sample_size, row_count))
+
+        if (not self.stratify in dataset):
+            raise ValidationError("LANG Exception: the triage stratify column '" + str(self.stratify) + "' was not found in the dataset", None)
+
+        strata = {}
+
+        for row, value in enumerate(dataset[self.stratify]):
+            strata.setdefault(value, []).append(row)
+
+        strata = list(strata.values())
+        rows = []
+
+        for stratum, size in Triage.allocate([len(stratum_rows) for stratum_rows in strata], min(self.sample_size, row_count)).items():
+            rows.extend(rng.sample(strata[stratum], size))
+
+        rng.shuffle(rows)
+
+        return rows
+
+
+    @staticmethod
+    def allocate(sizes:list, sample_size:int) -> dict:
+        """
+        Share a sample between strata in proportion to their sizes, giving the rows left over by rounding down to
+        the strata with the largest remainders. Returns {stratum number:sample size} for the strata that get rows.
+        """
+        total = sum(sizes)
+        shares = [sample_size * size / total for size in sizes]
+        allocation = [int(share) for share in shares]
+        remainders = sorted(range(len(sizes)), key=lambda stratum: shares[stratum] - allocation[stratum], reverse=True)
+
+        for stratum in remainders[:sample_size - sum(allocation)]:
+            allocation[stratum] += 1
+
+        return {stratum:size for stratum, size in enumerate(allocation) if (size > 0)}
+
+
+    def sampleChunks(self:object, chunks) -> tuple:
+        """
+        A reservoir sample of a stream of data chunks (see DUQValidator.validateStream), returning the sample as a
+        dataset, the row number of each sampled row and the number of rows in the stream. This uses Algorithm L
+        (Li, 1994), which skips ahead a random number of rows between replacements so only the sampled rows are touched.
+        """
+        if (not self.stratify is None):
+            raise ValidationError("LANG Exception: a stratified triage sample needs the whole dataset, not a stream of chunks", None)
+
+        rng = random.Random(self.seed)
+        size = self.sample_size
+        columns = None
+        sample = []
+        row_numbers = []
+        row_offset = 0
+        weight = math.exp(math.log(rng.random()) / size)
+        next_row = size + Triage.skip(rng, weight)
+
+        for chunk in chunks:
+            if (columns is None):
+                columns = list(chunk.keys())
+
+            row_count = SQLTools.rowCount(chunk)
+            data = [chunk[col] for col in columns]
+
+            # the reservoir is filled from the first rows
+            for row in range(max(0, min(size - row_offset, row_count))):
+                sample.append(tuple([values[row] for values in data]))
+                row_numbers.append(row_offset + row)
+
+            while (next_row < row_offset + row_count):
+                slot = rng.randrange(size)
+                sample[slot] = tuple([values[next_row - row_offset] for values in data])
+                row_numbers[slot] = next_row
+                weight *= math.exp(math.log(rng.random()) / size)
+                next_row += Triage.skip(rng, weight) + 1
+
+            row_offset += row_count
+
+        order = list(range(len(sample)))
+        rng.shuffle(order)
+        dataset = {col:[sample[i][index] for i in order] for index, col in enumerate(columns or [])}
+
+        return (dataset, [row_numbers[i] for i in order], row_offset)
+
+
+    @staticmethod
+    def skip(rng:random.Random, weight:float) -> int:
+        if (weight >= 1):
+            return 0
+
+        return int(math.floor(math.log(rng.random()) / math.log(1 - weight)))
+
+
+    def wilson(self:object, count:int, rows:int) -> tuple:
+        """
+        The Wilson score interval of a proportion of the rows. Unlike the usual normal approximation it stays within 0 and 1
+        and is still useful when there are few or none.
+        """
+        if (rows == 0):
+            return (0.0, 1.0)
+
+        z = statistics.NormalDist().inv_cdf(1 - (1 - self.confidence) / 2)
+        rate = min(count, rows) / rows
+        centre = (rate + z * z / (2 * rows)) / (1 + z * z / rows)
+        margin = z * math.sqrt(rate * (1 - rate) / rows + z * z / (4 * rows * rows)) / (1 + z * z / rows)
+
+        return (max(0.0, centre - margin), min(1.0, centre + margin))
+
+
+    def interval(self:object, errors:int, rows:int) -> tuple:
+        """
+        The score interval of a number of errors per row, taking the errors to be a Poisson count. It is a little
+        wider than the Wilson interval of a proportion, and doesn't assume that a row has at most one error.
+        """
+        if (rows == 0):
+            return (0.0, math.inf)
+
+        z = statistics.NormalDist().inv_cdf(1 - (1 - self.confidence) / 2)
+        centre = errors + z * z / 2
+        margin = z * math.sqrt(errors + z * z / 4)
+
+        return (max(0.0, centre - margin) / rows, (centre + margin) / rows)
+
+
+    def estimate(self:object, attribute:str, error_dimension:str, errors:int, rows_checked:int, row_count:int, stopped:bool) -> dict:
+        """
+        The estimated error rate and count of an attribute and dimension.
+        """
+        rate = (errors / rows_checked if rows_checked > 0 else 0.0)
+        low, high = self.interval(errors, rows_checked)
+
+        return {"attribute":attribute, "error_dimension":error_dimension, "rows":row_count, "rows_checked":rows_checked,
+                "errors":errors, "error_rate":round(rate, 6), "error_rate_low":round(low, 6), "error_rate_high":round(high, 6),
+                "estimated_errors":round(rate * row_count), "confidence":self.confidence, "stopped_early":stopped}
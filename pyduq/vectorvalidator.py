@@ -0,0 +1,263 @@
+import ast
+import numpy as np
+from pyduq.duqvalidator import DUQValidator
+from pyduq.expressionbuilder import CompiledExpression
+from pyduq.duqerror import ValidationError
+from pyduq.ruleplan import RulePlan
+from pyduq.prefixindex import PrefixIndex
+
+
+class VectorDUQValidator(DUQValidator):
+    """ VectorDUQValidator:
+    A DUQValidator that runs the row level checks (Mandatory, Size, Type, Min/Max, Enum and StartsWith) over a whole
+    column at once with NumPy. Each check becomes a boolean mask over the column - blank and (Null) masks, string
+    lengths for Size, a parsed numeric array for Type and Min/Max, np.isin for Enum - and the rule plan is only
+    run for the rows that one of the masks selects. The masks never miss a row that has an error (anything that
+    isn't plainly valid is selected) so the errors are exactly the same, in the same order, as DUQValidator.
+    Expressions that only use arithmetic and comparisons are evaluated the same way, over whole columns of numbers.
+
+    Requires NumPy 2.0 or later for the variable width string arrays.
+    """
+
+    COMPARISONS = {ast.Eq:np.equal, ast.NotEq:np.not_equal, ast.Lt:np.less, ast.LtE:np.less_equal, ast.Gt:np.greater, ast.GtE:np.greater_equal}
+
+    def __init__(self:object, dataset:dict, meta:dict):
+        if (not hasattr(np, "strings")):
+            raise ValidationError("LANG Exception: the vector engine requires numpy 2.0 or later", None)
+
+        super().__init__(dataset, meta)
+
+
+    def checkRows(self:object, plan:RulePlan, attribute, typed:bool, primary_key_values:list):
+        # the checks are only run once per distinct value anyway
+        if (self.distinct):
+            super().checkRows(plan, attribute, typed, primary_key_values)
+            return
+        
+        if (len(attribute) == 0):
+            return
+
+        values = np.array(list(attribute), dtype=np.dtypes.StringDType())
+        number = None
+
+        for row_count in np.flatnonzero(VectorDUQValidator.candidateRows(plan, values)).tolist():
+            value = attribute[row_count]
+
+            if (typed):
+                number = attribute.number(row_count)
+
+            errors = plan.checkValue(value, number)
+
+            if (len(errors) > 0):
+                self.addErrorSpecs(plan.attribute, errors, self.getPrimaryKeyValue(primary_key_values, row_count))
+
+
+    @staticmethod
+    def candidateRows(plan:RulePlan, values:np.ndarray) -> np.ndarray:
+        """
+        A mask of the rows that may fail one of the row level checks in the plan.
+        """
+        candidates = np.zeros(len(values), dtype=bool)
+        blank = (values == "") | (values == "(Null)")
+
+        if (not plan.blank_spec is None):
+            candidates |= blank
+
+        if (not plan.size is None):
+            candidates |= (np.strings.str_len(values) > plan.size) & ~blank
+
+        if (plan.report_type and plan.type == "bool"):
+            candidates |= ~np.fromiter(map(RulePlan.BOOL_VALUES.__contains__, map(str.lower, values.tolist())), dtype=bool, count=len(values))
+
+        if ( (plan.report_type and plan.type in ["int", "float"]) or plan.has_range ):
+            numeric = (VectorDUQValidator.simpleInts(values) if plan.type == "int" else VectorDUQValidator.simpleFloats(values))
+
+            if (plan.report_type and plan.type in ["int", "float"]):
+                candidates |= ~numeric
+
+            if (plan.has_range):
+                candidates |= VectorDUQValidator.outOfRange(plan, values, numeric, blank)
+
+        if (not plan.enum is None):
+            candidates |= ~blank & ~VectorDUQValidator.isIn(values, plan.enum)
+
+        if (not plan.starts_with is None):
+            found = np.zeros(len(values), dtype=bool)
+            index = plan.starts_with
+
+            if (index.lengths is None or len(index.prefixes) <= PrefixIndex.SHORT_LIST or not hasattr(np.strings, "slice")):
+                for prefix in index.prefixes:
+                    found |= np.strings.startswith(values, prefix)
+            else:
+                # one lookup for each prefix length (np.strings.slice needs numpy 2.3)
+                for length in index.lengths:
+                    found |= VectorDUQValidator.isIn(np.strings.slice(values, 0, length), index.groups[length])
+
+            candidates |= ~blank & ~found
+
+        return candidates
+
+
+    @staticmethod
+    def isIn(values:np.ndarray, items) -> np.ndarray:
+        """
+        A mask of the values that are in a set. np.isin compares every value with every item for strings, this
+        is one hash lookup per value.
+        """
+        return np.fromiter(map(items.__contains__, values.tolist()), dtype=bool, count=len(values))
+
+
+    @staticmethod
+    def isAscii(values:np.ndarray) -> np.ndarray:
+        """
+        A mask of the ascii values. np.strings has no isascii, so this is one str.isascii call per value.
+        """
+        return np.fromiter(map(str.isascii, values.tolist()), dtype=bool, count=len(values))
+
+
+    @staticmethod
+    def simpleInts(values:np.ndarray) -> np.ndarray:
+        """
+        A mask of the values that are plainly ints, i.e. ascii digits with an optional sign. Anything else is left to
+        python. isdecimal also accepts other scripts' digits (e.g. '١٢٣'), which python literals don't.
+        """
+        unsigned = np.strings.lstrip(values, "+-")
+        return ( (np.strings.str_len(values) - np.strings.str_len(unsigned) <= 1) & np.strings.isdecimal(unsigned) & VectorDUQValidator.isAscii(values) )
+
+
+    @staticmethod
+    def simpleFloats(values:np.ndarray) -> np.ndarray:
+        """
+        A mask of the values that are plainly floats, i.e. ascii digits with an optional sign and decimal point.
+        """
+        unsigned = np.strings.lstrip(values, "+-")
+        return ( (np.strings.str_len(values) - np.strings.str_len(unsigned) <= 1) & np.strings.isdecimal(np.strings.replace(unsigned, ".", "", 1))
+                 & VectorDUQValidator.isAscii(values) )
+
+
+    @staticmethod
+    def outOfRange(plan:RulePlan, values:np.ndarray, numeric:np.ndarray, blank:np.ndarray) -> np.ndarray:
+        """
+        A mask of the values that may fail the Min/Max check. Values that couldn't be parsed here are left to python.
+        """
+        val = np.full(len(values), np.nan)
+
+        try:
+            val[numeric] = values[numeric].astype(np.float64)
+        except ValueError as e:
+            return ~blank
+
+        out_of_range = np.zeros(len(values), dtype=bool)
+
+        if (plan.min != -1):
+            out_of_range |= (val < plan.min)
+
+        if (plan.max != -1):
+            out_of_range |= (val > plan.max)
+
+        return ( (out_of_range & (val != -1) & (val != plan.default_number)) | (~numeric & ~blank) )
+
+
+    def checkExpression(self:object, expression:CompiledExpression, meta_attribute_key:str, columns:list):
+        if (expression.vector_tree is None or len(columns) == 0):
+            super().checkExpression(expression, meta_attribute_key, columns)
+            return
+
+        for row_count in np.flatnonzero(VectorDUQValidator.expressionCandidates(expression, columns)).tolist():
+            self.addExpressionError(meta_attribute_key, expression.evaluate(tuple([column[row_count] for column in columns])))
+
+
+    @staticmethod
+    def expressionCandidates(expression:CompiledExpression, columns:list) -> np.ndarray:
+        """
+        A mask of the rows that may fail the expression. The expression is evaluated with float64 arrays for the rows
+        where every value is a plain number, keeping track of which results would be python ints. Any row where that
+        may not give the same answer as python (an int too big for a float64, a division by zero or a value that
+        isn't a plain number) is selected along with the rows that are FALSE.
+        """
+        count = min(len(column) for column in columns)
+        unusable = np.zeros(count, dtype=bool)
+        numbers = {}
+
+        for index, quoted in expression.parameters:
+            values = np.array(list(columns[index])[:count], dtype=np.dtypes.StringDType())
+            unsigned = np.strings.lstrip(values, "+-")
+            numeric = VectorDUQValidator.simpleFloats(values)
+            is_int = numeric & (np.strings.find(values, ".") < 0)
+            # python doesn't allow leading zeros in an int literal
+            numeric &= ~(is_int & (np.strings.str_len(unsigned) > 1) & np.strings.startswith(unsigned, "0"))
+            val = np.zeros(count)
+            val[numeric] = values[numeric].astype(np.float64)
+            unusable |= ~numeric
+            numbers["__lang_" + str(index) + "__"] = (val, is_int & numeric)
+
+        with np.errstate(all="ignore"):
+            val, is_int, bad = VectorDUQValidator.evaluateNode(expression.vector_tree, numbers, count)
+
+        return (unusable | bad | (val == 0))
+
+
+    @staticmethod
+    def evaluateNode(node:ast.AST, numbers:dict, count:int) -> tuple:
+        """
+        Evaluate part of an expression over the columns, returning the values, a mask of the values that would be
+        ints and a mask of the rows where the values may not be the same as python's.
+        """
+        if (isinstance(node, ast.Constant)):
+            val = np.full(count, float(node.value))
+            is_int = np.full(count, isinstance(node.value, int))
+            bad = np.zeros(count, dtype=bool)
+        elif (isinstance(node, ast.Name)):
+            val, is_int = numbers[node.id]
+            bad = np.zeros(count, dtype=bool)
+        elif (isinstance(node, ast.UnaryOp)):
+            val, is_int, bad = VectorDUQValidator.evaluateNode(node.operand, numbers, count)
+
+            if (isinstance(node.op, ast.USub)):
+                val = -val
+            elif (isinstance(node.op, ast.Not)):
+                val = (val == 0).astype(np.float64)
+                is_int = np.ones(count, dtype=bool)
+        elif (isinstance(node, ast.BinOp)):
+            left, left_int, left_bad = VectorDUQValidator.evaluateNode(node.left, numbers, count)
+            right, right_int, right_bad = VectorDUQValidator.evaluateNode(node.right, numbers, count)
+            bad = left_bad | right_bad
+            is_int = left_int & right_int
+
+            if (isinstance(node.op, ast.Add)):
+                val = left + right
+            elif (isinstance(node.op, ast.Sub)):
+                val = left - right
+            elif (isinstance(node.op, ast.Mult)):
+                val = left * right
+            else:
+                # python raises ZeroDivisionError
+                bad |= (right == 0)
+                val = left / right
+                is_int = np.zeros(count, dtype=bool)
+        elif (isinstance(node, ast.Compare)):
+            left, left_int, bad = VectorDUQValidator.evaluateNode(node.left, numbers, count)
+            result = np.ones(count, dtype=bool)
+
+            for op, comparator in zip(node.ops, node.comparators):
+                right, right_int, right_bad = VectorDUQValidator.evaluateNode(comparator, numbers, count)
+                bad = bad | right_bad
+                result &= VectorDUQValidator.COMPARISONS[type(op)](left, right)
+                left = right
+
+            val = result.astype(np.float64)
+            is_int = np.ones(count, dtype=bool)
+        else:
+            # and/or return the first false (and) or true (or) operand, otherwise the last
+            val, is_int, bad = VectorDUQValidator.evaluateNode(node.values[0], numbers, count)
+
+            for operand in node.values[1:]:
+                right, right_int, right_bad = VectorDUQValidator.evaluateNode(operand, numbers, count)
+                take = ((val != 0) if isinstance(node.op, ast.And) else (val == 0))
+                val = np.where(take, right, val)
+                is_int = np.where(take, right_int, is_int)
+                bad = bad | right_bad
+
+        # ints are only exact in a float64 up to 2**53
+        return (val, is_int, bad | (is_int & (np.abs(val) >= 2**53)))
+